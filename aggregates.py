@@ -0,0 +1,136 @@
+"""
+Инкрементальные итоги по транзакциям.
+
+RunningTotals обновляется хранилищем при каждом добавлении или удалении
+операции, поэтому баланс, суммы доходов/расходов, итоги по категориям и
+по месяцам читаются за O(1) без обхода журнала.
+
+Все суммы хранятся в целых копейках: длинные ряды сложений не накапливают
+погрешность float. Наружу суммы отдаются как Decimal с двумя знаками.
+"""
+from datetime import date
+from decimal import Decimal
+
+
+def to_kopecks(amount: float) -> int:
+    """Сумма в рублях -> целое число копеек."""
+    return round(amount * 100)
+
+
+def from_kopecks(kopecks: int) -> Decimal:
+    """Целое число копеек -> Decimal в рублях (ровно два знака)."""
+    return Decimal(kopecks).scaleb(-2)
+
+
+def month_key(ordinal: int) -> int:
+    """Номер месяца (год * 12 + месяц - 1) для порядкового номера дня."""
+    d = date.fromordinal(ordinal)
+    return d.year * 12 + d.month - 1
+
+
+
+class RunningTotals:
+    """
+    Итоги в копейках: общие, по id категории и по месяцам.
+
+    Доход/расход определяется знаком суммы — так же, как в балансе
+    и графиках приложения.
+    """
+
+    def __init__(self):
+        self.income_kopecks = 0
+        self.expense_kopecks = 0   # по модулю
+        self._categories = {}      # id категории -> [доходы, расходы, число операций]
+        self._months = {}          # номер месяца -> [доходы, расходы, число операций]
+
+    # --- Обновление ---
+
+    def _apply(self, amount: float, category_id: int, ordinal: int, sign: int):
+        kopecks = to_kopecks(amount)
+        income, expense = (kopecks, 0) if kopecks > 0 else (0, -kopecks)
+        self.income_kopecks += sign * income
+        self.expense_kopecks += sign * expense
+        for table, key in ((self._categories, category_id), (self._months, month_key(ordinal))):
+            bucket = table.setdefault(key, [0, 0, 0])
+            bucket[0] += sign * income
+            bucket[1] += sign * expense
+            bucket[2] += sign
+            if bucket[2] == 0:
+                del table[key]
+
+    def add(self, amount: float, category_id: int, ordinal: int):
+        """Учитывает добавленную операцию."""
+        self._apply(amount, category_id, ordinal, 1)
+
+    def remove(self, amount: float, category_id: int, ordinal: int):
+        """Исключает удалённую операцию."""
+        self._apply(amount, category_id, ordinal, -1)
+
+    def merge(self, other: "RunningTotals"):
+        """Добавляет итоги другого набора операций (например, пакета импорта)."""
+        self.income_kopecks += other.income_kopecks
+        self.expense_kopecks += other.expense_kopecks
+        for table, other_table in ((self._categories, other._categories),
+                                   (self._months, other._months)):
+            for key, (income, expense, count) in other_table.items():
+                bucket = table.setdefault(key, [0, 0, 0])
+                bucket[0] += income
+                bucket[1] += expense
+                bucket[2] += count
+
+    @classmethod
+    def from_columns(cls, amounts, date_ordinals, category_ids) -> "RunningTotals":
+        """Строит итоги по колонкам хранилища одним векторным проходом."""
+        import numpy as np
+
+        totals = cls()
+        if not len(amounts):
+            return totals
+        kopecks = np.rint(np.frombuffer(amounts, dtype=np.float64) * 100).astype(np.int64)
+        income = np.where(kopecks > 0, kopecks, 0)
+        expense = np.where(kopecks < 0, -kopecks, 0)
+        totals.income_kopecks = int(income.sum())
+        totals.expense_kopecks = int(expense.sum())
+
+        epoch = date(1970, 1, 1).toordinal()
+        days = np.frombuffer(date_ordinals, dtype=np.int32).astype(np.int64) - epoch
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + 1970 * 12
+
+        for table, keys in ((totals._categories, np.frombuffer(category_ids, dtype=np.int32)),
+                            (totals._months, months)):
+            uniques, codes = np.unique(keys, return_inverse=True)
+            sums_in = np.bincount(codes, weights=income, minlength=len(uniques))
+            sums_out = np.bincount(codes, weights=expense, minlength=len(uniques))
+            counts = np.bincount(codes, minlength=len(uniques))
+            for key, s_in, s_out, count in zip(uniques.tolist(), sums_in, sums_out, counts.tolist()):
+                table[key] = [int(round(s_in)), int(round(s_out)), count]
+        return totals
+
+    # --- Чтение ---
+
+    @property
+    def income(self) -> Decimal:
+        return from_kopecks(self.income_kopecks)
+
+    @property
+    def expense(self) -> Decimal:
+        return from_kopecks(self.expense_kopecks)
+
+    @property
+    def balance(self) -> Decimal:
+        return from_kopecks(self.income_kopecks - self.expense_kopecks)
+
+    def category(self, category_id: int) -> tuple:
+        """(доходы, расходы) по категории в Decimal."""
+        income, expense, _ = self._categories.get(category_id, (0, 0, 0))
+        return from_kopecks(income), from_kopecks(expense)
+
+    def categories(self) -> dict:
+        """{id категории: (доходы, расходы)} в порядке id."""
+        return {key: (from_kopecks(v[0]), from_kopecks(v[1]))
+                for key, v in sorted(self._categories.items())}
+
+    def months(self) -> list:
+        """[(год, месяц, доходы, расходы)] по возрастанию месяца."""
+        return [(key // 12, key % 12 + 1, from_kopecks(v[0]), from_kopecks(v[1]))
+                for key, v in sorted(self._months.items())]
@@ -1,25 +1,84 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
+from frame_cache import frames
+from store import TransactionStore
+from instrumentation import timed
+from storage import StorageBackend
 
+
+@timed()
 def get_category_summary(transactions: list) -> pd.DataFrame:
-    """Сумма по категориям."""
-    df = pd.DataFrame([t.to_dict() for t in transactions])
-    summary = df.groupby("category")["amount"].sum().reset_index()
+    """Сумма по категориям (для бэкенда хранилища считается им самим)."""
+    if isinstance(transactions, StorageBackend):
+        totals = transactions.category_totals()
+        summary = pd.DataFrame(totals, columns=["category", "amount"])
+        return summary.sort_values("category").reset_index(drop=True)
+    # Группировка по id категории, имена подставляются в конце
+    summary = frames(transactions).by_category.rename_axis("category").reset_index(name="amount")
     return summary
 
+def monthly_by_type(transactions) -> tuple:
+    """
+    Суммы операций по месяцам для типов income и expense (pd.Series,
+    индекс — конец месяца). Считаются по месячным бакетам RollupIndex;
+    месяцы без операций внутри диапазона типа равны 0.
+    """
+    store = TransactionStore.from_transactions(transactions)
+    result = []
+    for category_type in ("income", "expense"):
+        ids = store.category_registry.ids_of_type(category_type)
+        series = store.rollup.series("month", category_ids=ids) if ids else []
+        index = pd.DatetimeIndex([pd.Timestamp(key // 12, key % 12 + 1, 1) for key, _, _ in series])
+        values = pd.Series([(income - expense) / 100 for _, income, expense in series],
+                           index=index, dtype=float)
+        result.append(values.resample(pd.offsets.MonthEnd()).sum())
+    return tuple(result)
+
+@timed()
+def category_monthly_stats(transactions) -> pd.DataFrame:
+    """
+    Помесячные итоги каждой категории (по месячным бакетам RollupIndex) и
+    параметры их распределения — для модели simulation.py.
+
+    Колонки:
+        category, category_type — категория (по одной строке на id категории);
+        sign — знак месячной суммы (+1 доход, -1 расход);
+        active_share — доля месяцев журнала с операциями по категории;
+        log_mean, log_std — среднее и отклонение логарифма модуля месячной суммы;
+        mean — средняя месячная сумма по модулю за месяцы с операциями.
+    """
+    import numpy as np
+
+    store = TransactionStore.from_transactions(transactions)
+    columns = ["category", "category_type", "sign", "active_share", "log_mean", "log_std", "mean"]
+    rollup = store.rollup
+    if not rollup:
+        return pd.DataFrame(columns=columns)
+    first, last = rollup.first_day(), rollup.last_day()
+    months_total = (last.year - first.year) * 12 + last.month - first.month + 1
+
+    rows = []
+    for category_id, category in enumerate(store.categories):
+        net = np.array([income - expense for _, income, expense
+                        in rollup.series("month", category_ids=[category_id])], dtype=np.float64)
+        net = net[net != 0] / 100
+        if not len(net):
+            continue
+        magnitudes = np.abs(net)
+        logs = np.log(magnitudes)
+        rows.append((category.name, category.category_type, 1 if net.sum() > 0 else -1,
+                     len(net) / months_total, logs.mean(), logs.std(), magnitudes.mean()))
+    return pd.DataFrame(rows, columns=columns)
+
+@timed()
 def plot_income_expense(transactions: list):
     """График доходов/расходов по времени."""
-    df = pd.DataFrame([t.to_dict() for t in transactions])
-    df["date"] = pd.to_datetime(df["date"])
-    df.set_index("date", inplace=True)
-    
-    income = df[df["category_type"] == "income"].resample("M").sum()
-    expense = df[df["category_type"] == "expense"].resample("M").sum()
+    import matplotlib.pyplot as plt
+    income, expense = monthly_by_type(transactions)
 
     plt.figure(figsize=(10, 6))
-    plt.plot(income.index, income["amount"], label="Доходы", marker="o")
-    plt.plot(expense.index, expense["amount"], label="Расходы", marker="s")
+    plt.plot(income.index, income, label="Доходы", marker="o")
+    plt.plot(expense.index, expense, label="Расходы", marker="s")
     plt.title("Доходы и расходы по месяцам")
     plt.xlabel("Месяц")
     plt.ylabel("Сумма (руб.)")
@@ -27,11 +86,14 @@ def plot_income_expense(transactions: list):
     plt.grid(True)
     plt.show()
 
+@timed()
 def plot_category_pie(transactions: list):
     """Круговая диаграмма расходов по категориям."""
-    df = pd.DataFrame([t.to_dict() for t in transactions])
+    import matplotlib.pyplot as plt
+    cached = frames(transactions)
+    df = cached.frame
     expenses = df[df["category_type"] == "expense"]
-    category_sum = expenses.groupby("category")["amount"].sum()
+    category_sum = cached.by_name(expenses.groupby("category_id")["amount"].sum().abs())
 
     plt.figure(figsize=(8, 8))
     plt.pie(category_sum, labels=category_sum.index, autopct="%1.1f%%")
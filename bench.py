@@ -0,0 +1,253 @@
+"""
+Замеры производительности на синтетических журналах.
+
+Генератор создаёт воспроизводимые журналы в формате data/finances.csv
+(10k, 100k, 1M и 10M строк); для каждого размера замеряются загрузка,
+сохранение, сводка по категориям, отрисовка графиков (бэкенд Agg) и
+обновление таблицы окна. Время — лучшее из нескольких повторов, пиковая
+память — отдельным прогоном под tracemalloc. Результаты пишутся в JSON;
+--compare сравнивает их с прошлым прогоном и отмечает регрессии.
+
+Запуск:
+    python bench.py --sizes 10k,100k --out bench.json
+    python bench.py --sizes 10k,100k --compare bench.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+# Во сколько раз операция может замедлиться до того, как считаться регрессией
+REGRESSION_THRESHOLD = 1.2
+
+_CATEGORIES = [
+    ("Зарплата", "income"), ("Подработка", "income"), ("Кэшбэк", "income"),
+    ("Продукты", "expense"), ("Транспорт", "expense"), ("Кафе", "expense"),
+    ("Связь", "expense"), ("Коммунальные услуги", "expense"), ("Здоровье", "expense"),
+    ("Одежда", "expense"), ("Развлечения", "expense"), ("Подарки", "expense"),
+]
+_COMMENTS = ["", "", "", "Магазин", "Аванс", "Проездной", "Обед", "Такси", "Аптека"]
+_FIRST_DAY = "2020-01-01"
+_DAYS = 5 * 365
+
+
+def generate_ledger(path: str, rows: int, seed: int = 0, chunksize: int = 500_000):
+    """
+    Записывает синтетический журнал из rows строк.
+
+    Один и тот же seed даёт побайтно одинаковый файл.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    names = np.array([name for name, _ in _CATEGORIES], dtype=object)
+    types = np.array([category_type for _, category_type in _CATEGORIES], dtype=object)
+    comments = np.array(_COMMENTS, dtype=object)
+    # Доходы реже расходов, но крупнее
+    weights = np.array([0.03, 0.02, 0.05] + [0.9 / 9] * 9)
+
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        for start in range(0, max(rows, 1), chunksize):
+            count = min(chunksize, rows - start)
+            category = rng.choice(len(_CATEGORIES), size=count, p=weights)
+            income = types[category] == "income"
+            amount = rng.lognormal(6.5, 1.0, size=count) + 0.01
+            amount = np.round(np.where(income, amount * 20, -amount), 2)
+            days = np.sort(rng.integers(0, _DAYS, size=count))
+            pd.DataFrame({
+                "amount": amount,
+                "category": names[category],
+                "type": types[category],
+                "date": (np.datetime64(_FIRST_DAY, "D") + days).astype(str),
+                "comment": comments[rng.integers(0, len(comments), size=count)],
+            }).to_csv(file, index=False, header=start == 0)
+
+
+def ledger_for(rows: int, data_dir: str, seed: int = 0) -> str:
+    """Путь к журналу нужного размера; генерирует его, если файла ещё нет."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"ledger_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"[INFO] Генерация журнала на {rows} строк: {path}")
+        generate_ledger(path, rows, seed)
+    return path
+
+
+def _measure(fn, setup=None, repeat: int = 3) -> dict:
+    """
+    Лучшее время из repeat прогонов и пиковая память одного прогона под
+    tracemalloc. setup() вызывается перед каждым прогоном и не замеряется.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "runs": times, "peak_bytes": peak}
+
+
+def _refresh_benchmark(transactions):
+    """Замер FinanceApp.refresh_transactions_list (нужен дисплей для Tk)."""
+    import tkinter as tk
+    from gui import FinanceApp
+    from storage import MemoryBackend
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return None, f"Tk недоступен: {e}"
+    root.withdraw()
+    app = FinanceApp(root, MemoryBackend(transactions))
+
+    def refresh():
+        app.refresh_transactions_list()
+        root.update_idletasks()
+    return (refresh, lambda: (app.scheduler.shutdown(), root.destroy())), None
+
+
+def run_size(rows: int, data_dir: str, repeat: int = 3, seed: int = 0, gui: bool = True) -> list:
+    """Замеры всех операций для журнала одного размера."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import analysis
+    import frame_cache
+    import storage
+    import visualization
+
+    path = ledger_for(rows, data_dir, seed)
+    results = []
+
+    def record(operation, fn, setup=None):
+        measured = _measure(fn, setup, repeat)
+        results.append(dict(rows=rows, operation=operation, **measured))
+        print(f"[INFO] {rows:>10} {operation:<28} {measured['seconds']:9.3f} с "
+              f"{measured['peak_bytes'] / 2**20:9.1f} МиБ")
+
+    record("load_transactions", lambda: storage.load_transactions(path))
+    record("load_transactions_bulk", lambda: storage.load_transactions_bulk(path))
+    transactions = storage.load_transactions_bulk(path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        record("save_transactions",
+               lambda: storage.save_transactions(transactions, os.path.join(tmp, "saved.csv")))
+
+        # Сводки и графики считаются «с холодного» кэша DataFrame
+        cold = lambda: frame_cache.invalidate(transactions)
+        record("get_category_summary", lambda: analysis.get_category_summary(transactions),
+               setup=cold)
+        for name in ("plot_income_expense", "plot_category_pie", "plot_top_expenses"):
+            plot = getattr(visualization, name)
+            save_path = os.path.join(tmp, f"{name}.png")
+            record(name, lambda plot=plot, save_path=save_path:
+                   plot(transactions, save_path=save_path), setup=cold)
+
+    if gui:
+        bench, reason = _refresh_benchmark(transactions)
+        if bench is None:
+            print(f"[WARNING] refresh_transactions_list пропущен: {reason}")
+            results.append({"rows": rows, "operation": "refresh_transactions_list",
+                            "skipped": reason})
+        else:
+            refresh, close = bench
+            try:
+                record("refresh_transactions_list", refresh)
+            finally:
+                close()
+    return results
+
+
+def compare(current: list, baseline: list, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Сравнивает результаты с базовым прогоном.
+
+    Возвращает [(строки, операция, было, стало, отношение)] для операций,
+    замедлившихся больше чем в threshold раз.
+    """
+    before = {(r["rows"], r["operation"]): r["seconds"] for r in baseline if "seconds" in r}
+    regressions = []
+    for r in current:
+        key = (r["rows"], r["operation"])
+        if "seconds" not in r or key not in before or not before[key]:
+            continue
+        ratio = r["seconds"] / before[key]
+        print(f"[INFO] {key[0]:>10} {key[1]:<28} {before[key]:9.3f} -> {r['seconds']:9.3f} с "
+              f"(x{ratio:.2f})")
+        if ratio > threshold:
+            regressions.append((key[0], key[1], before[key], r["seconds"], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности финансового планировщика")
+    parser.add_argument("--sizes", default=",".join(SIZES),
+                        help=f"размеры журналов через запятую ({', '.join(SIZES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов замера времени")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора журналов")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "finances_bench"),
+                        help="каталог сгенерированных журналов (переиспользуются между прогонами)")
+    parser.add_argument("--out", default="bench.json", help="файл результатов JSON")
+    parser.add_argument("--compare", metavar="JSON", help="результаты прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="допустимое замедление относительно прошлого прогона")
+    parser.add_argument("--no-gui", action="store_true", help="не замерять обновление таблицы Tk")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [SIZES[size.strip()] for size in args.sizes.split(",") if size.strip()]
+    except KeyError as e:
+        print(f"[ERROR] Неизвестный размер {e}; допустимы: {', '.join(SIZES)}")
+        return 2
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    results = []
+    for rows in sizes:
+        results.extend(run_size(rows, args.data_dir, args.repeat, args.seed, gui=not args.no_gui))
+
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "results": results,
+        }, file, ensure_ascii=False, indent=2)
+    print(f"[INFO] Результаты сохранены: {args.out}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for rows, operation, before, after, ratio in regressions:
+            print(f"[WARNING] Регрессия: {operation} на {rows} строк: "
+                  f"{before:.3f} -> {after:.3f} с (x{ratio:.2f})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
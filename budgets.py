@@ -0,0 +1,242 @@
+"""
+Бюджеты: лимиты расходов категорий на неделю или месяц.
+
+Потраченное за период не считается обходом журнала. Его дают бакеты
+индекса сводок хранилища (rollup.RollupIndex), а хранилище обновляет
+индекс за O(1) при каждом добавлении операции. Месяц — один месячный
+бакет, неделя — не больше семи дневных. Поэтому проверка бюджета и отчёт
+«бюджет против факта» не зависят от размера журнала.
+
+BudgetMonitor проверяет только что добавленные строки хранилища (ручной
+ввод, импорт, строки других процессов). Для каждой пары (бюджет, период)
+потраченное до этих строк и после них сравнивается с порогами бюджета.
+Пересечение порога даёт BudgetAlert.
+"""
+import math
+from datetime import date, timedelta
+
+from aggregates import to_kopecks
+from models import Category, intern_category
+
+PERIODS = ("weekly", "monthly")
+
+# Доли лимита, при пересечении которых выдаётся предупреждение
+DEFAULT_THRESHOLDS = (0.8, 1.0)
+
+_PERIOD_NAMES = {"weekly": "неделя", "monthly": "месяц"}
+
+
+def period_bounds(period: str, day: date) -> tuple:
+    """Первый и последний день недели (с понедельника) или месяца, в который попадает day."""
+    if period == "weekly":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == "monthly":
+        start = day.replace(day=1)
+        following = date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+        return start, following - timedelta(days=1)
+    raise ValueError(f"Неизвестный период бюджета: {period}")
+
+
+def periods_between(period: str, start: date, end: date) -> list:
+    """Периоды [(начало, конец)], пересекающиеся с [start, end], по возрастанию."""
+    result = []
+    day = start
+    while day <= end:
+        bounds = period_bounds(period, day)
+        result.append(bounds)
+        day = bounds[1] + timedelta(days=1)
+    return result
+
+
+
+class Budget:
+    """
+    Лимит расходов категории за период.
+
+    Attributes:
+        category (Category): Категория расходов
+        kopecks (int): Лимит за период в копейках (limit — в рублях)
+        period (str): "weekly" или "monthly"
+        thresholds (tuple): Доли лимита для предупреждений, по возрастанию
+    """
+
+    def __init__(self, category: Category, limit: float, period: str = "monthly",
+                 thresholds=DEFAULT_THRESHOLDS):
+        if not isinstance(category, Category) or category.category_type != "expense":
+            raise ValueError("Бюджет задаётся для категории расходов")
+        if not isinstance(limit, (int, float)) or not math.isfinite(limit) or limit <= 0:
+            raise ValueError("Лимит бюджета должен быть положительным числом")
+        try:
+            kopecks = to_kopecks(limit)
+        except OverflowError:
+            raise ValueError("Лимит бюджета слишком велик")
+        if kopecks < 1:
+            raise ValueError("Лимит бюджета должен быть не меньше копейки")
+        if period not in PERIODS:
+            raise ValueError(f"Период бюджета: {', '.join(PERIODS)}")
+        thresholds = tuple(sorted(float(t) for t in thresholds))
+        if not thresholds or thresholds[0] <= 0:
+            raise ValueError("Пороги бюджета должны быть положительными")
+        self.category = category
+        self.kopecks = kopecks
+        self.period = period
+        self.thresholds = thresholds
+
+    @property
+    def limit(self) -> float:
+        return self.kopecks / 100
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для сохранения."""
+        return {
+            "category": self.category.name,
+            "limit": self.limit,
+            "period": self.period,
+            "thresholds": list(self.thresholds),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Budget":
+        return cls(intern_category(data["category"], "expense"), float(data["limit"]),
+                   data.get("period", "monthly"), data.get("thresholds", DEFAULT_THRESHOLDS))
+
+    def __repr__(self):
+        return f"Budget({self.category.name!r}, {self.limit}, {self.period!r})"
+
+
+
+class BudgetStatus:
+    """
+    Бюджет против факта за один период.
+
+    Attributes:
+        budget (Budget): Бюджет
+        start, end (date): Границы периода
+        spent (int): Расходы категории за период в копейках
+    """
+
+    def __init__(self, budget: Budget, start: date, end: date, spent: int):
+        self.budget = budget
+        self.start = start
+        self.end = end
+        self.spent = spent
+
+    @property
+    def remaining(self) -> float:
+        """Остаток лимита в рублях (отрицательный — перерасход)."""
+        return (self.budget.kopecks - self.spent) / 100
+
+    @property
+    def share(self) -> float:
+        """Доля израсходованного лимита."""
+        return self.spent / self.budget.kopecks
+
+    def describe(self) -> str:
+        return (f"«{self.budget.category.name}», {_PERIOD_NAMES[self.budget.period]} "
+                f"с {self.start:%d.%m.%Y}: потрачено {self.spent / 100:,.2f} "
+                f"из {self.budget.limit:,.2f} руб. ({self.share:.0%})")
+
+
+
+class BudgetAlert(BudgetStatus):
+    """
+    Пересечение порога бюджета.
+
+    Attributes:
+        threshold (float): Наибольший пересечённый порог
+    """
+
+    def __init__(self, budget: Budget, start: date, end: date, spent: int, threshold: float):
+        super().__init__(budget, start, end, spent)
+        self.threshold = threshold
+
+    def message(self) -> str:
+        prefix = "Превышен бюджет" if self.spent > self.budget.kopecks else "Бюджет почти исчерпан"
+        return f"{prefix}: {self.describe()}"
+
+
+
+class BudgetMonitor:
+    """
+    Проверка бюджетов по индексу сводок хранилища.
+
+    Attributes:
+        budgets (list): Бюджеты
+    """
+
+    def __init__(self, budgets=()):
+        self.set_budgets(budgets)
+
+    def set_budgets(self, budgets):
+        self.budgets = list(budgets)
+        self._by_category = {}   # (имя, тип) категории -> [бюджеты]
+        for budget in self.budgets:
+            key = (budget.category.name, budget.category.category_type)
+            self._by_category.setdefault(key, []).append(budget)
+
+    @staticmethod
+    def spent(store, budget: Budget, start: date, end: date) -> int:
+        """Расходы категории бюджета за [start, end] в копейках (по бакетам индекса сводок)."""
+        category_id = store.category_registry.find(budget.category.name, budget.category.category_type)
+        if category_id is None or not store.rollup:
+            return 0
+        return store.rollup.category_total(category_id, start, end)[1]
+
+    def check_rows(self, store, first: int, last: int = None) -> list:
+        """
+        Предупреждения по строкам store[first:last], уже добавленным в хранилище.
+
+        Строки перебираются один раз (O(новых строк)); потраченное до и после
+        них берётся из индекса сводок по одному запросу на пару (бюджет, период).
+        """
+        last = len(store) if last is None else last
+        if not self._by_category or first >= last:
+            return []
+
+        # (бюджет, границы периода) -> расходы новых строк в копейках
+        added = {}
+        amounts, ordinals, category_ids = store.amounts, store.date_ordinals, store.category_ids
+        categories = store.categories
+        for i in range(first, last):
+            amount = amounts[i]
+            if amount >= 0:
+                continue
+            category = categories[category_ids[i]]
+            budgets = self._by_category.get((category.name, category.category_type))
+            if not budgets:
+                continue
+            day = date.fromordinal(ordinals[i])
+            for budget in budgets:
+                key = (id(budget), period_bounds(budget.period, day))
+                entry = added.get(key)
+                if entry is None:
+                    entry = added[key] = [budget, 0]
+                entry[1] += to_kopecks(-amount)
+
+        alerts = []
+        for (_, (start, end)), (budget, kopecks) in added.items():
+            after = self.spent(store, budget, start, end)
+            before = after - kopecks
+            crossed = [t for t in budget.thresholds if before < t * budget.kopecks <= after]
+            if crossed:
+                alerts.append(BudgetAlert(budget, start, end, after, crossed[-1]))
+        return alerts
+
+    def report(self, store, start: date, end: date) -> list:
+        """Бюджет против факта: BudgetStatus для каждого бюджета и каждого его периода в [start, end]."""
+        return [
+            BudgetStatus(budget, period_start, period_end,
+                         self.spent(store, budget, period_start, period_end))
+            for budget in self.budgets
+            for period_start, period_end in periods_between(budget.period, start, end)
+        ]
+
+    def current(self, store, today: date = None) -> list:
+        """Состояние бюджетов в текущих периодах."""
+        today = today or date.today()
+        return [
+            BudgetStatus(budget, *period_bounds(budget.period, today),
+                         self.spent(store, budget, *period_bounds(budget.period, today)))
+            for budget in self.budgets
+        ]
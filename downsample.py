@@ -0,0 +1,127 @@
+"""
+Прореживание длинных временных рядов для графиков.
+
+За годы ежедневных операций в ряду набираются тысячи точек. Рисовать
+каждую медленно, и такой график не читается. Поэтому ряд готовится в
+два шага:
+    1. Выбирается разрешение (день, неделя, месяц): самое подробное, при
+       котором точек не больше чем MAX_POINTS * OVERSAMPLE. Суммы
+       складываются по неделям или месяцам.
+    2. Если точек всё ещё больше MAX_POINTS, ряд прореживается алгоритмом
+       LTTB (Largest-Triangle-Three-Buckets). В каждом интервале остаётся
+       точка, образующая наибольший треугольник с соседями, поэтому пики
+       и провалы сохраняются, а ровные участки выбрасываются.
+"""
+from datetime import date
+
+import numpy as np
+
+# Сколько точек ряда рисовать
+MAX_POINTS = 600
+# Во сколько раз больше точек может быть до прореживания LTTB
+OVERSAMPLE = 4
+
+RESOLUTIONS = ("day", "week", "month")
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """
+    Индексы threshold точек ряда (x по возрастанию), выбранных LTTB.
+    Первая и последняя точки сохраняются всегда.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Внутренние точки 1..n-2 делятся на threshold - 2 интервала
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            avg_x = x[end:edges[i + 2]].mean()
+            avg_y = y[end:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # Удвоенная площадь треугольника (выбранная точка, кандидат, среднее следующего интервала)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def bucket_starts(ordinals, resolution: str) -> np.ndarray:
+    """Первый день недели (понедельник) или месяца для каждого дня."""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    if resolution == "day":
+        return ordinals
+    if resolution == "week":
+        return ordinals - (ordinals - 1) % 7   # день 1 (01.01.0001) — понедельник
+    if resolution == "month":
+        months = (ordinals - _EPOCH).astype("datetime64[D]").astype("datetime64[M]")
+        return months.astype("datetime64[D]").astype(np.int64) + _EPOCH
+    raise ValueError(f"Неизвестное разрешение: {resolution}")
+
+
+def resample(ordinals, values, resolution: str) -> tuple:
+    """
+    Суммирует значения по неделям или месяцам.
+
+    Параметры:
+        ordinals: порядковые номера дней по возрастанию
+        values: массив (дни × ряды)
+    Returns:
+        (первые дни бакетов, суммы бакетов × ряды)
+    """
+    keys, inverse = np.unique(bucket_starts(ordinals, resolution), return_inverse=True)
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.zeros((len(keys), values.shape[1]))
+    np.add.at(sums, inverse, values)
+    return keys, np.round(sums, 2)
+
+
+def choose_resolution(first: int, last: int, limit: int = MAX_POINTS * OVERSAMPLE) -> str:
+    """Самое подробное разрешение, при котором в [first, last] не больше limit бакетов."""
+    span = last - first + 1
+    if span <= limit:
+        return "day"
+    if span / 7 <= limit:
+        return "week"
+    return "month"
+
+
+def downsample_daily(daily, resolution: str = "auto", max_points: int = MAX_POINTS) -> tuple:
+    """
+    Готовит дневной ряд [(дата, доходы, расходы)] к отрисовке.
+
+    Returns:
+        (разрешение, [(первый день бакета, доходы, расходы)]); строк не
+        больше 2 * max_points — LTTB выбирает точки для каждого ряда, а
+        в результат входят даты, выбранные хотя бы для одного.
+    """
+    if resolution != "auto" and resolution not in RESOLUTIONS:
+        raise ValueError(f"Неизвестное разрешение: {resolution}")
+    if not daily:
+        return ("day" if resolution == "auto" else resolution), []
+    ordinals = np.fromiter((day.toordinal() for day, _, _ in daily), dtype=np.int64, count=len(daily))
+    values = np.array([(income, expense) for _, income, expense in daily], dtype=np.float64)
+
+    if resolution == "auto":
+        resolution = choose_resolution(int(ordinals[0]), int(ordinals[-1]), max_points * OVERSAMPLE)
+    if resolution != "day":
+        ordinals, values = resample(ordinals, values, resolution)
+
+    if len(ordinals) > max_points:
+        keep = np.union1d(lttb(ordinals, values[:, 0], max_points),
+                          lttb(ordinals, values[:, 1], max_points))
+        ordinals, values = ordinals[keep], values[keep]
+
+    rows = [(date.fromordinal(day), income, expense)
+            for day, (income, expense) in zip(ordinals.tolist(), values.tolist())]
+    return resolution, rows
@@ -0,0 +1,159 @@
+"""
+Поиск повторяющихся операций.
+
+DuplicateIndex — хеш-индекс по (дата, сумма в копейках, категория,
+комментарий); категория и комментарий сравниваются нормализованными
+(регистр, лишние пробелы, «ё»/«е»). Хранилище обновляет индекс при
+каждом добавлении, поэтому проверка операции стоит O(1).
+
+Для нечёткого поиска ведётся второй индекс — без комментария; операции
+с той же суммой и категорией в окне ±N дней находятся проверкой 2N + 1
+дневных ключей, а не сравнением всех пар.
+
+Ключи — 64-битные хеши полей (одинаковые для поштучного и векторного
+построения); индекс живёт только в памяти процесса.
+"""
+from datetime import date, timedelta
+
+from aggregates import to_kopecks
+
+# Окно нечёткого поиска по умолчанию, дней в каждую сторону
+NEAR_WINDOW_DAYS = 3
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+_SEED = 0xCBF29CE484222325
+_MULTIPLIER = 0xBF58476D1CE4E5B9
+
+
+def normalize(text: str) -> str:
+    """Нормализует строку для сравнения: регистр, пробелы, «ё»."""
+    return " ".join((text or "").replace("ё", "е").replace("Ё", "Е").casefold().split())
+
+
+def _text_hash(text: str) -> int:
+    return hash(normalize(text)) & _MASK
+
+
+def _combine(*values) -> int:
+    """64-битный хеш набора целых (совпадает с _combine_arrays поэлементно)."""
+    h = _SEED
+    for value in values:
+        h = ((h ^ (value & _MASK)) * _MULTIPLIER) & _MASK
+        h ^= h >> 31
+    return h
+
+
+def _combine_arrays(*arrays):
+    import numpy as np
+
+    h = np.full(len(arrays[0]), _SEED, dtype=np.uint64)
+    for values in arrays:
+        h ^= values.astype(np.uint64)
+        h *= np.uint64(_MULTIPLIER)
+        h ^= h >> np.uint64(31)
+    return h
+
+
+
+class DuplicateIndex:
+    """
+    Индекс точных и близких повторов.
+
+    Хранит число операций на ключ, поэтому поддерживает и удаление.
+    """
+
+    def __init__(self):
+        self._exact = {}   # хеш (день, копейки, категория, комментарий) -> число операций
+        self._near = {}    # хеш (день, копейки, категория) -> число операций
+
+    # --- Ключи ---
+
+    @staticmethod
+    def key(amount: float, category_name: str, ordinal: int, comment: str = "") -> int:
+        """Ключ точного совпадения."""
+        return _combine(ordinal, to_kopecks(amount), _text_hash(category_name), _text_hash(comment))
+
+    @staticmethod
+    def _near_key(kopecks: int, category_hash: int, ordinal: int) -> int:
+        return _combine(ordinal, kopecks, category_hash)
+
+    # --- Обновление ---
+
+    def _apply(self, amount: float, category_name: str, ordinal: int, comment: str, sign: int):
+        category_hash = _text_hash(category_name)
+        kopecks = to_kopecks(amount)
+        for table, key in (
+            (self._exact, _combine(ordinal, kopecks, category_hash, _text_hash(comment))),
+            (self._near, self._near_key(kopecks, category_hash, ordinal)),
+        ):
+            count = table.get(key, 0) + sign
+            if count > 0:
+                table[key] = count
+            else:
+                table.pop(key, None)
+
+    def add(self, amount: float, category_name: str, ordinal: int, comment: str = ""):
+        """Учитывает добавленную операцию."""
+        self._apply(amount, category_name, ordinal, comment, 1)
+
+    def remove(self, amount: float, category_name: str, ordinal: int, comment: str = ""):
+        """Исключает удалённую операцию."""
+        self._apply(amount, category_name, ordinal, comment, -1)
+
+    def merge(self, other: "DuplicateIndex"):
+        """Добавляет ключи другого индекса (например, пакета импорта)."""
+        for table, other_table in ((self._exact, other._exact), (self._near, other._near)):
+            for key, count in other_table.items():
+                table[key] = table.get(key, 0) + count
+
+    @classmethod
+    def from_columns(cls, amounts, date_ordinals, category_ids, comment_ids,
+                     categories, comments) -> "DuplicateIndex":
+        """
+        Строит индекс по колонкам хранилища: хеши считаются векторно,
+        нормализуются только уникальные категории и комментарии.
+        """
+        import numpy as np
+
+        index = cls()
+        if not len(amounts):
+            return index
+        kopecks = np.rint(np.frombuffer(amounts, dtype=np.float64) * 100).astype(np.int64)
+        days = np.frombuffer(date_ordinals, dtype=np.int32).astype(np.int64)
+        category_hashes = np.array([_text_hash(c.name) for c in categories], dtype=np.uint64)
+        comment_hashes = np.array([_text_hash(c) for c in comments], dtype=np.uint64)
+        row_categories = category_hashes[np.frombuffer(category_ids, dtype=np.int32)]
+        row_comments = comment_hashes[np.frombuffer(comment_ids, dtype=np.int32)]
+
+        for table, keys in (
+            (index._exact, _combine_arrays(days, kopecks, row_categories, row_comments)),
+            (index._near, _combine_arrays(days, kopecks, row_categories)),
+        ):
+            uniques, counts = np.unique(keys, return_counts=True)
+            table.update(zip(uniques.tolist(), counts.tolist()))
+        return index
+
+    # --- Поиск ---
+
+    def count(self, key: int) -> int:
+        """Число операций с ключом key (см. key())."""
+        return self._exact.get(key, 0)
+
+    def is_duplicate(self, amount: float, category_name: str, day: date, comment: str = "") -> bool:
+        """Есть ли уже операция с теми же датой, суммой, категорией и комментарием."""
+        return self.key(amount, category_name, day.toordinal(), comment) in self._exact
+
+    def near_duplicates(self, amount: float, category_name: str, day: date,
+                        window: int = NEAR_WINDOW_DAYS) -> list:
+        """
+        Даты в окне ±window дней, на которые уже есть операции с той же
+        суммой и категорией (комментарий не учитывается).
+        """
+        category_hash = _text_hash(category_name)
+        kopecks = to_kopecks(amount)
+        ordinal = day.toordinal()
+        return [
+            day + timedelta(days=offset)
+            for offset in range(-window, window + 1)
+            if self._near_key(kopecks, category_hash, ordinal + offset) in self._near
+        ]
@@ -0,0 +1,158 @@
+"""
+Прогноз денежного потока по повторяющимся операциям.
+
+Правила models.RecurringTransaction разворачиваются в даты повторений
+арифметикой над numpy-массивами (datetime64[M] для месяцев и лет, шаг в
+днях для дней и недель) — без циклов по дням. Затем:
+    1. потоки каждого правила по дням — одна матрица (правила × дни, копейки);
+    2. сценарии «что если» — матрица множителей (сценарии × правила);
+    3. дневные потоки сценариев — их произведение, баланс — накопленная сумма.
+
+Прогноз на 30 лет с ежедневными правилами и десятками сценариев считается
+за миллисекунды.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from aggregates import to_kopecks
+from instrumentation import timed
+from models import RecurringTransaction
+
+_EPOCH = date(1970, 1, 1).toordinal()
+_MONTH_STEP = {"monthly": 1, "yearly": 12}
+_DAY_STEP = {"daily": 1, "weekly": 7}
+
+
+
+class Scenario:
+    """
+    Сценарий «что если».
+
+    Attributes:
+        name (str): Название сценария
+        factors (dict): Множители сумм правил: по имени категории или по типу
+            ("income"/"expense"); имя категории важнее типа. 0 исключает правило.
+        extra_rules (list): Правила, которые есть только в этом сценарии
+    """
+
+    def __init__(self, name: str, factors: dict = None, extra_rules=()):
+        self.name = name
+        self.factors = factors or {}
+        self.extra_rules = list(extra_rules)
+
+    def factor(self, rule: RecurringTransaction) -> float:
+        category = rule.category
+        return self.factors.get(category.name, self.factors.get(category.category_type, 1.0))
+
+
+
+class Forecast:
+    """
+    Результат прогноза.
+
+    Attributes:
+        dates (np.ndarray): Дни прогноза, datetime64[D]
+        names (list): Названия сценариев
+        balances (np.ndarray): Баланс на конец каждого дня (сценарии × дни), руб.
+    """
+
+    def __init__(self, dates, names, balances):
+        self.dates = dates
+        self.names = names
+        self.balances = balances
+
+    def final(self) -> dict:
+        """{сценарий: баланс на последний день}."""
+        return {name: float(row[-1]) for name, row in zip(self.names, self.balances)}
+
+    def lowest(self) -> dict:
+        """{сценарий: (минимальный баланс, дата)}."""
+        result = {}
+        for name, row in zip(self.names, self.balances):
+            i = int(np.argmin(row))
+            result[name] = (float(row[i]), self.dates[i].astype(object))
+        return result
+
+
+
+def occurrence_days(rule: RecurringTransaction, start: date, end: date) -> np.ndarray:
+    """Порядковые номера дней повторений правила в [start, end] (int64, по возрастанию)."""
+    first = max(rule.start, start).toordinal()
+    last = min(rule.end or end, end).toordinal()
+    origin = rule.start.toordinal()
+    if last < first:
+        return np.empty(0, dtype=np.int64)
+
+    if rule.frequency in _DAY_STEP:
+        step = _DAY_STEP[rule.frequency] * rule.interval
+        k = np.arange(-(-(first - origin) // step), (last - origin) // step + 1, dtype=np.int64)
+        return origin + k * step
+
+    # Месяцы считаются от января 1970 (как datetime64[M]); k-е повторение —
+    # месяц начала + k * шаг, с первого, который может попасть в [first, last]
+    step = _MONTH_STEP[rule.frequency] * rule.interval
+    month0 = (rule.start.year - 1970) * 12 + rule.start.month - 1
+    first_date, last_date = date.fromordinal(first), date.fromordinal(last)
+    first_month = (first_date.year - 1970) * 12 + first_date.month - 1
+    last_month = (last_date.year - 1970) * 12 + last_date.month - 1
+    k = np.arange(max(-(-(first_month - month0) // step), 0), (last_month - month0) // step + 1)
+    months = (month0 + k * step).astype("datetime64[M]")
+    month_starts = months.astype("datetime64[D]")
+    month_lengths = ((months + 1).astype("datetime64[D]") - month_starts).astype(np.int64)
+    days = month_starts.astype(np.int64) + np.minimum(rule.start.day, month_lengths) - 1 + _EPOCH
+    return days[(days >= first) & (days <= last)]
+
+
+@timed()
+def project(rules, start: date, end: date, start_balance: float = 0.0, scenarios=None) -> Forecast:
+    """
+    Прогноз баланса на каждый день [start, end] для набора сценариев.
+
+    Параметры:
+        rules: повторяющиеся операции, общие для всех сценариев
+        start_balance: баланс на начало дня start, руб.
+        scenarios: список Scenario (по умолчанию один «Базовый» без изменений)
+    """
+    if end < start:
+        raise ValueError("Конец прогноза раньше начала")
+    scenarios = scenarios or [Scenario("Базовый")]
+    rules = list(rules)
+    owners = [None] * len(rules)
+    for scenario in scenarios:
+        rules += scenario.extra_rules
+        owners += [scenario] * len(scenario.extra_rules)
+
+    n_days = end.toordinal() - start.toordinal() + 1
+    # Потоки правил по дням (правила × дни), копейки
+    flows = np.zeros((len(rules), n_days))
+    for i, rule in enumerate(rules):
+        offsets = occurrence_days(rule, start, end) - start.toordinal()
+        flows[i] = np.bincount(offsets, minlength=n_days) * rule.kopecks
+
+    # Множители сценариев (сценарии × правила); чужие дополнительные правила — 0
+    factors = np.array([
+        [scenario.factor(rule) if owner is None or owner is scenario else 0.0
+         for rule, owner in zip(rules, owners)]
+        for scenario in scenarios
+    ]).reshape(len(scenarios), len(rules))
+
+    daily = np.rint(factors @ flows)
+    balances = (to_kopecks(start_balance) + np.cumsum(daily, axis=1)) / 100
+    dates = np.datetime64(start, "D") + np.arange(n_days)
+    return Forecast(dates, [scenario.name for scenario in scenarios], balances)
+
+
+def project_ledger(transactions, rules, days: int = 365, scenarios=None, today: date = None) -> Forecast:
+    """
+    Прогноз от текущего баланса журнала на days дней вперёд — с завтрашнего
+    дня или со дня после последней операции, если она позже.
+    """
+    from store import TransactionStore
+
+    store = TransactionStore.from_transactions(transactions)
+    start = (today or date.today()) + timedelta(days=1)
+    if store.rollup:
+        start = max(start, store.rollup.last_day() + timedelta(days=1))
+    return project(rules, start, start + timedelta(days=days - 1),
+                   float(store.totals.balance), scenarios)
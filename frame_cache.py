@@ -0,0 +1,119 @@
+"""
+Общий кэш DataFrame и сводок для analysis.py и visualization.py.
+
+Для каждого TransactionStore хранится один набор представлений: сам
+DataFrame и сводки по дням и категориям (итоги за период и помесячные
+ряды считаются по индексу сводок rollup.RollupIndex). Набор привязан к
+номеру поколения хранилища (TransactionStore.generation) и строится
+заново только после изменения данных; каждое представление считается
+лениво, при первом обращении.
+
+Представления общие — вызывающий код не должен изменять их на месте.
+
+Кэш не продлевает жизнь хранилищ: ключ — слабая ссылка, а набор держит
+хранилище тоже через weakref. Хранилище (вместе с буферами снимка)
+освобождается, как только на него не остаётся других ссылок.
+"""
+import weakref
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from store import TransactionStore
+
+_cache = weakref.WeakKeyDictionary()   # TransactionStore -> FrameSet
+
+
+
+class FrameSet:
+    """
+    Представления одного поколения хранилища.
+
+    Attributes:
+        generation (int): Поколение хранилища, по которому построен набор
+    """
+
+    def __init__(self, store: TransactionStore, owned: bool = False):
+        # Набор из кэша ссылается на хранилище слабо: сильная ссылка из
+        # значения WeakKeyDictionary на ключ не дала бы удалить запись.
+        # owned — хранилище создано для этого набора (из списка) и в кэш
+        # не попадает, его держит сам набор.
+        self._owned = store if owned else None
+        self._store_ref = weakref.ref(store)
+        self.generation = store.generation
+
+    @property
+    def _store(self) -> TransactionStore:
+        store = self._store_ref()
+        if store is None:
+            raise ReferenceError("Хранилище набора представлений уже удалено")
+        return store
+
+    @cached_property
+    @timed("frame_cache.frame")
+    def frame(self) -> pd.DataFrame:
+        """Все операции: колонки Transaction.to_dict() + kopecks (int64)."""
+        df = self._store.to_dataframe()
+        df["kopecks"] = np.rint(df["amount"].to_numpy() * 100).astype(np.int64)
+        return df
+
+    @cached_property
+    @timed("frame_cache.daily")
+    def daily(self) -> pd.DataFrame:
+        """Доходы и расходы (по модулю, в копейках) по дням; индекс — дата."""
+        kopecks = self.frame["kopecks"]
+        return (
+            pd.DataFrame({
+                "date": self.frame["date"],
+                "income": kopecks.clip(lower=0),
+                "expense": (-kopecks).clip(lower=0),
+            })
+            .groupby("date").sum()
+        )
+
+    def by_name(self, by_id: pd.Series, sort: bool = True) -> pd.Series:
+        """Итоги по id категории -> итоги по имени (категории разных типов с одним именем складываются)."""
+        names = [c.name for c in self._store.categories]
+        return by_id.groupby([names[i] for i in by_id.index], sort=sort).sum()
+
+    @cached_property
+    @timed("frame_cache.by_category")
+    def by_category(self) -> pd.Series:
+        """Сумма операций по имени категории (по алфавиту)."""
+        return self.by_name(self.frame.groupby("category_id")["amount"].sum(), sort=True)
+
+    @cached_property
+    @timed("frame_cache.expense_by_category")
+    def expense_by_category(self) -> pd.Series:
+        """Расходы по модулю (в копейках) по категориям в порядке первого появления."""
+        expenses = self.frame[self.frame["kopecks"] < 0]
+        by_id = (-expenses["kopecks"]).groupby(expenses["category_id"], sort=False).sum()
+        return self.by_name(by_id, sort=False)
+
+
+
+def frames(transactions) -> FrameSet:
+    """
+    Возвращает кэшированный набор представлений для транзакций.
+
+    Для TransactionStore набор переиспользуется, пока не изменится
+    поколение хранилища; для обычного списка строится заново и не кэшируется.
+    """
+    if not isinstance(transactions, TransactionStore):
+        return FrameSet(TransactionStore.from_transactions(transactions), owned=True)
+    store = transactions
+    cached = _cache.get(store)
+    if cached is None or cached.generation != store.generation:
+        cached = FrameSet(store)
+        _cache[store] = cached
+    return cached
+
+
+def invalidate(transactions=None):
+    """Сбрасывает кэш для хранилища (или целиком, если оно не указано)."""
+    if transactions is None:
+        _cache.clear()
+    else:
+        _cache.pop(transactions, None)
@@ -3,14 +3,52 @@
 Реализует: ввод транзакций, отображение списка, анализ и визуализацию.
 """
 import tkinter as tk
-from tkinter import messagebox, ttk
-from models import Transaction, Category
-from storage import load_transactions, save_transactions
-from analysis import get_category_summary, plot_income_expense, plot_category_pie
+from tkinter import filedialog, messagebox, ttk
+from models import Transaction, intern_category
+from storage import CsvBackend, RELOADED
+from store import TransactionStore
 from utils import is_valid_date, format_currency
+from instrumentation import timed
 from datetime import datetime, date
-import pandas as pd
-from visualization import plot_income_expense, plot_category_pie, plot_top_expenses
+import importlib
+import shutil
+import threading
+import visualization
+from virtual_table import VirtualTable
+from render_scheduler import ChartScheduler, RenderCache
+from budgets import Budget, BudgetMonitor
+
+# Тяжёлые модули (pandas, matplotlib, seaborn) не импортируются при запуске:
+# после появления окна они загружаются в фоновом потоке, чтобы первый
+# график или анализ не ждал импорта.
+PRELOAD_MODULES = ("pandas", "matplotlib.pyplot", "seaborn", "frame_cache", "search")
+PRELOAD_DELAY_MS = 500
+
+# Пакет импорта выписки за один шаг главного цикла
+IMPORT_BATCH_SIZE = 2_000
+
+# Интервал проверки журнала на записи других процессов, мс
+LEDGER_POLL_MS = 1000
+
+# Правила знака суммы в диалоге импорта: подпись -> ImportMapping.sign
+IMPORT_SIGN_LABELS = {
+    "Доход «+», расход «−»": "signed",
+    "Расход «+», доход «−»": "inverted",
+    "Колонки дебета и кредита": "debit_credit",
+}
+
+# Графики кнопки «Сохранить все графики»: (имя из visualization.CHARTS, файл, опции)
+SAVED_CHARTS = (
+    ("income_expense", "income_expense.png", {}),
+    ("category_pie", "category_pie.png", {}),
+    ("top_expenses", "top_expenses.png", {"top_n": 5}),
+)
+
+# Период бюджета: подпись -> budgets.Budget.period
+BUDGET_PERIOD_LABELS = {"Месяц": "monthly", "Неделя": "weekly"}
+
+# Фасет типа в поиске: подпись -> тип категории
+SEARCH_TYPE_LABELS = {"Все": None, "Доходы": "income", "Расходы": "expense"}
 
 
 
@@ -20,25 +58,42 @@ class FinanceApp:
 
     Attributes:
         root (tk.Tk): Главное окно приложения
-        transactions (list): Список транзакций (объектов Transaction)
+        backend (StorageBackend): Хранилище (по умолчанию CSV-файл)
+        transactions (TransactionStore): Колоночное хранилище транзакций
+        table (VirtualTable): Виртуальная таблица транзакций
         tree (ttk.Treeview): Виджет таблицы для отображения транзакций
         balance_label (tk.Label): Метка для отображения баланса
     """
 
-    def __init__(self, root):
+    def __init__(self, root, backend=None):
 
         self.root = root
+        self.backend = backend or CsvBackend()
         self.root.title("Финансовый планировщик")
         self.root.geometry("1000x700")
         self.root.configure(bg="#f0f0f0")
 
         # Загрузка данных
         try:
-            self.transactions = load_transactions()
+            self.transactions = self.backend.load()
             print(f"[INFO] Загружено {len(self.transactions)} операций")
         except Exception as e:
             messagebox.showerror("Ошибка загрузки", f"Не удалось загрузить транзакции: {e}")
-            self.transactions = []
+            self.transactions = self.backend.transactions = TransactionStore()
+
+        self.date_filter = None      # (начало, конец) периода в таблице или None
+        self.search_query = None     # search.SearchQuery без периода или None
+        self._import_steps = None    # генератор идущего импорта выписки
+        self._import_start = 0       # число строк хранилища до начала импорта
+
+        # Лимиты расходов; потраченное берётся из индекса сводок хранилища
+        self.budget_monitor = BudgetMonitor(self.backend.load_budgets())
+
+        # Отрисовка графиков в фоновых процессах и кэш готовых картинок
+        self.scheduler = ChartScheduler(self.root)
+        self.chart_cache = RenderCache()
+        self._rendering = {}         # ключ кэша -> (хранилище, обработчики) рисуемого графика
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Создание интерфейса
         self.create_widgets()
@@ -46,6 +101,11 @@ class FinanceApp:
         self.refresh_transactions_list()
         self.update_balance()
 
+        # Предзагрузка библиотек графиков, когда окно уже на экране
+        self.root.after(PRELOAD_DELAY_MS, self.preload_modules)
+        # Операции, которые дописывают в журнал другие процессы
+        self.root.after(LEDGER_POLL_MS, self.poll_ledger)
+
     def create_widgets(self):
         """Создаёт все элементы интерфейса."""
         # Заголовок
@@ -77,6 +137,29 @@ class FinanceApp:
         self.comment_entry = tk.Entry(self.root, width=40, font=("Arial", 10))
         self.comment_entry.grid(row=4, column=1, columnspan=4, padx=5, pady=5, sticky="ew")
 
+        # Импорт банковской выписки
+        self.import_btn = tk.Button(
+            self.root,
+            text="Импорт выписки",
+            command=self.open_import_dialog,
+            bg="#607D8B",
+            fg="white",
+            font=("Arial", 10, "bold"),
+            width=15
+        )
+        self.import_btn.grid(row=1, column=4, columnspan=2, pady=5, padx=10)
+
+        budgets_btn = tk.Button(
+            self.root,
+            text="Бюджеты",
+            command=self.open_budgets_dialog,
+            bg="#FF9800",
+            fg="white",
+            font=("Arial", 10, "bold"),
+            width=15
+        )
+        budgets_btn.grid(row=2, column=4, columnspan=2, pady=5, padx=10)
+
         # Кнопка добавления
         add_btn = tk.Button(
             self.root,
@@ -112,25 +195,50 @@ class FinanceApp:
         )
         charts_btn.grid(row=5, column=4, columnspan=2, pady=15, padx=10)
 
-        # Таблица транзакций
-        columns = ("Сумма", "Категория", "Тип", "Дата", "Комментарий")
-        self.tree = ttk.Treeview(
-            self.root,
-            columns=columns,
-            show="headings",
-            height=15
-        )
-
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120, anchor="center")
-
-        self.tree.grid(row=6, column=0, columnspan=6, padx=15, pady=10, sticky="nsew")
+        # Фильтр по периоду и поиск
+        filter_frame = tk.Frame(self.root, bg="#f0f0f0")
+        filter_frame.grid(row=6, column=0, columnspan=6, padx=15, sticky="w")
+        period_row = tk.Frame(filter_frame, bg="#f0f0f0")
+        period_row.pack(anchor="w")
+        tk.Label(period_row, text="Период с:", bg="#f0f0f0").pack(side="left")
+        self.filter_from_entry = tk.Entry(period_row, width=12, font=("Arial", 10))
+        self.filter_from_entry.pack(side="left", padx=5)
+        tk.Label(period_row, text="по:", bg="#f0f0f0").pack(side="left")
+        self.filter_to_entry = tk.Entry(period_row, width=12, font=("Arial", 10))
+        self.filter_to_entry.pack(side="left", padx=5)
+        tk.Button(period_row, text="Показать", command=self.apply_date_filter).pack(side="left", padx=5)
+        tk.Button(period_row, text="Сбросить", command=self.reset_date_filter).pack(side="left")
+        self.period_label = tk.Label(period_row, text="", bg="#f0f0f0", fg="#555555")
+        self.period_label.pack(side="left", padx=15)
+
+        search_row = tk.Frame(filter_frame, bg="#f0f0f0")
+        search_row.pack(anchor="w", pady=(5, 0))
+        tk.Label(search_row, text="Поиск:", bg="#f0f0f0").pack(side="left")
+        self.search_entry = tk.Entry(search_row, width=20, font=("Arial", 10))
+        self.search_entry.pack(side="left", padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.apply_search())
+        self.search_type = ttk.Combobox(search_row, values=list(SEARCH_TYPE_LABELS),
+                                        state="readonly", width=9)
+        self.search_type.current(0)
+        self.search_type.pack(side="left", padx=5)
+        tk.Label(search_row, text="сумма от:", bg="#f0f0f0").pack(side="left")
+        self.search_min_entry = tk.Entry(search_row, width=9, font=("Arial", 10))
+        self.search_min_entry.pack(side="left", padx=5)
+        tk.Label(search_row, text="до:", bg="#f0f0f0").pack(side="left")
+        self.search_max_entry = tk.Entry(search_row, width=9, font=("Arial", 10))
+        self.search_max_entry.pack(side="left", padx=5)
+        tk.Button(search_row, text="Найти", command=self.apply_search).pack(side="left", padx=5)
+        tk.Button(search_row, text="Сбросить", command=self.reset_search).pack(side="left")
+        self.search_label = tk.Label(search_row, text="", bg="#f0f0f0", fg="#555555")
+        self.search_label.pack(side="left", padx=15)
+
+        # Таблица транзакций (виртуальная: в Treeview только видимые строки)
+        self.table = VirtualTable(self.root, self.transactions, height=15)
+        self.tree = self.table.tree
+        self.tree.grid(row=7, column=0, columnspan=6, padx=15, pady=10, sticky="nsew")
 
         # Полоса прокрутки
-        scrollbar = ttk.Scrollbar(self.root, orient="vertical", command=self.tree.yview)
-        scrollbar.grid(row=6, column=6, sticky="ns", padx=(0, 10), pady=10)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.table.scrollbar.grid(row=7, column=6, sticky="ns", padx=(0, 10), pady=10)
 
         # Баланс
         self.balance_label = tk.Label(
@@ -140,13 +248,18 @@ class FinanceApp:
             bg="#f0f0f0",
             fg="#1976D2"
         )
-        self.balance_label.grid(row=7, column=0, columnspan=6, pady=15)
+        self.balance_label.grid(row=8, column=0, columnspan=6, pady=15)
+
+        # Строка состояния (ход фоновых задач)
+        self.status_label = tk.Label(self.root, text="", bg="#f0f0f0", fg="#555555")
+        self.status_label.grid(row=9, column=0, columnspan=6, pady=(0, 10))
 
         # Адаптивность
-        self.root.grid_rowconfigure(6, weight=1)
+        self.root.grid_rowconfigure(7, weight=1)
         for i in range(6):
             self.root.grid_columnconfigure(i, weight=1)
 
+    @timed()
     def add_transaction(self):
         """Добавляет новую транзакцию после валидации."""
         try:
@@ -172,19 +285,23 @@ class FinanceApp:
             # 2. Определение типа операции
             transaction_type = "income" if amount > 0 else "expense"
 
-            # 3. Создание объектов
-            category = Category(category_name, transaction_type)
+            # 3. Создание объектов (категория — общий экземпляр из таблицы категорий)
+            category = intern_category(category_name, transaction_type)
             transaction = Transaction(amount, category, transaction_date, comment)
 
-            # 4. Добавление в список
-            self.transactions.append(transaction)
+            # 4. Проверка повторов по индексу хранилища (O(1))
+            if not self.confirm_not_duplicate(transaction):
+                return
 
-            # 5. Сохранение в файл
-            save_transactions(self.transactions)
+            # 5. Дозапись в хранилище (файл не переписывается целиком);
+            #    бэкенд добавляет операцию и в загруженный TransactionStore,
+            #    предварительно дочитав строки, дописанные другими процессами
+            before = len(self.transactions)
+            self.backend.append([transaction])
 
-            # 6. Обновление интерфейса
-            self.refresh_transactions_list()
-            self.update_balance()
+            # 6. Обновление интерфейса: в таблицу попадают только новые строки
+            #    (при активном фильтре или поиске — если они под них подходят)
+            self.show_backend_changes(len(self.backend.transactions) - before)
 
             # 7. Очистка полей ввода
             self.amount_entry.delete(0, tk.END)
@@ -197,15 +314,35 @@ class FinanceApp:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Произошла непредвиденная ошибка: {e}")
 
+    def confirm_not_duplicate(self, transaction) -> bool:
+        """
+        Предупреждает о точном повторе или об операции с той же суммой и
+        категорией в соседние дни; возвращает False, если добавление отменено.
+        """
+        if self.backend.is_duplicate(transaction):
+            return messagebox.askyesno(
+                "Повтор операции",
+                "Такая операция (дата, сумма, категория и комментарий) уже есть в журнале.\n"
+                "Добавить её ещё раз?")
+        nearby = self.backend.near_duplicates(transaction)
+        if nearby:
+            dates = ", ".join(day.isoformat() for day in nearby)
+            return messagebox.askyesno(
+                "Похожая операция",
+                f"Операция на ту же сумму в категории «{transaction.category.name}» "
+                f"уже есть: {dates}.\nДобавить новую?")
+        return True
+
+    @timed()
     def show_analysis(self):
         """Отображает анализ транзакций."""
         if not self.transactions:
             messagebox.showinfo("Анализ", "Нет данных для анализа.")
             return
 
-        income = sum(t.amount for t in self.transactions if t.amount > 0)
-        expense = sum(abs(t.amount) for t in self.transactions if t.amount < 0)
-        balance = income - expense
+        # Итоги считает бэкенд: по индексу хранилища или запросом SQL (SqliteBackend)
+        income, expense = self.backend.totals()
+        balance = round(income - expense, 2)
 
         report = (
             f"📊 АНАЛИЗ ФИНАНСОВ\n\n"
@@ -215,37 +352,232 @@ class FinanceApp:
         )
         messagebox.showinfo("Анализ данных", report)
 
+    def open_import_dialog(self):
+        """Выбор файла выписки и описание её формата."""
+        path = filedialog.askopenfilename(
+            title="Выписка банка", filetypes=[("CSV", "*.csv"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Импорт выписки")
+        dialog.configure(bg="#f0f0f0")
+        fields = [
+            ("Колонка даты:", "date"), ("Формат даты:", "%Y-%m-%d"),
+            ("Колонка суммы:", "amount"), ("Колонка дебета:", ""), ("Колонка кредита:", ""),
+            ("Колонка категории:", "category"), ("Колонка комментария:", "comment"),
+            ("Разделитель полей:", ","), ("Десятичный разделитель:", "."),
+        ]
+        values = []
+        for row, (label, default) in enumerate(fields):
+            tk.Label(dialog, text=label, bg="#f0f0f0").grid(row=row, column=0, padx=10, pady=3, sticky="e")
+            var = tk.StringVar(value=default)
+            tk.Entry(dialog, textvariable=var, width=25).grid(row=row, column=1, padx=10, pady=3)
+            values.append(var)
+        tk.Label(dialog, text="Знак суммы:", bg="#f0f0f0").grid(row=len(fields), column=0, padx=10, pady=3, sticky="e")
+        sign = ttk.Combobox(dialog, values=list(IMPORT_SIGN_LABELS), state="readonly", width=23)
+        sign.current(0)
+        sign.grid(row=len(fields), column=1, padx=10, pady=3)
+        skip_duplicates = tk.BooleanVar(value=True)
+        tk.Checkbutton(dialog, text="Пропускать операции, которые уже есть в журнале",
+                       variable=skip_duplicates, bg="#f0f0f0").grid(
+            row=len(fields) + 1, column=0, columnspan=2, padx=10, pady=3, sticky="w")
+
+        def start():
+            from importer import ImportMapping
+            (date_column, date_format, amount, debit, credit,
+             category, comment, delimiter, decimal) = (var.get().strip() for var in values)
+            try:
+                mapping = ImportMapping(
+                    amount=amount, date=date_column, category=category or None,
+                    comment=comment or None, date_format=date_format,
+                    sign=IMPORT_SIGN_LABELS[sign.get()], debit=debit or None, credit=credit or None,
+                    delimiter=delimiter or ",", decimal=decimal or "."
+                )
+            except ValueError as e:
+                messagebox.showerror("Ошибка", str(e), parent=dialog)
+                return
+            dialog.destroy()
+            self.start_import(path, mapping, "skip" if skip_duplicates.get() else "flag")
+
+        tk.Button(dialog, text="Импортировать", command=start, bg="#4CAF50", fg="white",
+                  font=("Arial", 10, "bold")).grid(row=len(fields) + 2, column=0, columnspan=2, pady=10)
+
+    def start_import(self, path, mapping, duplicates="skip"):
+        """
+        Запускает потоковый импорт: по одному пакету за шаг главного цикла,
+        окно остаётся отзывчивым, ход показывается в строке состояния.
+        Повторы уже имеющихся операций пропускаются или отмечаются в отчёте.
+        """
+        from importer import ImportReport, import_batches
+        self._import_report = ImportReport()
+        self._import_start = len(self.backend.transactions)
+        self._import_steps = import_batches(path, mapping, self.backend, IMPORT_BATCH_SIZE,
+                                            self._import_report, duplicates)
+        self.import_btn.config(state="disabled")
+        self.status_label.config(text="Импорт выписки: 0%")
+        self.root.after(1, self._import_step)
+
+    def _import_step(self):
+        try:
+            done, total, imported = next(self._import_steps)
+        except StopIteration:
+            self._finish_import(None)
+            return
+        except Exception as e:
+            self._finish_import(e)
+            return
+        self.status_label.config(
+            text=f"Импорт выписки: {done * 100 // max(total, 1)}%, операций: {imported}")
+        self.root.after(1, self._import_step)
+
+    def _finish_import(self, error):
+        self._import_steps = None
+        self.import_btn.config(state="normal")
+        self.status_label.config(text="")
+        self.date_filter = None
+        self.search_query = None
+        self.filter_from_entry.delete(0, tk.END)
+        self.filter_to_entry.delete(0, tk.END)
+        self.search_entry.delete(0, tk.END)
+        self.search_label.config(text="")
+        if self.backend.transactions is not self.transactions:
+            self.transactions = self.backend.transactions
+            self.chart_cache.clear()
+            alerts = []  # хранилище загружено заново: какие строки новые, неизвестно
+        else:
+            alerts = self.budget_monitor.check_rows(self.transactions, self._import_start)
+        self.refresh_transactions_list()
+        self.update_balance()
+        self.update_period_totals()
+        if error is not None:
+            messagebox.showerror("Ошибка импорта",
+                                 f"Импорт прерван: {error}\n\n{self._import_report.summary()}")
+        else:
+            messagebox.showinfo("Импорт выписки", self._import_report.summary())
+        self.show_budget_alerts(alerts)
+
+    def _parse_filter_date(self, entry):
+        text = entry.get().strip()
+        if not text:
+            return None
+        if not is_valid_date(text):
+            raise ValueError(f"Неверный формат даты: {text}. Используйте ГГГГ-ММ-ДД")
+        return datetime.strptime(text, "%Y-%m-%d").date()
+
+    def _current_query(self):
+        """Запрос для таблицы: поиск и период вместе (None — без фильтров)."""
+        from search import SearchQuery
+        query = self.search_query or SearchQuery()
+        query = SearchQuery(query.text, query.category_type, query.categories,
+                            query.min_amount, query.max_amount, *(self.date_filter or (None, None)))
+        return query if query else None
+
+    def _matches_filters(self, index: int) -> bool:
+        query = self._current_query()
+        return query is None or self.transactions.search_index.matches(query, index)
+
+    def _apply_filters(self):
+        """Показывает в таблице строки, подходящие под поиск и период."""
+        query = self._current_query()
+        if query is None:
+            self.table.set_rows(None)
+            self.search_label.config(text="")
+            return
+        result = self.transactions.search_index.search(query)
+        self.table.set_rows(result.rows.tolist())
+        if self.search_query is None:
+            self.search_label.config(text="")
+            return
+        top = sorted(result.facets()["category"].items(), key=lambda item: -item[1])[:3]
+        details = ", ".join(f"{name}: {n}" for name, n in top)
+        self.search_label.config(text=f"Найдено: {len(result)}" + (f" ({details})" if details else ""))
+
+    @timed()
+    def apply_date_filter(self):
+        """
+        Показывает в таблице только операции за период (вместе с условиями
+        поиска); итоги за период берутся из индекса сводок, без обхода журнала.
+        """
+        try:
+            start = self._parse_filter_date(self.filter_from_entry)
+            end = self._parse_filter_date(self.filter_to_entry)
+            if start is not None and end is not None and start > end:
+                raise ValueError("Начало периода позже его конца")
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+        if start is None and end is None:
+            self.reset_date_filter()
+            return
+
+        self.date_filter = (start, end)
+        self._apply_filters()
+        self.update_period_totals()
+
+    def reset_date_filter(self):
+        """Снимает фильтр по периоду."""
+        self.date_filter = None
+        self.filter_from_entry.delete(0, tk.END)
+        self.filter_to_entry.delete(0, tk.END)
+        self._apply_filters()
+        self.update_period_totals()
+
+    @timed()
+    def apply_search(self):
+        """
+        Поиск по словам комментария и категории с фасетами типа и суммы
+        (search.SearchIndex); результат сразу показывается в таблице.
+        """
+        from search import SearchQuery
+        try:
+            bounds = []
+            for entry in (self.search_min_entry, self.search_max_entry):
+                text = entry.get().strip().replace(",", ".")
+                bounds.append(float(text) if text else None)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Границы суммы должны быть числами")
+            return
+        query = SearchQuery(self.search_entry.get(), SEARCH_TYPE_LABELS[self.search_type.get()],
+                            min_amount=bounds[0], max_amount=bounds[1])
+        self.search_query = query if query else None
+        self._apply_filters()
+
+    def reset_search(self):
+        """Снимает условия поиска (период остаётся)."""
+        self.search_query = None
+        self.search_entry.delete(0, tk.END)
+        self.search_type.current(0)
+        self.search_min_entry.delete(0, tk.END)
+        self.search_max_entry.delete(0, tk.END)
+        self._apply_filters()
+
+    def update_period_totals(self):
+        """Обновляет итоги за выбранный период."""
+        if self.date_filter is None:
+            self.period_label.config(text="")
+            return
+        income, expense = self.backend.totals(*self.date_filter)
+        self.period_label.config(
+            text=f"За период: доходы {income:,.2f}, расходы {expense:,.2f}, "
+                 f"итого {income - expense:,.2f} руб."
+        )
+
+    @timed()
     def refresh_transactions_list(self):
-        """Обновляет таблицу транзакций, отображая актуальные данные."""
-        # Очищаем все строки таблицы
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Заполняем таблицу данными
-        for transaction in self.transactions:
-            amount_str = f"{transaction.amount:,.2f}"
-            category_name = transaction.category.name
-            transaction_type = transaction.category.category_type
-            date_str = transaction.date.strftime("%Y-%m-%d")
-            comment = transaction.comment or ""
-
-            # Добавляем строку в таблицу
-            self.tree.insert("", "end", values=(
-                amount_str,
-                category_name,
-                transaction_type,
-                date_str,
-                comment
-            ))
+        """
+        Обновляет таблицу транзакций, отображая актуальные данные.
 
+        Перерисовываются только видимые строки, поэтому стоимость не зависит
+        от размера журнала.
+        """
+        self.table.set_transactions(self.transactions)
+
+    @timed()
     def update_balance(self):
         """Обновляет отображение баланса в интерфейсе."""
-        if not self.transactions:
-            balance = 0.0
-        else:
-            income = sum(t.amount for t in self.transactions if t.amount > 0)
-            expense = sum(abs(t.amount) for t in self.transactions if t.amount < 0)
-            balance = income - expense
+        balance = self.transactions.totals.balance
 
         balance_str = f"{balance:,.2f}"
         self.balance_label.config(text=f"Баланс: {balance_str} руб.")
@@ -259,7 +591,7 @@ class FinanceApp:
         # Окно выбора
         chart_window = tk.Toplevel(self.root)
         chart_window.title("Выбор графика")
-        chart_window.geometry("400x300")
+        chart_window.geometry("400x340")
         chart_window.configure(bg="#f0f0f0")
 
         tk.Label(chart_window, text="Выберите график:", bg="#f0f0f0", font=("Arial", 12)).pack(pady=10)
@@ -268,6 +600,7 @@ class FinanceApp:
             ("Доходы и расходы по времени", self.plot_income_expense),
             ("Круговая диаграмма расходов", self.plot_category_pie),
             ("Топ-5 расходов по категориям", self.plot_top_expenses),
+            ("Прогноз баланса (Монте-Карло)", self.plot_simulation),
         ]
 
         for text, cmd in options:
@@ -295,20 +628,293 @@ class FinanceApp:
         save_btn.pack(pady=10)
 
     def plot_income_expense(self):
-        plot_income_expense(self.transactions)
+        self.show_chart("income_expense", "Доходы и расходы по времени")
 
     def plot_category_pie(self):
-        plot_category_pie(self.transactions)
+        self.show_chart("category_pie", "Круговая диаграмма расходов")
 
     def plot_top_expenses(self):
-        plot_top_expenses(self.transactions, top_n=5)
+        self.show_chart("top_expenses", "Топ-5 расходов по категориям", top_n=5)
+
+    def plot_simulation(self):
+        self.show_chart("simulation", "Прогноз баланса (Монте-Карло)")
+
+    def render_cached(self, name, on_ready, **options):
+        """
+        Готовит PNG графика: из кэша, если данные хранилища не менялись,
+        иначе данные собираются здесь, а отрисовка идёт в фоновом процессе.
+
+        Параметры:
+            name: ключ из visualization.CHARTS
+            on_ready: on_ready(путь, ошибка) в потоке Tk; путь None без ошибки —
+                      нет данных для графика
+
+        Запрос графика, который уже рисуется с теми же данными и опциями,
+        не ставит новую задачу, а дожидается идущей.
+        """
+        key = RenderCache.key(name, self.transactions.generation, options)
+        path = self.chart_cache.get(key)
+        if path is not None:
+            on_ready(path, None)
+            return
+        store = self.transactions
+        rendering = self._rendering.get(key)
+        # После перезагрузки хранилища поколения начинаются заново: ключ
+        # совпадает, но график старого хранилища не подходит
+        if rendering is not None and rendering[0] is store:
+            rendering[1].append(on_ready)
+            return
+        prepare, _ = visualization.CHARTS[name]
+        data = prepare(self.backend)
+        target = self.chart_cache.path_for(key)
+        rendering = self._rendering[key] = (store, [on_ready])
+
+        def done(result, error):
+            if self._rendering.get(key) is rendering:
+                del self._rendering[key]
+            if error is None and result is not None and self.transactions is store:
+                self.chart_cache.put(key, target)
+            for ready in rendering[1]:
+                ready(result, error)
+
+        self.scheduler.submit(name, data, target, done, **options)
+
+    def show_chart(self, name, title, **options):
+        """Показывает график в окне; повторное открытие без изменений данных мгновенно."""
+        def ready(path, error):
+            self.status_label.config(text="")
+            if error is not None:
+                messagebox.showerror("Ошибка", f"Не удалось построить график: {error}")
+            elif path is not None:
+                self._open_chart_window(title, path)
+
+        self.status_label.config(text=f"Построение графика: {title}")
+        try:
+            self.render_cached(name, ready, dpi=visualization.DISPLAY_DPI, **options)
+        except Exception as e:
+            ready(None, e)
 
+    def _open_chart_window(self, title, path):
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        image = tk.PhotoImage(file=path)
+        label = tk.Label(window, image=image, bg="white")
+        label.image = image  # ссылка, иначе картинку удалит сборщик мусора
+        label.pack()
+
+    @timed()
     def save_all_charts(self):
-        """Сохраняет все графики в файлы."""
+        """
+        Сохраняет все графики в файлы.
+
+        Данные готовятся здесь (это агрегаты хранилища), а графики рисуются
+        параллельно в фоновых процессах — окно не зависает. Если данные не
+        менялись с прошлого сохранения, файлы копируются из кэша.
+        """
+        total = len(SAVED_CHARTS)
+        finished = 0
+        errors = []
+
+        def saver(file_name):
+            def ready(path, error):
+                nonlocal finished
+                finished += 1
+                try:
+                    if error is not None:
+                        errors.append(error)
+                    elif path is not None:
+                        shutil.copyfile(path, file_name)
+                        print(f"График сохранён: {file_name}")
+                except OSError as e:
+                    errors.append(e)
+                self._on_charts_progress(finished, total)
+                if finished == total:
+                    self._on_charts_saved(errors)
+            return ready
+
         try:
-            plot_income_expense(self.transactions, "income_expense.png")
-            plot_category_pie(self.transactions, "category_pie.png")
-            plot_top_expenses(self.transactions, "top_expenses.png", top_n=5)
+            self.status_label.config(text=f"Сохранение графиков: 0 из {total}")
+            for name, file_name, options in SAVED_CHARTS:
+                self.render_cached(name, saver(file_name), dpi=visualization.SAVE_DPI, **options)
+        except Exception as e:
+            self.status_label.config(text="")
+            messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить графики: {e}")
+
+    def _on_charts_progress(self, done, total):
+        self.status_label.config(text=f"Сохранение графиков: {done} из {total}")
+
+    def _on_charts_saved(self, errors):
+        self.status_label.config(text="")
+        if errors:
+            messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить графики: {errors[0]}")
+        else:
             messagebox.showinfo("Сохранение", "Все графики успешно сохранены!")
+
+    def poll_ledger(self):
+        """
+        Раз в LEDGER_POLL_MS подхватывает операции, дописанные в журнал
+        другими процессами (например, пакетным импортом). Без изменений
+        проверка стоит одного os.stat(); журнал не перечитывается целиком.
+        """
+        if self._import_steps is None:  # идущий импорт сам обновит окно
+            try:
+                self.show_backend_changes(self.backend.refresh())
+            except Exception as e:
+                print(f"[WARNING] Не удалось проверить журнал: {e}")
+        self.root.after(LEDGER_POLL_MS, self.poll_ledger)
+
+    def show_backend_changes(self, added: int):
+        """
+        Показывает изменения хранилища после append()/refresh(): добавляет
+        в таблицу новые строки или, если хранилище загружено заново,
+        перестраивает таблицу с текущими фильтрами.
+        """
+        if added == RELOADED or self.backend.transactions is not self.transactions:
+            self.transactions = self.backend.transactions
+            self.chart_cache.clear()  # поколения нового хранилища начинаются заново
+            self.table.set_transactions(self.transactions)
+            self._apply_filters()
+        elif added > 0:
+            for index in range(len(self.transactions) - added, len(self.transactions)):
+                if self._matches_filters(index):
+                    self.table.row_added(index)
+        else:
+            return
+        self.update_balance()
+        self.update_period_totals()
+        if added > 0:
+            self.show_budget_alerts(
+                self.budget_monitor.check_rows(self.transactions, len(self.transactions) - added))
+
+    def show_budget_alerts(self, alerts):
+        """Сообщает о пересечённых порогах бюджетов."""
+        if alerts:
+            messagebox.showwarning("Бюджет", "\n".join(alert.message() for alert in alerts))
+
+    def open_budgets_dialog(self):
+        """
+        Бюджеты: состояние в текущих периодах, добавление и удаление лимитов,
+        отчёт «бюджет против факта» за произвольный период.
+        """
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Бюджеты")
+        dialog.configure(bg="#f0f0f0")
+
+        columns = ("category", "period", "limit", "spent", "remaining")
+        tree = ttk.Treeview(dialog, columns=columns, show="headings", height=10)
+        for column, heading, width in zip(columns, ("Категория", "Период", "Лимит", "Потрачено", "Остаток"),
+                                          (150, 170, 100, 100, 100)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor="w" if column in ("category", "period") else "e")
+        tree.tag_configure("over", foreground="#D32F2F")
+        tree.grid(row=0, column=0, columnspan=6, padx=10, pady=10, sticky="nsew")
+        rows = {}  # id строки Treeview -> Budget
+
+        def show(statuses):
+            tree.delete(*tree.get_children())
+            rows.clear()
+            for status in statuses:
+                item = tree.insert("", tk.END, values=(
+                    status.budget.category.name,
+                    f"{status.start:%d.%m.%Y}–{status.end:%d.%m.%Y}",
+                    format_currency(status.budget.limit),
+                    format_currency(status.spent / 100),
+                    format_currency(status.remaining),
+                ), tags=("over",) if status.remaining < 0 else ())
+                rows[item] = status.budget
+
+        def show_current():
+            show(self.budget_monitor.current(self.transactions))
+
+        tk.Label(dialog, text="Категория:", bg="#f0f0f0").grid(row=1, column=0, padx=10, pady=3, sticky="e")
+        category_entry = tk.Entry(dialog, width=15)
+        category_entry.grid(row=1, column=1, pady=3, sticky="w")
+        tk.Label(dialog, text="Лимит (руб.):", bg="#f0f0f0").grid(row=1, column=2, padx=10, pady=3, sticky="e")
+        limit_entry = tk.Entry(dialog, width=10)
+        limit_entry.grid(row=1, column=3, pady=3, sticky="w")
+        period = ttk.Combobox(dialog, values=list(BUDGET_PERIOD_LABELS), state="readonly", width=8)
+        period.current(0)
+        period.grid(row=1, column=4, padx=10, pady=3)
+
+        def save(budgets):
+            self.backend.save_budgets(budgets)
+            self.budget_monitor.set_budgets(budgets)
+            show_current()
+
+        def add():
+            try:
+                name = category_entry.get().strip()
+                if not name:
+                    raise ValueError("Категория не может быть пустой")
+                budget = Budget(intern_category(name, "expense"), float(limit_entry.get().strip()),
+                                BUDGET_PERIOD_LABELS[period.get()])
+            except ValueError as e:
+                messagebox.showerror("Ошибка", str(e), parent=dialog)
+                return
+            # Один лимит на категорию и период: новый заменяет прежний
+            save([b for b in self.budget_monitor.budgets
+                  if (b.category, b.period) != (budget.category, budget.period)] + [budget])
+            category_entry.delete(0, tk.END)
+            limit_entry.delete(0, tk.END)
+
+        def remove():
+            selected = {id(rows[item]) for item in tree.selection()}
+            if selected:
+                save([b for b in self.budget_monitor.budgets if id(b) not in selected])
+
+        tk.Button(dialog, text="Добавить", command=add).grid(row=1, column=5, padx=10, pady=3)
+        tk.Button(dialog, text="Удалить выбранные", command=remove).grid(
+            row=2, column=4, columnspan=2, padx=10, pady=3, sticky="e")
+
+        report_row = tk.Frame(dialog, bg="#f0f0f0")
+        report_row.grid(row=3, column=0, columnspan=6, padx=10, pady=(5, 10), sticky="w")
+        tk.Label(report_row, text="Отчёт с:", bg="#f0f0f0").pack(side="left")
+        from_entry = tk.Entry(report_row, width=12)
+        from_entry.pack(side="left", padx=5)
+        tk.Label(report_row, text="по:", bg="#f0f0f0").pack(side="left")
+        to_entry = tk.Entry(report_row, width=12)
+        to_entry.pack(side="left", padx=5)
+
+        def show_report():
+            try:
+                start, end = self._parse_filter_date(from_entry), self._parse_filter_date(to_entry)
+                if start is None or end is None:
+                    raise ValueError("Укажите обе границы периода")
+                if start > end:
+                    raise ValueError("Начало периода позже конца")
+            except ValueError as e:
+                messagebox.showerror("Ошибка", str(e), parent=dialog)
+                return
+            show(self.budget_monitor.report(self.transactions, start, end))
+
+        tk.Button(report_row, text="Показать", command=show_report).pack(side="left", padx=5)
+        tk.Button(report_row, text="Текущие периоды", command=show_current).pack(side="left")
+
+        dialog.grid_rowconfigure(0, weight=1)
+        dialog.grid_columnconfigure(1, weight=1)
+        show_current()
+
+    def preload_modules(self):
+        """
+        Загружает PRELOAD_MODULES и строит индекс поиска в фоновом потоке
+        (первый поиск не ждёт индексации журнала).
+        """
+        def preload():
+            for name in PRELOAD_MODULES:
+                try:
+                    importlib.import_module(name)
+                except Exception as e:
+                    print(f"[WARNING] Не удалось предзагрузить {name}: {e}")
+                    return
+            self.transactions.search_index.refresh()
+        threading.Thread(target=preload, name="preload", daemon=True).start()
+
+    def on_close(self):
+        """Останавливает фоновые задачи, сохраняет служебные индексы и закрывает окно."""
+        self.scheduler.shutdown()
+        self.chart_cache.close()
+        try:
+            self.backend.close()
         except Exception as e:
-            messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить графики: {e}")
\ No newline at end of file
+            print(f"[ERROR] Ошибка при закрытии хранилища: {e}")
+        self.root.destroy()
\ No newline at end of file
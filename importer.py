@@ -0,0 +1,379 @@
+"""
+Потоковый импорт банковских выписок (CSV).
+
+Файл читается построчно через цепочку генераторов:
+    _lines()       — строки файла и число прочитанных байт (для прогресса);
+    parse_rows()   — разбор колонок по ImportMapping и проверка по правилам
+                     models.Transaction / utils.is_valid_date;
+    _skip_duplicates() — отсев операций, уже имеющихся в журнале
+                     (DuplicateIndex хранилища, O(1) на строку);
+    _batches()     — пакеты по batch_size операций.
+Пакеты передаются в бэкенд хранилища (append), поэтому в памяти
+импортёра одновременно находится не больше одного пакета — независимо
+от размера файла.
+
+import_batches() — генератор, который после каждого пакета отдаёт
+прогресс; GUI продвигает его по одному шагу через root.after(), окно не
+блокируется. import_statement() выполняет импорт целиком.
+
+Запуск из командной строки:
+    python importer.py выписка.csv --date-column "Дата операции" --date-format %d.%m.%Y \\
+        --amount-column "Сумма" --category-column "Категория" --sign inverted --delimiter ";"
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+from models import Transaction, intern_category
+from utils import is_valid_date
+
+BATCH_SIZE = 5_000
+
+# Сколько ошибочных строк хранить в отчёте с примерами
+MAX_ERROR_EXAMPLES = 20
+
+SIGN_CONVENTIONS = ("signed", "inverted", "debit_credit", "type_column")
+
+# Что делать с операциями, которые уже есть в журнале:
+# пропускать, импортировать с отметкой в отчёте или не проверять
+DUPLICATE_MODES = ("skip", "flag", "keep")
+
+
+
+class ImportMapping:
+    """
+    Описание формата выписки.
+
+    Attributes:
+        amount (str): Колонка суммы (для sign="debit_credit" не используется)
+        date (str): Колонка даты
+        category (str): Колонка категории (None — всем строкам default_category)
+        comment (str): Колонка комментария (None — без комментария)
+        date_format (str): Формат даты для datetime.strptime
+        sign (str): Правило знака суммы:
+            "signed" — доход положительный, расход отрицательный (как в журнале);
+            "inverted" — расход положительный (списание), доход отрицательный;
+            "debit_credit" — две колонки: debit (расход) и credit (доход);
+            "type_column" — сумма по модулю, знак по колонке type_column
+                            (значения из income_values — доход, иначе расход)
+        debit, credit (str): Колонки расхода и дохода для sign="debit_credit"
+        type_column (str): Колонка вида операции для sign="type_column"
+        income_values (tuple): Значения type_column, означающие доход
+        delimiter (str): Разделитель полей
+        decimal (str): Десятичный разделитель сумм ("." или ",")
+        encoding (str): Кодировка файла
+        category_map (dict): Переименование категорий банка в категории журнала
+        default_category (str): Категория для строк без категории
+    """
+
+    def __init__(self, amount: str = "amount", date: str = "date", category: str = "category",
+                 comment: str = None, date_format: str = "%Y-%m-%d", sign: str = "signed",
+                 debit: str = None, credit: str = None, type_column: str = None,
+                 income_values=("income",), delimiter: str = ",", decimal: str = ".",
+                 encoding: str = "utf-8-sig", category_map: dict = None,
+                 default_category: str = "Прочее"):
+        if sign not in SIGN_CONVENTIONS:
+            raise ValueError(f"Неизвестное правило знака: {sign}")
+        if sign == "debit_credit" and not (debit and credit):
+            raise ValueError("Для правила debit_credit нужны колонки debit и credit")
+        if sign == "type_column" and not type_column:
+            raise ValueError("Для правила type_column нужна колонка type_column")
+        self.amount = amount
+        self.date = date
+        self.category = category
+        self.comment = comment
+        self.date_format = date_format
+        self.sign = sign
+        self.debit = debit
+        self.credit = credit
+        self.type_column = type_column
+        self.income_values = {value.strip().lower() for value in income_values}
+        self.delimiter = delimiter
+        self.decimal = decimal
+        self.encoding = encoding
+        self.category_map = category_map or {}
+        self.default_category = default_category
+
+    def required_columns(self) -> list:
+        columns = [self.date]
+        if self.sign == "debit_credit":
+            columns += [self.debit, self.credit]
+        else:
+            columns.append(self.amount)
+        if self.sign == "type_column":
+            columns.append(self.type_column)
+        for optional in (self.category, self.comment):
+            if optional:
+                columns.append(optional)
+        return columns
+
+
+
+class ImportReport:
+    """
+    Итоги импорта: прочитано, импортировано, отклонено строк.
+
+    Хранит не больше MAX_ERROR_EXAMPLES примеров ошибок, поэтому его размер
+    не зависит от размера файла.
+    """
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.rows_duplicate = 0
+        self.errors = []          # [(номер строки файла, причина)]
+        self.duplicates = []      # [описание операции]
+
+    def reject(self, line_number: int, reason: str):
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_ERROR_EXAMPLES:
+            self.errors.append((line_number, reason))
+
+    def duplicate(self, transaction):
+        self.rows_duplicate += 1
+        if len(self.duplicates) < MAX_ERROR_EXAMPLES:
+            self.duplicates.append(f"{transaction.date.isoformat()} {transaction.amount:.2f} "
+                                   f"{transaction.category.name}")
+
+    def summary(self) -> str:
+        text = (f"Прочитано строк: {self.rows_read}, импортировано: {self.rows_imported}, "
+                f"отклонено: {self.rows_rejected}")
+        if self.rows_duplicate:
+            text += f", повторов: {self.rows_duplicate} ({'; '.join(self.duplicates[:5])})"
+        if self.errors:
+            examples = "; ".join(f"строка {line}: {reason}" for line, reason in self.errors[:5])
+            text += f". Примеры ошибок: {examples}"
+        return text
+
+
+# --- Этапы конвейера ---
+
+def _lines(path: str, encoding: str, progress: list):
+    """
+    Строки файла по одной; progress[0] — число прочитанных байт.
+
+    Файл читается в двоичном режиме, чтобы позиция была известна и во
+    время итерации (для индикатора хода импорта).
+    """
+    with open(path, "rb") as f:
+        for raw in f:
+            progress[0] += len(raw)
+            yield raw.decode(encoding)
+
+
+def _parse_amount(text: str, decimal: str) -> float:
+    text = text.strip().replace("\u00a0", "").replace(" ", "")
+    if decimal != ".":
+        text = text.replace(".", "").replace(decimal, ".")
+    return float(text) if text else 0.0
+
+
+def _signed_amount(row: dict, mapping: ImportMapping) -> float:
+    if mapping.sign == "debit_credit":
+        credit = _parse_amount(row[mapping.credit] or "", mapping.decimal)
+        debit = _parse_amount(row[mapping.debit] or "", mapping.decimal)
+        amount = abs(credit) - abs(debit)
+    else:
+        amount = _parse_amount(row[mapping.amount] or "", mapping.decimal)
+        if mapping.sign == "inverted":
+            amount = -amount
+        elif mapping.sign == "type_column":
+            is_income = (row[mapping.type_column] or "").strip().lower() in mapping.income_values
+            amount = abs(amount) if is_income else -abs(amount)
+    # float() принимает "inf" и "nan"; такие суммы не переводятся в копейки
+    if not math.isfinite(amount):
+        raise ValueError(f"неверная сумма {amount}")
+    return amount
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(text: str, date_format: str):
+    # В выписке мало различных дат: разбор кэшируется (кэш ограничен)
+    text = text.strip()
+    # Формат журнала проверяется тем же правилом, что и ввод в окне
+    if date_format == "%Y-%m-%d" and not is_valid_date(text):
+        raise ValueError(f"неверная дата {text!r}")
+    return datetime.strptime(text, date_format).date()
+
+
+def parse_rows(lines, mapping: ImportMapping, report: ImportReport):
+    """
+    Разбирает строки выписки и отдаёт проверенные Transaction.
+
+    Отклонённые строки попадают в report, импорт продолжается.
+    """
+    reader = csv.DictReader(lines, delimiter=mapping.delimiter)
+    if reader.fieldnames is None:
+        raise ValueError("Файл пуст или не содержит заголовков")
+    missing = [column for column in mapping.required_columns() if column not in reader.fieldnames]
+    if missing:
+        raise ValueError(f"В файле нет колонок: {', '.join(missing)}")
+
+    for row in reader:
+        report.rows_read += 1
+        try:
+            amount = round(_signed_amount(row, mapping), 2)
+            transaction_date = _parse_date(row[mapping.date] or "", mapping.date_format)
+            name = (row[mapping.category] or "").strip() if mapping.category else ""
+            name = mapping.category_map.get(name, name) or mapping.default_category
+            comment = (row[mapping.comment] or "") if mapping.comment else ""
+            category = intern_category(name, "income" if amount > 0 else "expense")
+            yield Transaction(amount, category, transaction_date, comment)
+        except (ValueError, TypeError, OverflowError) as e:
+            # OverflowError — сумма, которая не помещается в копейки (например, 1e308)
+            report.reject(reader.line_num, str(e))
+
+
+def _skip_duplicates(transactions, index, mode: str, report: ImportReport):
+    """
+    Отмечает (mode="flag") или пропускает (mode="skip") операции, которые
+    уже есть в журнале.
+
+    Одинаковые строки внутри выписки (две одинаковые покупки за день)
+    повторами не считаются: k-е вхождение ключа — повтор, только если в
+    журнале до импорта было не меньше k таких операций. Живой индекс
+    пополняется строками выписки по мере записи пакетов, поэтому число
+    операций журнала берётся при первом появлении ключа в выписке, пока
+    ни одна строка с этим ключом не записана, и дальше хранится в remaining.
+
+    Индекс не копируется; remaining растёт с числом различных ключей
+    выписки так же, как сам индекс после записи её строк.
+    """
+    remaining = {}   # ключ -> сколько следующих вхождений ещё считать повторами
+    for t in transactions:
+        key = index.key(t.amount, t.category.name, t.date.toordinal(), t.comment or "")
+        left = remaining.get(key)
+        if left is None:
+            left = index.count(key)
+        remaining[key] = max(left - 1, 0)
+        if left:
+            report.duplicate(t)
+            if mode == "flag":
+                yield t
+            continue
+        yield t
+
+
+def _batches(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Импорт ---
+
+def import_batches(path: str, mapping: ImportMapping, backend, batch_size: int = BATCH_SIZE,
+                   report: ImportReport = None, duplicates: str = "keep"):
+    """
+    Импортирует выписку в бэкенд хранилища пакетами.
+
+    duplicates — режим проверки повторов (см. DUPLICATE_MODES). Режимы "skip"
+    и "flag" загружают журнал в память бэкенда ради индекса повторов;
+    с "keep" память импорта не зависит от размера журнала и выписки.
+
+    После каждого пакета отдаёт (прочитано байт, размер файла, импортировано операций).
+    """
+    if duplicates not in DUPLICATE_MODES:
+        raise ValueError(f"Неизвестный режим повторов: {duplicates}")
+    report = report if report is not None else ImportReport()
+    total = os.path.getsize(path)
+    progress = [0]
+    rows = parse_rows(_lines(path, mapping.encoding, progress), mapping, report)
+    if duplicates != "keep":
+        rows = _skip_duplicates(rows, backend.duplicate_index(), duplicates, report)
+    for batch in _batches(rows, batch_size):
+        backend.append(batch)
+        report.rows_imported += len(batch)
+        yield progress[0], total, report.rows_imported
+    yield total, total, report.rows_imported
+
+
+def import_statement(path: str, mapping: ImportMapping, backend, batch_size: int = BATCH_SIZE,
+                     on_progress=None, duplicates: str = "keep") -> ImportReport:
+    """
+    Импортирует выписку целиком.
+
+    Параметры:
+        on_progress: on_progress(прочитано байт, размер файла, импортировано операций)
+        duplicates: режим проверки повторов (см. DUPLICATE_MODES)
+    """
+    report = ImportReport()
+    for done, total, imported in import_batches(path, mapping, backend, batch_size, report,
+                                                duplicates):
+        if on_progress is not None:
+            on_progress(done, total, imported)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Импорт банковской выписки в журнал")
+    parser.add_argument("statement", help="CSV-файл выписки")
+    parser.add_argument("--ledger", default=None, help="журнал CSV (по умолчанию data/finances.csv)")
+    parser.add_argument("--db", metavar="PATH", help="импортировать в базу SQLite")
+    parser.add_argument("--amount-column", default="amount")
+    parser.add_argument("--date-column", default="date")
+    parser.add_argument("--category-column", default="category")
+    parser.add_argument("--comment-column", default=None)
+    parser.add_argument("--date-format", default="%Y-%m-%d")
+    parser.add_argument("--sign", choices=SIGN_CONVENTIONS, default="signed")
+    parser.add_argument("--debit-column")
+    parser.add_argument("--credit-column")
+    parser.add_argument("--type-column")
+    parser.add_argument("--income-value", action="append", default=None,
+                        help="значение колонки типа, означающее доход (можно несколько раз)")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--decimal", default=".")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--duplicates", choices=DUPLICATE_MODES, default="keep",
+                        help="операции, уже имеющиеся в журнале: пропускать, отмечать или не "
+                             "проверять (по умолчанию keep; skip и flag загружают весь журнал "
+                             "в память)")
+    args = parser.parse_args(argv)
+
+    try:
+        mapping = ImportMapping(
+            amount=args.amount_column, date=args.date_column, category=args.category_column,
+            comment=args.comment_column, date_format=args.date_format, sign=args.sign,
+            debit=args.debit_column, credit=args.credit_column, type_column=args.type_column,
+            income_values=args.income_value or ("income",), delimiter=args.delimiter,
+            decimal=args.decimal, encoding=args.encoding
+        )
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 2
+
+    if args.db:
+        from sqlite_storage import SqliteBackend
+        backend = SqliteBackend(args.db)
+    else:
+        from storage import CsvBackend
+        backend = CsvBackend(args.ledger)
+
+    def progress(done, total, imported):
+        print(f"\r[INFO] {done * 100 // max(total, 1)}%, импортировано {imported}", end="", flush=True)
+
+    try:
+        report = import_statement(args.statement, mapping, backend, args.batch_size, progress,
+                                  args.duplicates)
+    except (OSError, ValueError, UnicodeDecodeError) as e:
+        print(f"\n[ERROR] Импорт прерван: {e}")
+        return 1
+    finally:
+        backend.close()
+    print(f"\n[INFO] {report.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
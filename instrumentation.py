@@ -0,0 +1,210 @@
+"""
+Таймеры и счётчики горячих участков.
+
+Включается переменной окружения FINANCES_PROFILE=1 или флагом
+--profile в main.py; каталог для файлов сессии задаётся переменной
+FINANCES_PROFILE_DIR или --profile-dir. В выключенном состоянии
+@timed стоит одну проверку флага на вызов, span() возвращает общий
+пустой контекст.
+
+По завершении сессии печатается сводка (вызовы, суммарное, среднее и
+максимальное время по каждому участку, счётчики), а при заданном
+каталоге туда записываются:
+    summary.txt, summary.json — та же сводка;
+    spans.folded — собственное время вложенных участков в микросекундах
+                   в формате flamegraph.pl / speedscope («a;b;c 1234»);
+    profile.prof — полный профиль cProfile (snakeviz, gprof2dot, flameprof).
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+ENV_VAR = "FINANCES_PROFILE"
+ENV_DIR = "FINANCES_PROFILE_DIR"
+
+_enabled = False
+_output_dir = None
+_profiler = None
+_registered = False
+_lock = threading.Lock()
+_local = threading.local()      # стек открытых участков своего потока
+_NULL = contextlib.nullcontext()
+
+_stats = {}       # участок -> [вызовы, суммарное время, максимум]
+_counters = {}    # счётчик -> значение
+_folded = {}      # путь "a;b;c" -> собственное время, с
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class _Span:
+    """Замер одного участка; учитывает время вложенных участков."""
+    __slots__ = ("name", "started", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.children = 0.0
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        stack = _local.stack
+        path = ";".join(span.name for span in stack)
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        with _lock:
+            stat = _stats.get(self.name)
+            if stat is None:
+                stat = _stats[self.name] = [0, 0.0, 0.0]
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+            _folded[path] = _folded.get(path, 0.0) + elapsed - self.children
+        return False
+
+
+def span(name: str):
+    """Контекст замера участка кода: with span("frame_cache.daily"): ..."""
+    return _Span(name) if _enabled else _NULL
+
+
+def timed(name: str = None):
+    """
+    Декоратор замера функции; по умолчанию участок называется
+    модуль.имя_функции.
+    """
+    def decorate(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, value: int = 1):
+    """Увеличивает счётчик (например, число загруженных строк)."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def enable(output_dir: str = None):
+    """
+    Включает замеры. Если задан output_dir, дополнительно запускается
+    cProfile, а файлы сессии пишутся туда при завершении процесса
+    (дочерние процессы — в подкаталог worker-<pid>).
+    """
+    global _enabled, _output_dir, _profiler, _registered
+    _enabled = True
+    if output_dir and _profiler is None:
+        import cProfile
+        import multiprocessing
+        if multiprocessing.parent_process() is not None:
+            output_dir = os.path.join(output_dir, f"worker-{os.getpid()}")
+        _output_dir = output_dir
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if not _registered:
+        atexit.register(finish)
+        _registered = True
+
+
+def disable():
+    """Выключает замеры и cProfile; накопленные данные сохраняются."""
+    global _enabled, _profiler
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+
+
+def reset():
+    """Сбрасывает накопленные замеры и счётчики."""
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+        _folded.clear()
+
+
+def stats() -> dict:
+    """{участок: (вызовы, суммарное время, максимум)} в секундах."""
+    with _lock:
+        return {name: tuple(values) for name, values in _stats.items()}
+
+
+def counters() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+def folded() -> dict:
+    """{путь "a;b;c": собственное время в секундах} для flame graph."""
+    with _lock:
+        return dict(_folded)
+
+
+def summary() -> str:
+    """Текстовая сводка сессии: участки по убыванию суммарного времени и счётчики."""
+    lines = [f"{'участок':<44} {'вызовы':>7} {'всего, мс':>11} {'среднее':>9} {'максимум':>9}"]
+    for name, (calls, total, longest) in sorted(stats().items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<44} {calls:>7} {total * 1000:>11.1f} "
+                     f"{total * 1000 / calls:>9.2f} {longest * 1000:>9.2f}")
+    for name, value in sorted(counters().items()):
+        lines.append(f"{name:<44} {value:>7}")
+    return "\n".join(lines)
+
+
+def write_session(output_dir: str):
+    """Записывает сводку, flame graph и профиль cProfile в каталог."""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "summary.txt"), "w", encoding="utf-8") as file:
+        file.write(summary() + "\n")
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as file:
+        json.dump({
+            "spans": {name: {"calls": calls, "total": total, "max": longest}
+                      for name, (calls, total, longest) in stats().items()},
+            "counters": counters(),
+        }, file, ensure_ascii=False, indent=2)
+    with open(os.path.join(output_dir, "spans.folded"), "w", encoding="utf-8") as file:
+        for path, seconds in sorted(folded().items()):
+            file.write(f"{path} {round(seconds * 1_000_000)}\n")
+    if _profiler is not None:
+        _profiler.dump_stats(os.path.join(output_dir, "profile.prof"))
+
+
+def finish():
+    """Завершает сессию: печатает сводку и пишет файлы (вызывается при выходе)."""
+    if not _enabled:
+        return
+    disable()
+    if not _stats and not _counters:
+        return
+    print("[INFO] Профилирование сессии:\n" + summary())
+    if _output_dir:
+        try:
+            write_session(_output_dir)
+            print(f"[INFO] Профиль сохранён в {_output_dir}")
+        except OSError as e:
+            print(f"[ERROR] Не удалось сохранить профиль: {e}")
+
+
+if os.environ.get(ENV_VAR, "") not in ("", "0") or os.environ.get(ENV_DIR):
+    enable(os.environ.get(ENV_DIR))
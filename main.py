@@ -1,7 +1,31 @@
+import argparse
+import os
 import tkinter as tk
+import instrumentation
 from gui import FinanceApp
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Финансовый планировщик")
+    parser.add_argument("--db", metavar="PATH",
+                        help="использовать базу SQLite вместо data/finances.csv")
+    parser.add_argument("--profile", action="store_true",
+                        help="замерять время горячих участков и вывести сводку при выходе")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="сохранить сводку, flame graph и профиль cProfile в каталог")
+    args = parser.parse_args()
+
+    if args.profile or args.profile_dir:
+        # Через окружение настройки получают и процессы отрисовки графиков
+        os.environ[instrumentation.ENV_VAR] = "1"
+        if args.profile_dir:
+            os.environ[instrumentation.ENV_DIR] = os.path.abspath(args.profile_dir)
+        instrumentation.enable(args.profile_dir)
+
+    backend = None
+    if args.db:
+        from sqlite_storage import SqliteBackend
+        backend = SqliteBackend(args.db)
+
     root = tk.Tk()
-    app = FinanceApp(root)
+    app = FinanceApp(root, backend)
     root.mainloop()
\ No newline at end of file
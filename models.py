@@ -1,8 +1,15 @@
 from datetime import date
+from functools import lru_cache
 import re
+from aggregates import to_kopecks
 
 class Category:
     """Категория расходов/доходов."""
+
+    __slots__ = ("name", "category_type")
+
+    NAME_PATTERN = r"^[\w\s]+$"
+    NAME_RE = re.compile(NAME_PATTERN)
     
     def __init__(self, name: str, category_type: str = "expense"):
         if not self._is_valid_name(name):
@@ -12,29 +19,127 @@ class Category:
 
     def _is_valid_name(self, name: str) -> bool:
         """Проверка имени через регулярное выражение."""
-        return bool(re.match(r"^[\w\s]+$", name))
+        return Category.is_valid_name(name)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def is_valid_name(name: str) -> bool:
+        """Проверка имени (скомпилированное выражение, результат кэшируется)."""
+        return bool(Category.NAME_RE.match(name))
 
     def __str__(self):
         return self.name
 
 
 
+class CategoryRegistry:
+    """
+    Таблица категорий: один общий Category на пару (имя, тип) и небольшой
+    целый id (индекс в таблице) для группировки без сравнения строк.
+
+    Объекты Category берутся из родительской таблицы (по умолчанию — общей
+    CATEGORIES), поэтому одинаковые категории разных хранилищ — один объект,
+    а id у каждой таблицы свои.
+    """
+
+    def __init__(self, parent: "CategoryRegistry" = None):
+        self._parent = parent
+        self._categories = []     # id -> Category
+        self._index = {}          # (имя, тип) -> id; имя также в исходном виде, до strip()
+
+    def intern(self, name: str, category_type: str = "expense") -> int:
+        """Возвращает id категории, создавая её при первом обращении."""
+        key = (name, category_type)
+        category_id = self._index.get(key)
+        if category_id is None:
+            category = (self._parent.get(name, category_type) if self._parent is not None
+                        else Category(name, category_type))
+            # Имя после strip() может совпасть с уже известной категорией
+            category_id = self._index.get((category.name, category_type))
+            if category_id is None:
+                category_id = len(self._categories)
+                self._categories.append(category)
+                self._index[(category.name, category_type)] = category_id
+            self._index[key] = category_id
+        return category_id
+
+    def find(self, name: str, category_type: str = "expense"):
+        """id категории или None, если её ещё нет в таблице (не создаёт категорию)."""
+        return self._index.get((name, category_type))
+
+    def get(self, name: str, category_type: str = "expense") -> Category:
+        """Общий экземпляр Category для пары (имя, тип)."""
+        return self._categories[self.intern(name, category_type)]
+
+    def ids_of_type(self, category_type: str) -> list:
+        """id категорий заданного типа."""
+        return [i for i, c in enumerate(self._categories) if c.category_type == category_type]
+
+    @property
+    def categories(self) -> list:
+        """Таблица категорий (индекс списка — id категории)."""
+        return self._categories
+
+    def __getitem__(self, category_id: int) -> Category:
+        return self._categories[category_id]
+
+    def __len__(self):
+        return len(self._categories)
+
+    def __iter__(self):
+        return iter(self._categories)
+
+
+# Общая таблица категорий процесса
+CATEGORIES = CategoryRegistry()
+
+
+def intern_category(name: str, category_type: str = "expense") -> Category:
+    """Общий экземпляр Category для пары (имя, тип) (см. CATEGORIES)."""
+    return CATEGORIES.get(name, category_type)
+
+
+
+# Частоты повторяющихся операций
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+
+
+def validate_amount(amount):
+    """Проверка суммы операции (общая для Transaction и TransactionStore)."""
+    if not isinstance(amount, (int, float)):
+        raise TypeError("Сумма должна быть числом")
+    if amount == 0:
+        raise ValueError("Сумма не может быть нулевой")
+
+
+
 class Transaction:
-    """Финансовая операция."""
+    """
+    Финансовая операция.
+
+    Сумма хранится в целых копейках (kopecks): сложение сумм не накапливает
+    погрешность float; amount отдаёт её в рублях.
+    """
+
+    __slots__ = ("kopecks", "category", "date", "comment")
 
     def __init__(self, amount: float, category: Category, date: date, comment: str = ""):
         self._validate_amount(amount)
-        self.amount = float(amount)
+        self.kopecks = to_kopecks(amount)
+        if not self.kopecks:
+            raise ValueError("Сумма не может быть меньше копейки")
         self.category = category
         self.date = date
         self.comment = comment.strip()
 
+    @property
+    def amount(self) -> float:
+        """Сумма в рублях."""
+        return self.kopecks / 100
+
     def _validate_amount(self, amount):
         """Валидация суммы."""
-        if not isinstance(amount, (int, float)):
-            raise TypeError("Сумма должна быть числом")
-        if amount == 0:
-            raise ValueError("Сумма не может быть нулевой")
+        validate_amount(amount)
 
     def to_dict(self) -> dict:
         """Преобразование в словарь для сохранения."""
@@ -44,4 +149,55 @@ class Transaction:
             "category_type": self.category.category_type,
             "date": self.date.isoformat(),
             "comment": self.comment
-        }
\ No newline at end of file
+        }
+
+
+
+class RecurringTransaction:
+    """
+    Повторяющаяся операция: зарплата, аренда, подписка.
+
+    Повторяется каждые interval дней/недель/месяцев/лет, начиная с start,
+    до end включительно (None — без окончания). Ежемесячные и ежегодные
+    операции приходятся на число start; в коротких месяцах — на последний
+    день месяца (31-е -> 30 апреля, 29 февраля -> 28 февраля).
+    """
+
+    __slots__ = ("kopecks", "category", "start", "frequency", "interval", "end", "comment")
+
+    def __init__(self, amount: float, category: Category, start: date, frequency: str = "monthly",
+                 interval: int = 1, end: date = None, comment: str = ""):
+        validate_amount(amount)
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Неизвестная частота: {frequency}")
+        if not isinstance(interval, int) or interval < 1:
+            raise ValueError("Интервал повторения должен быть целым числом не меньше 1")
+        if end is not None and end < start:
+            raise ValueError("Дата окончания раньше даты начала")
+        self.kopecks = to_kopecks(amount)
+        if not self.kopecks:
+            raise ValueError("Сумма не может быть меньше копейки")
+        self.category = category
+        self.start = start
+        self.frequency = frequency
+        self.interval = interval
+        self.end = end
+        self.comment = comment.strip()
+
+    @property
+    def amount(self) -> float:
+        """Сумма одного повторения в рублях."""
+        return self.kopecks / 100
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для сохранения."""
+        return {
+            "amount": self.amount,
+            "category": self.category.name,
+            "category_type": self.category.category_type,
+            "start": self.start.isoformat(),
+            "frequency": self.frequency,
+            "interval": self.interval,
+            "end": self.end.isoformat() if self.end else None,
+            "comment": self.comment
+        }
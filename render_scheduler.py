@@ -0,0 +1,234 @@
+"""
+Фоновая отрисовка графиков.
+
+Данные для графика готовятся в главном потоке (это агрегаты хранилища —
+небольшие списки), а сама отрисовка и сохранение PNG идут в пуле процессов
+с безоконным бэкендом Agg. Главный цикл Tk не блокируется: результаты
+забираются опросом через root.after().
+
+Новый запрос в тот же файл отменяет предыдущий: ещё не начатая задача
+снимается с очереди, результат уже идущей игнорируется, а обработчик
+отменённой задачи получает ошибку CancelledError. График рисуется во
+временный файл и переносится на место через os.replace(), поэтому
+отменённая, но уже идущая задача не испортит файл новой.
+
+Готовые PNG хранит RenderCache. Ключ кэша — имя графика, поколение данных
+хранилища и опции отрисовки. Повторно открыть или сохранить график, если
+данные не менялись, можно без подготовки данных и без отрисовки.
+"""
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Интервал опроса готовых задач, мс
+POLL_INTERVAL_MS = 100
+
+# Сколько готовых графиков хранит RenderCache
+RENDER_CACHE_SIZE = 32
+
+
+def render_chart(name: str, data, save_path: str, options: dict):
+    """
+    Отрисовывает график в дочернем процессе.
+
+    Выполняется в пуле: matplotlib переключается на Agg до импорта pyplot.
+    PNG пишется во временный файл рядом с save_path и заменяет его целиком.
+
+    Returns:
+        save_path или None, если для графика нет данных (файл не создаётся).
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import visualization
+
+    _, render = visualization.CHARTS[name]
+    directory, file_name = os.path.split(save_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".render-", suffix=os.path.splitext(file_name)[1],
+                                    dir=directory or ".")
+    os.close(fd)
+    try:
+        if render(data, save_path=tmp_path, **options) is None:
+            return None
+        os.replace(tmp_path, save_path)
+        tmp_path = None
+        return save_path
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+
+class ChartScheduler:
+    """
+    Планировщик отрисовки графиков для Tk-приложения.
+
+    Attributes:
+        root (tk.Tk): Окно, через after() которого опрашиваются задачи
+        max_workers (int): Число процессов отрисовки
+    """
+
+    def __init__(self, root, max_workers: int = 3):
+        self.root = root
+        self.max_workers = max_workers
+        self._executor = None
+        self._pending = {}      # путь PNG -> (future, on_done)
+        self._polling = False
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # spawn: дочерние процессы не наследуют состояние Tk родителя
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, name: str, data, save_path: str, on_done=None, **options):
+        """
+        Ставит график в очередь отрисовки.
+
+        Параметры:
+            name: ключ из visualization.CHARTS
+            data: подготовленные данные графика
+            save_path: куда сохранить PNG
+            on_done: обработчик on_done(result, error), вызывается в потоке Tk;
+                     result None без ошибки — нет данных для графика; задача,
+                     отменённая новым запросом в тот же save_path, получает
+                     error CancelledError
+
+        Задачи различаются путём: графики с разными опциями (например, для
+        окна и для сохранения с другим dpi) рисуются в разные файлы и друг
+        друга не отменяют.
+        """
+        previous = self._pending.pop(save_path, None)
+        if previous is not None:
+            future, previous_done = previous
+            future.cancel()
+            if previous_done is not None:
+                previous_done(None, CancelledError(f"Отрисовка графика {name} отменена новым запросом"))
+        future = self._pool().submit(render_chart, name, data, save_path, options)
+        self._pending[save_path] = (future, on_done)
+        self._schedule_poll()
+        return future
+
+    def submit_batch(self, jobs, on_progress=None, on_done=None):
+        """
+        Отрисовывает несколько графиков параллельно.
+
+        Параметры:
+            jobs: [(имя, данные, путь, опции)]
+            on_progress: on_progress(готово, всего) после каждого графика
+            on_done: on_done(ошибки) после последнего графика; отменённый
+                     график (CancelledError) считается ошибкой
+        """
+        total = len(jobs)
+        finished_count = 0
+        errors = []
+
+        def finished(result, error):
+            nonlocal finished_count
+            finished_count += 1
+            if error is not None:
+                errors.append(error)
+            if on_progress is not None:
+                on_progress(finished_count, total)
+            if finished_count == total and on_done is not None:
+                on_done(errors)
+
+        for name, data, save_path, options in jobs:
+            self.submit(name, data, save_path, finished, **options)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        """Забирает результаты готовых задач и вызывает обработчики в потоке Tk."""
+        self._polling = False
+        for save_path, (future, on_done) in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[save_path]
+            if future.cancelled() or on_done is None:
+                continue
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._executor = None   # следующий запрос создаст новый пул
+            on_done(None if error else future.result(), error)
+        if self._pending:
+            self._schedule_poll()
+
+    def shutdown(self):
+        """Останавливает пул, снимая неначатые задачи."""
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+
+class RenderCache:
+    """
+    Кэш отрисованных графиков (PNG во временном каталоге).
+
+    Attributes:
+        directory (str): Каталог файлов кэша
+        max_entries (int): Сколько графиков хранить; давние удаляются
+    """
+
+    def __init__(self, directory: str = None, max_entries: int = RENDER_CACHE_SIZE):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # ключ -> путь к PNG, от давних к недавним
+
+    @staticmethod
+    def key(name: str, generation: int, options: dict) -> tuple:
+        """Ключ графика: имя, поколение данных хранилища и опции отрисовки."""
+        return name, generation, tuple(sorted(options.items()))
+
+    def path_for(self, key: tuple) -> str:
+        """Путь, по которому нужно отрисовать график с ключом key."""
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="finance-charts-")
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{key[0]}-{digest}.png")
+
+    def get(self, key: tuple):
+        """Путь к готовому PNG или None."""
+        path = self._entries.get(key)
+        if path is None:
+            return None
+        if not os.path.exists(path):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return path
+
+    def put(self, key: tuple, path: str):
+        """Запоминает отрисованный график; самые давние удаляются."""
+        self._entries[key] = path
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            _, old_path = self._entries.popitem(last=False)
+            if old_path != path and os.path.exists(old_path):
+                os.remove(old_path)
+
+    def clear(self):
+        """Забывает все графики (например, после перезагрузки хранилища)."""
+        for path in self._entries.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self._entries.clear()
+
+    def close(self):
+        """Удаляет каталог кэша."""
+        self._entries.clear()
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
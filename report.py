@@ -0,0 +1,165 @@
+"""
+Пакетные отчёты без графического интерфейса.
+
+Для каждого журнала (CSV в формате data/finances.csv) строятся три графика
+из visualization.CHARTS и сводка: итоги в summary.json и суммы по
+категориям в categories.csv. Журналы обрабатываются параллельно в пуле
+процессов; matplotlib импортируется только в рабочем процессе и только
+если нужны графики, Tk не импортируется вовсе.
+
+Запуск:
+    python report.py data/ledgers --out reports --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Графики отчёта: имя из visualization.CHARTS -> опции отрисовки
+REPORT_CHARTS = {
+    "income_expense": {},
+    "category_pie": {},
+    "top_expenses": {"top_n": 5},
+}
+
+SUMMARY_FIELDS = ["ledger", "transactions", "income", "expense", "balance", "errors", "status"]
+
+
+def collect_ledgers(paths) -> list:
+    """Раскрывает каталоги в отсортированные списки CSV-файлов."""
+    ledgers = []
+    for path in paths:
+        if os.path.isdir(path):
+            ledgers.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(".csv")
+            ))
+        else:
+            ledgers.append(path)
+    return ledgers
+
+
+def _output_dirs(ledgers, out_dir: str) -> dict:
+    """Каталог отчёта для каждого журнала: имя файла без расширения, без коллизий."""
+    result = {}
+    used = set()
+    for ledger in ledgers:
+        stem = os.path.splitext(os.path.basename(ledger))[0]
+        name, suffix = stem, 2
+        while name in used:
+            name, suffix = f"{stem}_{suffix}", suffix + 1
+        used.add(name)
+        result[ledger] = os.path.join(out_dir, name)
+    return result
+
+
+def build_report(ledger: str, target_dir: str, charts: bool = True) -> dict:
+    """
+    Строит отчёт по одному журналу (выполняется в рабочем процессе).
+
+    Возвращает строку сводной таблицы (см. SUMMARY_FIELDS).
+    """
+    from analysis import get_category_summary
+    from storage import LoadReport, MemoryBackend, load_transactions_bulk
+
+    if not os.path.isfile(ledger):
+        raise FileNotFoundError(f"файл {ledger} не найден")
+
+    load_report = LoadReport()
+    transactions = load_transactions_bulk(ledger, report=load_report)
+    backend = MemoryBackend(transactions)
+    totals = transactions.totals
+
+    os.makedirs(target_dir, exist_ok=True)
+    summary = {
+        "ledger": os.path.abspath(ledger),
+        "transactions": len(transactions),
+        "income": float(totals.income),
+        "expense": float(totals.expense),
+        "balance": float(totals.balance),
+        "errors": load_report.rows_total - load_report.rows_loaded,
+        "months": [
+            {"year": year, "month": month, "income": float(income), "expense": float(expense)}
+            for year, month, income, expense in totals.months()
+        ],
+        "charts": [],
+    }
+
+    get_category_summary(backend).to_csv(
+        os.path.join(target_dir, "categories.csv"), index=False, encoding="utf-8"
+    )
+
+    if charts and len(transactions):
+        import matplotlib
+        matplotlib.use("Agg")
+        import visualization
+
+        for name, options in REPORT_CHARTS.items():
+            prepare, render = visualization.CHARTS[name]
+            save_path = render(prepare(backend), save_path=os.path.join(target_dir, f"{name}.png"),
+                               **options)
+            if save_path:
+                summary["charts"].append(os.path.basename(save_path))
+
+    with open(os.path.join(target_dir, "summary.json"), "w", encoding="utf-8") as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+
+    return {field: summary[field] for field in SUMMARY_FIELDS if field in summary}
+
+
+def run(ledgers, out_dir: str, workers: int = None, charts: bool = True) -> list:
+    """
+    Строит отчёты по журналам в пуле процессов и пишет сводную таблицу
+    out_dir/summary.csv. Возвращает строки сводной таблицы в порядке журналов.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    targets = _output_dirs(ledgers, out_dir)
+    rows = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(build_report, ledger, target, charts): ledger
+            for ledger, target in targets.items()
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            ledger = futures[future]
+            try:
+                rows[ledger] = dict(future.result(), status="ok")
+                print(f"[INFO] [{done}/{len(futures)}] {ledger}: готово")
+            except Exception as e:
+                rows[ledger] = {"ledger": os.path.abspath(ledger), "status": f"error: {e}"}
+                print(f"[ERROR] [{done}/{len(futures)}] {ledger}: {e}")
+
+    ordered = [rows[ledger] for ledger in targets]
+    with open(os.path.join(out_dir, "summary.csv"), "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(ordered)
+    return ordered
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетные отчёты по журналам операций")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="CSV-файлы журналов или каталоги с ними")
+    parser.add_argument("--out", default="reports", help="каталог отчётов (по умолчанию reports)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="число рабочих процессов (по умолчанию — число ядер)")
+    parser.add_argument("--no-charts", action="store_true", help="только сводки, без графиков")
+    args = parser.parse_args(argv)
+
+    ledgers = collect_ledgers(args.paths)
+    if not ledgers:
+        print("[ERROR] Не найдено ни одного CSV-файла.")
+        return 1
+
+    rows = run(ledgers, args.out, args.workers, charts=not args.no_charts)
+    failed = sum(1 for row in rows if row["status"] != "ok")
+    print(f"[INFO] Отчёты: {len(rows) - failed} из {len(rows)}, каталог {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Индекс сводок по периодам.
+
+RollupIndex хранит доходы, расходы и число операций в копейках по дням,
+месяцам и годам отдельно для каждой категории (категория в хранилище уже
+включает тип). Хранилище обновляет индекс при каждом добавлении или
+удалении операции.
+
+Итоги за любой период собираются из покрывающих его бакетов: неполные
+месяцы на краях — по дням, неполные годы — по месяцам, остальное — по
+годам. Это не больше ~60 дневных, ~22 месячных и нескольких годовых
+бакетов вместо обхода строк журнала.
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+
+from aggregates import to_kopecks
+
+LEVELS = ("day", "month", "year")
+
+
+def _bucket_keys(ordinal: int) -> tuple:
+    """Ключи бакетов (день, месяц, год) для порядкового номера дня."""
+    d = date.fromordinal(ordinal)
+    return ordinal, d.year * 12 + d.month - 1, d.year
+
+
+def _month_end(d: date) -> date:
+    following = date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+    return following - timedelta(days=1)
+
+
+
+class RollupIndex:
+    """
+    Сводки по дням, месяцам и годам для каждой категории.
+
+    Ключи бакетов: день — порядковый номер даты, месяц — год * 12 + месяц - 1,
+    год — номер года. Значение бакета: {id категории: [доходы, расходы,
+    число операций]}, суммы в копейках, расходы по модулю.
+    """
+
+    def __init__(self):
+        self._buckets = {level: {} for level in LEVELS}
+        self._keys = {level: [] for level in LEVELS}   # отсортированные ключи бакетов
+
+    # --- Обновление ---
+
+    def _add_entry(self, ordinal: int, category_id: int, income: int, expense: int, count: int):
+        for level, key in zip(LEVELS, _bucket_keys(ordinal)):
+            bucket = self._buckets[level].get(key)
+            if bucket is None:
+                bucket = self._buckets[level][key] = {}
+                insort(self._keys[level], key)
+            entry = bucket.get(category_id)
+            if entry is None:
+                entry = bucket[category_id] = [0, 0, 0]
+            entry[0] += income
+            entry[1] += expense
+            entry[2] += count
+            if entry[2] == 0:
+                del bucket[category_id]
+
+    def add(self, amount: float, category_id: int, ordinal: int):
+        """Учитывает добавленную операцию."""
+        kopecks = to_kopecks(amount)
+        self._add_entry(ordinal, category_id, max(kopecks, 0), max(-kopecks, 0), 1)
+
+    def remove(self, amount: float, category_id: int, ordinal: int):
+        """Исключает удалённую операцию."""
+        kopecks = to_kopecks(amount)
+        self._add_entry(ordinal, category_id, -max(kopecks, 0), -max(-kopecks, 0), -1)
+
+    def merge(self, other: "RollupIndex"):
+        """Добавляет сводки другого набора операций (например, пакета импорта)."""
+        for entry in other.entries():
+            self._add_entry(*entry)
+
+    def entries(self):
+        """Дневные записи (день, id категории, доходы, расходы, число операций)."""
+        buckets = self._buckets["day"]
+        for ordinal in self._keys["day"]:
+            for category_id, (income, expense, count) in buckets[ordinal].items():
+                yield ordinal, category_id, income, expense, count
+
+    @classmethod
+    def from_entries(cls, entries) -> "RollupIndex":
+        """Восстанавливает индекс по дневным записям (см. entries())."""
+        index = cls()
+        for entry in entries:
+            index._add_entry(*entry)
+        return index
+
+    @classmethod
+    def from_columns(cls, amounts, date_ordinals, category_ids) -> "RollupIndex":
+        """Строит индекс по колонкам хранилища: строки группируются по (день, категория)."""
+        import numpy as np
+
+        if not len(amounts):
+            return cls()
+        kopecks = np.rint(np.frombuffer(amounts, dtype=np.float64) * 100).astype(np.int64)
+        days = np.frombuffer(date_ordinals, dtype=np.int32).astype(np.int64)
+        categories = np.frombuffer(category_ids, dtype=np.int32).astype(np.int64)
+
+        keys, codes = np.unique(days << 32 | categories, return_inverse=True)
+        size = len(keys)
+        income = np.bincount(codes, weights=np.where(kopecks > 0, kopecks, 0), minlength=size)
+        expense = np.bincount(codes, weights=np.where(kopecks < 0, -kopecks, 0), minlength=size)
+        counts = np.bincount(codes, minlength=size)
+        return cls.from_entries(
+            (key >> 32, key & 0xFFFFFFFF, int(round(s_in)), int(round(s_out)), count)
+            for key, s_in, s_out, count in zip(keys.tolist(), income, expense, counts.tolist())
+        )
+
+    # --- Чтение ---
+
+    def __bool__(self):
+        return bool(self._keys["day"])
+
+    def first_day(self):
+        """Первая дата с операциями (None для пустого индекса)."""
+        keys = self._keys["day"]
+        return date.fromordinal(keys[0]) if keys else None
+
+    def last_day(self):
+        """Последняя дата с операциями (None для пустого индекса)."""
+        keys = self._keys["day"]
+        return date.fromordinal(keys[-1]) if keys else None
+
+    @staticmethod
+    def cover(start: date, end: date) -> list:
+        """
+        Минимальное покрытие периода [start, end] бакетами:
+        [(уровень, первый ключ, последний ключ)].
+        """
+        parts = []
+        if start > end:
+            return parts
+        # Неполный месяц в начале
+        if start.day != 1:
+            month_end = _month_end(start)
+            if month_end >= end:
+                return [("day", start.toordinal(), end.toordinal())]
+            parts.append(("day", start.toordinal(), month_end.toordinal()))
+            start = month_end + timedelta(days=1)
+        # Неполный месяц в конце
+        if end != _month_end(end):
+            first = end.replace(day=1)
+            parts.append(("day", first.toordinal(), end.toordinal()))
+            end = first - timedelta(days=1)
+        if end < start:
+            return parts
+
+        # Остались целые месяцы [first_month, last_month]
+        first_month = start.year * 12 + start.month - 1
+        last_month = end.year * 12 + end.month - 1
+        if first_month % 12:
+            year_end = min(last_month, first_month // 12 * 12 + 11)
+            parts.append(("month", first_month, year_end))
+            first_month = year_end + 1
+        if first_month <= last_month and last_month % 12 != 11:
+            year_start = max(first_month, last_month // 12 * 12)
+            parts.append(("month", year_start, last_month))
+            last_month = year_start - 1
+        if first_month <= last_month:
+            parts.append(("year", first_month // 12, last_month // 12))
+        return parts
+
+    def _bounds(self, start, end):
+        """Период с открытыми границами, заменёнными крайними датами индекса."""
+        return start or self.first_day(), end or self.last_day()
+
+    def _scan(self, level: str, first: int, last: int):
+        """Бакеты уровня с ключами в [first, last] по возрастанию: (ключ, бакет)."""
+        keys = self._keys[level]
+        buckets = self._buckets[level]
+        for key in keys[bisect_left(keys, first):bisect_right(keys, last)]:
+            yield key, buckets[key]
+
+    def category_totals(self, start: date = None, end: date = None) -> dict:
+        """{id категории: [доходы, расходы, число операций]} за период, в копейках."""
+        result = {}
+        if not self:
+            return result
+        start, end = self._bounds(start, end)
+        for level, first, last in self.cover(start, end):
+            for _, bucket in self._scan(level, first, last):
+                for category_id, (income, expense, count) in bucket.items():
+                    entry = result.get(category_id)
+                    if entry is None:
+                        entry = result[category_id] = [0, 0, 0]
+                    entry[0] += income
+                    entry[1] += expense
+                    entry[2] += count
+        return result
+
+    def category_total(self, category_id: int, start: date, end: date) -> tuple:
+        """
+        (доходы, расходы, число операций) одной категории за период, в копейках.
+        Стоимость зависит только от числа бакетов покрытия: месяц — один бакет.
+        """
+        income = expense = count = 0
+        for level, first, last in self.cover(start, end):
+            for _, bucket in self._scan(level, first, last):
+                entry = bucket.get(category_id)
+                if entry is not None:
+                    income += entry[0]
+                    expense += entry[1]
+                    count += entry[2]
+        return income, expense, count
+
+    def totals(self, start: date = None, end: date = None) -> tuple:
+        """(доходы, расходы) за период в копейках."""
+        income = expense = 0
+        for entry in self.category_totals(start, end).values():
+            income += entry[0]
+            expense += entry[1]
+        return income, expense
+
+    def series(self, level: str, start: date = None, end: date = None, category_ids=None) -> list:
+        """
+        Временной ряд [(ключ бакета, доходы, расходы)] уровня level
+        ("day", "month" или "year") за период, в копейках; пустые бакеты
+        пропускаются. category_ids ограничивает набор категорий.
+
+        Для month и year границы периода округляются до целых бакетов.
+        """
+        if not self:
+            return []
+        start, end = self._bounds(start, end)
+        first, last = (
+            (start.toordinal(), end.toordinal()) if level == "day" else
+            (start.year * 12 + start.month - 1, end.year * 12 + end.month - 1) if level == "month" else
+            (start.year, end.year)
+        )
+        wanted = None if category_ids is None else set(category_ids)
+        result = []
+        for key, bucket in self._scan(level, first, last):
+            income = expense = 0
+            for category_id, entry in bucket.items():
+                if wanted is None or category_id in wanted:
+                    income += entry[0]
+                    expense += entry[1]
+            if bucket and (wanted is None or income or expense):
+                result.append((key, income, expense))
+        return result
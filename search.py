@@ -0,0 +1,224 @@
+"""
+Полнотекстовый и фасетный поиск операций.
+
+Инвертированный индекс строится не по строкам журнала, а по пулам
+хранилища: токен -> id комментариев и id категорий, в которых он
+встречается. Пулы малы по сравнению с журналом (комментарии и категории
+повторяются), а строки находятся одним векторным проходом по колонкам
+id: таблица «id подходит» (numpy bool) индексируется колонкой.
+
+Токены — слова (\\w+, включая кириллицу) после нормализации
+duplicates.normalize (регистр, «ё» -> «е»); слово запроса совпадает с
+любым токеном, который с него начинается («пятер» находит «Пятёрочка»).
+Все слова запроса должны встретиться в комментарии или категории строки.
+
+Фасеты — тип, категории, диапазон суммы (по модулю) и период — тоже
+векторные маски над колонками хранилища.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+from datetime import date
+
+import numpy as np
+
+from duplicates import normalize
+from instrumentation import count as count_metric, timed
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def _column(column, dtype):
+    """
+    Колонка хранилища как numpy-массив без копирования. Представление
+    нельзя хранить: пока оно живо, array.append() хранилища невозможен.
+    """
+    return np.frombuffer(column, dtype=dtype) if len(column) else np.empty(0, dtype=dtype)
+
+
+def tokenize(text: str) -> list:
+    """Слова текста в нормализованном виде."""
+    return TOKEN_RE.findall(normalize(text))
+
+
+
+class SearchQuery:
+    """
+    Условия поиска; пустые условия не ограничивают результат.
+
+    Attributes:
+        text (str): Слова для поиска в комментарии и названии категории
+        category_type (str): "income" или "expense"
+        categories (list): Названия категорий (без учёта регистра)
+        min_amount, max_amount (float): Диапазон суммы по модулю, границы включаются
+        start, end (date): Период, границы включаются
+    """
+
+    def __init__(self, text: str = "", category_type: str = None, categories=None,
+                 min_amount: float = None, max_amount: float = None,
+                 start: date = None, end: date = None):
+        self.text = text
+        self.category_type = category_type
+        self.categories = list(categories or [])
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.start = start
+        self.end = end
+
+    def __bool__(self):
+        return bool(tokenize(self.text) or self.category_type or self.categories
+                    or self.min_amount is not None or self.max_amount is not None
+                    or self.start or self.end)
+
+
+
+class SearchResult:
+    """
+    Найденные строки и фасеты по ним.
+
+    Attributes:
+        rows (np.ndarray): Индексы строк хранилища по возрастанию
+    """
+
+    def __init__(self, store, rows):
+        self._store = store
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def facets(self) -> dict:
+        """{"category": {имя: число строк}, "type": {тип: число строк}}."""
+        ids = _column(self._store.category_ids, np.int32)[self.rows]
+        counts = np.bincount(ids, minlength=len(self._store.categories))
+        by_category, by_type = {}, {}
+        for category, n in zip(self._store.categories, counts.tolist()):
+            if n:
+                by_category[category.name] = by_category.get(category.name, 0) + n
+                by_type[category.category_type] = by_type.get(category.category_type, 0) + n
+        return {"category": by_category, "type": by_type}
+
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс по пулам комментариев и категорий хранилища.
+
+    Индексирует только новые записи пулов (refresh() вызывается перед
+    каждым поиском), поэтому добавление операций обходится в O(новых слов).
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._comment_postings = {}     # токен -> [id комментариев]
+        self._category_postings = {}    # токен -> [id категорий]
+        self._vocabulary = []           # отсортированные токены (для поиска по началу слова)
+        self._known = set()
+        self._comments_indexed = 0
+        self._categories_indexed = 0
+        self._lock = threading.Lock()
+
+    def _add(self, postings: dict, text: str, item_id: int):
+        for token in set(tokenize(text)):
+            ids = postings.get(token)
+            if ids is None:
+                postings[token] = [item_id]
+                if token not in self._known:
+                    self._known.add(token)
+                    insort(self._vocabulary, token)
+            else:
+                ids.append(item_id)
+
+    @timed("search.refresh")
+    def refresh(self):
+        """Индексирует комментарии и категории, добавленные после прошлого вызова."""
+        with self._lock:
+            comments = self._store.comments
+            for comment_id in range(self._comments_indexed, len(comments)):
+                self._add(self._comment_postings, comments[comment_id], comment_id)
+            self._comments_indexed = len(comments)
+            categories = self._store.categories
+            for category_id in range(self._categories_indexed, len(categories)):
+                self._add(self._category_postings, categories[category_id].name, category_id)
+            self._categories_indexed = len(categories)
+
+    def _prefix_tokens(self, prefix: str) -> list:
+        i = bisect_left(self._vocabulary, prefix)
+        j = bisect_left(self._vocabulary, prefix + "\U0010ffff")
+        return self._vocabulary[i:j]
+
+    def _lookup(self, postings: dict, tokens: list, size: int) -> np.ndarray:
+        """Таблица id -> bool: id, в тексте которых есть один из tokens."""
+        table = np.zeros(size, dtype=bool)
+        for token in tokens:
+            ids = postings.get(token)
+            if ids:
+                table[ids] = True
+        return table
+
+    def _category_table(self, query: SearchQuery):
+        """Маска категорий по фасетам типа и названий (None — без ограничения)."""
+        if not query.category_type and not query.categories:
+            return None
+        wanted = {normalize(name) for name in query.categories}
+        return np.array([
+            (not query.category_type or c.category_type == query.category_type)
+            and (not wanted or normalize(c.name) in wanted)
+            for c in self._store.categories
+        ], dtype=bool)
+
+    @timed("search.search")
+    def search(self, query: SearchQuery) -> SearchResult:
+        """Строки, подходящие под все условия запроса."""
+        self.refresh()
+        store = self._store
+        n = len(store)
+        comment_ids = _column(store.comment_ids, np.int32)
+        category_ids = _column(store.category_ids, np.int32)
+        mask = np.ones(n, dtype=bool)
+
+        for word in tokenize(query.text):
+            tokens = self._prefix_tokens(word)
+            comments = self._lookup(self._comment_postings, tokens, len(store.comments))
+            categories = self._lookup(self._category_postings, tokens, len(store.categories))
+            mask &= comments[comment_ids] | categories[category_ids]
+
+        allowed = self._category_table(query)
+        if allowed is not None:
+            mask &= allowed[category_ids]
+
+        if query.min_amount is not None or query.max_amount is not None:
+            amounts = np.abs(_column(store.amounts, np.float64))
+            if query.min_amount is not None:
+                mask &= amounts >= query.min_amount - 0.005
+            if query.max_amount is not None:
+                mask &= amounts <= query.max_amount + 0.005
+
+        if query.start or query.end:
+            ordinals = _column(store.date_ordinals, np.int32)
+            if query.start:
+                mask &= ordinals >= query.start.toordinal()
+            if query.end:
+                mask &= ordinals <= query.end.toordinal()
+
+        rows = np.flatnonzero(mask)
+        count_metric("search.rows_found", len(rows))
+        return SearchResult(store, rows)
+
+    def matches(self, query: SearchQuery, index: int) -> bool:
+        """Подходит ли под запрос одна строка (для только что добавленной операции)."""
+        t = self._store[index]
+        category = t.category
+        if query.category_type and category.category_type != query.category_type:
+            return False
+        if query.categories and normalize(category.name) not in {normalize(c) for c in query.categories}:
+            return False
+        amount = abs(t.amount)
+        if query.min_amount is not None and amount < query.min_amount - 0.005:
+            return False
+        if query.max_amount is not None and amount > query.max_amount + 0.005:
+            return False
+        if (query.start and t.date < query.start) or (query.end and t.date > query.end):
+            return False
+        words = set(tokenize(t.comment)) | set(tokenize(category.name))
+        return all(any(token.startswith(word) for token in words) for word in tokenize(query.text))
@@ -0,0 +1,599 @@
+"""
+HTTP-сервер журналов: несколько журналов и пользователей в одном процессе.
+
+Сервер построен на asyncio и не требует сторонних пакетов. Каждый журнал —
+CSV-файл <имя>.csv в корневом каталоге сервера. Его обслуживает CsvBackend
+со снимком и индексом сводок, поэтому повторное открытие журнала быстрое.
+
+Как устроено:
+    1. Открытые журналы лежат в LRU-кэше (LedgerPool). Когда кэш
+       переполнен, самый давний незанятый журнал закрывается через
+       CsvBackend.close(), который сохраняет снимок и сводки.
+    2. Каждый журнал защищён блокировкой чтения-записи (ReadWriteLock).
+       Чтения идут параллельно, запись — строго по одной и без
+       одновременных чтений. Ждущая запись не пропускает новые чтения
+       вперёд себя.
+    3. Блокирующая работа вынесена из цикла событий. Файлы и агрегаты
+       обрабатываются в пуле потоков, графики рисуются в пуле процессов
+       (как в render_scheduler).
+
+API (ответы в JSON, даты в формате ГГГГ-ММ-ДД):
+    GET  /ledgers                                 — список журналов
+    GET  /ledgers/<имя>/transactions              — операции (offset, limit и
+                                                    фильтры q, type, category,
+                                                    min, max, start, end)
+    POST /ledgers/<имя>/transactions              — добавить операцию или список;
+                                                    ?duplicates=skip пропускает повторы
+    GET  /ledgers/<имя>/totals?start=&end=        — доходы, расходы, баланс
+    GET  /ledgers/<имя>/categories?start=&end=    — суммы по категориям
+    GET  /ledgers/<имя>/daily?start=&end=         — итоги по дням
+    GET  /ledgers/<имя>/charts/<график>.png       — график из visualization.CHARTS
+
+Запуск:
+    python server.py --root data/ledgers --port 8765
+"""
+import argparse
+import asyncio
+import functools
+import json
+import math
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from instrumentation import count as count_metric, span
+from models import Transaction, intern_category
+from storage import CsvBackend
+from utils import is_valid_date
+
+# Допустимые имена журналов: без разделителей путей и точек
+LEDGER_NAME_RE = re.compile(r"^[\w-]{1,64}$")
+
+DEFAULT_CACHE_SIZE = 8
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BODY_BYTES = 16 * 2**20
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+
+class HttpError(Exception):
+    """Ошибка запроса, которая возвращается клиенту со статусом status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+
+class ReadWriteLock:
+    """
+    Блокировка журнала для цикла событий: читатели параллельно,
+    писатель — один и без читателей.
+    """
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @asynccontextmanager
+    async def reading(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writing and not self._waiting_writers)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def writing(self):
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writing and not self._readers)
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+
+class Ledger:
+    """
+    Открытый журнал.
+
+    Attributes:
+        name (str): Имя журнала
+        backend (CsvBackend): Хранилище журнала
+        lock (ReadWriteLock): Блокировка чтения-записи
+        users (int): Число запросов, которые сейчас работают с журналом
+    """
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.backend = CsvBackend(path)
+        self.lock = ReadWriteLock()
+        self.users = 0
+
+    @asynccontextmanager
+    async def reading(self, run):
+        """
+        Блокировка чтения. Если файл журнала изменили другие процессы
+        (например, importer.py), их строки сначала дочитываются под
+        блокировкой записи.
+        """
+        if await run(self.backend.changed):
+            async with self.lock.writing():
+                await run(self.backend.refresh)
+        async with self.lock.reading():
+            yield
+
+
+
+class LedgerPool:
+    """
+    LRU-кэш открытых журналов.
+
+    Attributes:
+        root (str): Каталог с CSV-файлами журналов
+        capacity (int): Сколько журналов держать загруженными
+    """
+
+    def __init__(self, root: str, capacity: int, run):
+        self.root = root
+        self.capacity = max(1, capacity)
+        self._run = run                 # корутина: выполнить функцию в пуле потоков
+        self._ledgers = OrderedDict()   # имя -> Ledger, от давних к недавним
+        self._loading = {}              # имя -> Future загрузки
+
+    def path(self, name: str) -> str:
+        if not LEDGER_NAME_RE.match(name):
+            raise HttpError(400, f"Недопустимое имя журнала: {name}")
+        return os.path.join(self.root, f"{name}.csv")
+
+    def names(self) -> list:
+        """Имена журналов на диске и открытых (ещё не записанных) журналов."""
+        names = set(self._ledgers)
+        if os.path.isdir(self.root):
+            names.update(os.path.splitext(entry)[0] for entry in os.listdir(self.root)
+                         if entry.endswith(".csv") and LEDGER_NAME_RE.match(os.path.splitext(entry)[0]))
+        return sorted(names)
+
+    def loaded(self) -> list:
+        """Имена загруженных журналов, от давних к недавним."""
+        return list(self._ledgers)
+
+    async def _get(self, name: str, create: bool) -> Ledger:
+        ledger = self._ledgers.get(name)
+        if ledger is not None:
+            self._ledgers.move_to_end(name)
+            count_metric("server.cache_hits")
+            return ledger
+        pending = self._loading.get(name)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        path = self.path(name)
+        if not create and not os.path.exists(path):
+            raise HttpError(404, f"Журнал не найден: {name}")
+        count_metric("server.cache_misses")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[name] = future
+        try:
+            ledger = Ledger(name, path)
+            await self._run(ledger.backend.load)
+            self._ledgers[name] = ledger
+            future.set_result(ledger)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # ошибка доставлена ждущим; не предупреждать о ней
+            raise
+        finally:
+            del self._loading[name]
+        return ledger
+
+    @asynccontextmanager
+    async def open(self, name: str, create: bool = False):
+        """Журнал для одного запроса; пока он открыт, вытеснить его нельзя."""
+        ledger = await self._get(name, create)
+        ledger.users += 1
+        try:
+            yield ledger
+        finally:
+            ledger.users -= 1
+            await self._evict()
+
+    async def _evict(self):
+        while len(self._ledgers) > self.capacity:
+            name = next((name for name, ledger in self._ledgers.items() if not ledger.users), None)
+            if name is None:
+                return
+            await self._close(self._ledgers.pop(name))
+            count_metric("server.evictions")
+
+    async def _close(self, ledger: Ledger):
+        async with ledger.lock.writing():
+            await self._run(ledger.backend.close)
+
+    async def close(self):
+        """Закрывает все журналы (сохраняет снимки и сводки)."""
+        while self._ledgers:
+            _, ledger = self._ledgers.popitem(last=False)
+            await self._close(ledger)
+
+
+
+def _render_png(chart: str, data, options: dict) -> bytes:
+    """Рисует график в дочернем процессе и возвращает PNG."""
+    from render_scheduler import render_chart
+
+    fd, path = tempfile.mkstemp(suffix=".png")
+    os.close(fd)
+    try:
+        if render_chart(chart, data, path, options) is None:
+            return b""
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def _parse_date(value: str, field: str):
+    if value is None or value == "":
+        return None
+    if not is_valid_date(value):
+        raise HttpError(400, f"Неверная дата в поле {field}. Используйте ГГГГ-ММ-ДД")
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _parse_number(value, field: str, cast=float):
+    if value is None or value == "":
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise HttpError(400, f"Неверное число в поле {field}: {value}")
+    # float() принимает "inf" и "nan", json — Infinity и NaN
+    if not math.isfinite(number):
+        raise HttpError(400, f"Неверное число в поле {field}: {value}")
+    return number
+
+
+def parse_transaction(item) -> Transaction:
+    """Операция из JSON-объекта {"amount", "category", "date", "comment"}."""
+    if not isinstance(item, dict):
+        raise HttpError(400, "Операция должна быть JSON-объектом")
+    amount = _parse_number(item.get("amount"), "amount")
+    if not amount:
+        raise HttpError(400, "Сумма должна быть отличной от нуля")
+    category_name = str(item.get("category") or "").strip()
+    if not category_name:
+        raise HttpError(400, "Категория не может быть пустой")
+    day = _parse_date(str(item.get("date") or ""), "date")
+    if day is None:
+        raise HttpError(400, "Дата не может быть пустой")
+    category_type = "income" if amount > 0 else "expense"
+    try:
+        return Transaction(amount, intern_category(category_name, category_type), day,
+                           str(item.get("comment") or "").strip())
+    except (ValueError, OverflowError) as e:
+        # OverflowError — сумма, которая не помещается в копейки (например, 1e308)
+        raise HttpError(400, str(e))
+
+
+
+class LedgerServer:
+    """
+    Асинхронный HTTP-сервер журналов.
+
+    Attributes:
+        pool (LedgerPool): Открытые журналы
+        port (int): Порт, на котором сервер слушает (после start())
+    """
+
+    ROUTES = [
+        ("GET", re.compile(r"^/ledgers/?$"), "list_ledgers"),
+        ("GET", re.compile(r"^/ledgers/(?P<name>[^/]+)/transactions$"), "list_transactions"),
+        ("POST", re.compile(r"^/ledgers/(?P<name>[^/]+)/transactions$"), "add_transactions"),
+        ("GET", re.compile(r"^/ledgers/(?P<name>[^/]+)/totals$"), "totals"),
+        ("GET", re.compile(r"^/ledgers/(?P<name>[^/]+)/categories$"), "categories"),
+        ("GET", re.compile(r"^/ledgers/(?P<name>[^/]+)/daily$"), "daily"),
+        ("GET", re.compile(r"^/ledgers/(?P<name>[^/]+)/charts/(?P<chart>\w+)\.png$"), "chart"),
+    ]
+
+    def __init__(self, root: str, cache_size: int = DEFAULT_CACHE_SIZE,
+                 io_workers: int = 4, render_workers: int = 2):
+        self._threads = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="ledger")
+        self._render_workers = render_workers
+        self._renderer = None
+        self.pool = LedgerPool(root, cache_size, self.run)
+        self._server = None
+        self.port = None
+
+    async def run(self, func, *args):
+        """Выполняет блокирующую функцию в пуле потоков."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._threads, functools.partial(func, *args))
+
+    async def _render(self, chart: str, data, options: dict) -> bytes:
+        # spawn: как и в render_scheduler, дочерние процессы начинают с чистого состояния
+        if self._renderer is None:
+            self._renderer = ProcessPoolExecutor(
+                max_workers=self._render_workers, mp_context=multiprocessing.get_context("spawn"))
+        return await asyncio.get_running_loop().run_in_executor(
+            self._renderer, _render_png, chart, data, options)
+
+    # --- Жизненный цикл ---
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> int:
+        """Начинает принимать соединения; возвращает порт (port=0 — любой свободный)."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        """Останавливает сервер и закрывает журналы."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.pool.close()
+        self._threads.shutdown(wait=True)
+        if self._renderer is not None:
+            self._renderer.shutdown(wait=True)
+
+    # --- HTTP ---
+
+    async def _handle(self, reader, writer):
+        """Одно соединение: запросы обрабатываются по очереди, пока клиент его держит."""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, content_type, payload = await self.dispatch(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                    + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HttpError as e:
+            payload = _json({"error": e.message})
+            writer.write(f"HTTP/1.1 {e.status} {REASONS.get(e.status, '')}\r\n"
+                         f"Content-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                         + payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        """(метод, путь, заголовки, тело) или None, если клиент закрыл соединение."""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Неверная строка запроса")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = _parse_number(headers.get("content-length"), "Content-Length", int) or 0
+        if length < 0:
+            raise HttpError(400, "Неверное число в поле Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "Слишком большой запрос")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    async def dispatch(self, method: str, target: str, body: bytes = b"") -> tuple:
+        """(статус, Content-Type, тело ответа) для запроса."""
+        url = urlsplit(target)
+        path = unquote(url.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            allowed = False
+            for route_method, pattern, handler in self.ROUTES:
+                match = pattern.match(path)
+                if match is None:
+                    continue
+                if route_method != method:
+                    allowed = True
+                    continue
+                with span(f"server.{handler}"):
+                    result = await getattr(self, handler)(query=query, body=body, **match.groupdict())
+                if isinstance(result, tuple):
+                    return result
+                return 201 if method == "POST" else 200, "application/json", _json(result)
+            if allowed:
+                raise HttpError(405, f"Метод {method} не поддерживается для {path}")
+            raise HttpError(404, f"Нет такого адреса: {path}")
+        except HttpError as e:
+            return e.status, "application/json", _json({"error": e.message})
+        except Exception as e:
+            print(f"[ERROR] {method} {path}: {e}")
+            return 500, "application/json", _json({"error": "Внутренняя ошибка сервера"})
+
+    # --- Обработчики ---
+
+    async def list_ledgers(self, query, body):
+        return {"ledgers": self.pool.names(), "loaded": self.pool.loaded()}
+
+    async def list_transactions(self, name, query, body):
+        offset = _parse_number(query.get("offset"), "offset", int) or 0
+        limit = _parse_number(query.get("limit"), "limit", int) or DEFAULT_PAGE_SIZE
+        if offset < 0 or not 0 < limit <= MAX_PAGE_SIZE:
+            raise HttpError(400, f"offset >= 0, 0 < limit <= {MAX_PAGE_SIZE}")
+        search = _search_query(query)
+        async with self.pool.open(name) as ledger, ledger.reading(self.run):
+            return await self.run(_page, ledger.backend, search, offset, limit)
+
+    async def add_transactions(self, name, query, body):
+        try:
+            items = json.loads(body.decode("utf-8") or "null")
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(400, "Тело запроса должно быть JSON")
+        transactions = [parse_transaction(item) for item in (items if isinstance(items, list) else [items])]
+        mode = query.get("duplicates", "keep")
+        if mode not in ("skip", "keep"):
+            raise HttpError(400, "duplicates: skip или keep")
+
+        async with self.pool.open(name, create=True) as ledger, ledger.lock.writing():
+            return await self.run(_append, ledger.backend, transactions, mode == "skip")
+
+    async def totals(self, name, query, body):
+        start, end = _parse_date(query.get("start"), "start"), _parse_date(query.get("end"), "end")
+        async with self.pool.open(name) as ledger, ledger.reading(self.run):
+            income, expense = await self.run(ledger.backend.totals, start, end)
+        return {"income": income, "expense": expense, "balance": round(income - expense, 2)}
+
+    async def categories(self, name, query, body):
+        start, end = _parse_date(query.get("start"), "start"), _parse_date(query.get("end"), "end")
+        async with self.pool.open(name) as ledger, ledger.reading(self.run):
+            totals = await self.run(ledger.backend.category_totals, start, end)
+        return {"categories": [{"category": category, "amount": amount} for category, amount in totals]}
+
+    async def daily(self, name, query, body):
+        start, end = _parse_date(query.get("start"), "start"), _parse_date(query.get("end"), "end")
+        async with self.pool.open(name) as ledger, ledger.reading(self.run):
+            days = await self.run(ledger.backend.daily_totals, start, end)
+        return {"days": [{"date": day.isoformat(), "income": income, "expense": expense}
+                         for day, income, expense in days]}
+
+    async def chart(self, name, chart, query, body):
+        import visualization
+
+        if chart not in visualization.CHARTS:
+            raise HttpError(404, f"Нет такого графика: {chart}")
+        prepare, _ = visualization.CHARTS[chart]
+        async with self.pool.open(name) as ledger, ledger.reading(self.run):
+            data = await self.run(prepare, ledger.backend)
+        # Отрисовка — без блокировки журнала: данные уже собраны
+        png = await self._render(chart, data, {})
+        if not png:
+            raise HttpError(404, "Нет данных для графика")
+        return 200, "image/png", png
+
+
+
+def _json(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _search_query(query: dict):
+    """search.SearchQuery из параметров запроса или None, если фильтров нет."""
+    from search import SearchQuery
+
+    category_type = query.get("type") or None
+    if category_type not in (None, "income", "expense"):
+        raise HttpError(400, "type: income или expense")
+    search = SearchQuery(
+        text=query.get("q", ""),
+        category_type=category_type,
+        categories=[query["category"]] if query.get("category") else [],
+        min_amount=_parse_number(query.get("min"), "min"),
+        max_amount=_parse_number(query.get("max"), "max"),
+        start=_parse_date(query.get("start"), "start"),
+        end=_parse_date(query.get("end"), "end"),
+    )
+    return search if search else None
+
+
+def _page(backend: CsvBackend, search, offset: int, limit: int) -> dict:
+    """Страница операций (выполняется в пуле потоков под блокировкой чтения)."""
+    store = backend.transactions
+    if search is None:
+        total = len(store)
+        rows = range(offset, min(offset + limit, total))
+    else:
+        found = store.search_index.search(search).rows
+        total = len(found)
+        rows = found[offset:offset + limit].tolist()
+    return {"total": total, "offset": offset,
+            "transactions": [dict(store[i].to_dict(), index=i) for i in rows]}
+
+
+def _append(backend: CsvBackend, transactions: list, skip_duplicates: bool) -> dict:
+    """Дозапись операций (выполняется в пуле потоков под блокировкой записи)."""
+    skipped = 0
+    if skip_duplicates:
+        index = backend.duplicate_index()
+        fresh = []
+        for t in transactions:
+            if index.is_duplicate(t.amount, t.category.name, t.date, t.comment or ""):
+                skipped += 1
+                continue
+            # Повтор внутри самого запроса тоже пропускается
+            index.add(t.amount, t.category.name, t.date.toordinal(), t.comment or "")
+            fresh.append(t)
+        for t in fresh:
+            index.remove(t.amount, t.category.name, t.date.toordinal(), t.comment or "")
+        transactions = fresh
+    if transactions:
+        backend.append(transactions)
+    count_metric("server.rows_added", len(transactions))
+    return {"added": len(transactions), "skipped": skipped, "total": len(backend.transactions)}
+
+
+async def serve(root: str, host: str, port: int, cache_size: int):
+    server = LedgerServer(root, cache_size)
+    port = await server.start(host, port)
+    print(f"[INFO] Сервер журналов: http://{host}:{port}/ledgers (каталог {root})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP-сервер журналов операций")
+    parser.add_argument("--root", default="data/ledgers", help="каталог журналов (по умолчанию data/ledgers)")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="порт (по умолчанию 8765)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"сколько журналов держать в памяти (по умолчанию {DEFAULT_CACHE_SIZE})")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.root, exist_ok=True)
+    try:
+        asyncio.run(serve(args.root, args.host, args.port, args.cache_size))
+    except KeyboardInterrupt:
+        print("[INFO] Сервер остановлен.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
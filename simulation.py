@@ -0,0 +1,144 @@
+"""
+Моделирование будущего баланса методом Монте-Карло.
+
+Модель строится по помесячным итогам категорий (analysis.category_monthly_stats):
+в каждом месяце категория активна с вероятностью active_share, а модуль её
+месячной суммы распределён логнормально с параметрами из истории журнала.
+
+Все пути моделируются одним вычислением над массивом (пути × месяцы ×
+категории). Большие прогоны делятся на части фиксированного размера,
+которые можно считать в пуле процессов; зерно каждой части получается из
+общего seed через numpy.random.SeedSequence, поэтому результат зависит
+только от seed и числа путей, но не от числа процессов.
+
+Результат — перцентильные полосы баланса на конец каждого месяца.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+
+from instrumentation import timed
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Размер части прогона в элементах массива пути × месяцы × категории
+CHUNK_ELEMENTS = 4_000_000
+
+
+
+class SimulationModel:
+    """
+    Параметры модели.
+
+    Attributes:
+        categories (list): Названия категорий
+        sign, active_share, log_mean, log_std (np.ndarray): Параметры категорий
+            (см. analysis.category_monthly_stats)
+        start_balance (float): Баланс на начало моделирования, руб.
+        start_month (np.datetime64): Первый моделируемый месяц (datetime64[M])
+    """
+
+    def __init__(self, stats, start_balance: float, start_month):
+        self.categories = list(stats["category"])
+        self.sign = stats["sign"].to_numpy(dtype=np.float64)
+        self.active_share = stats["active_share"].to_numpy(dtype=np.float64)
+        self.log_mean = stats["log_mean"].to_numpy(dtype=np.float64)
+        self.log_std = stats["log_std"].to_numpy(dtype=np.float64)
+        self.start_balance = float(start_balance)
+        self.start_month = np.datetime64(start_month, "M")
+
+
+
+class SimulationResult:
+    """
+    Перцентильные полосы баланса.
+
+    Attributes:
+        months (np.ndarray): Месяцы (datetime64[M])
+        percentiles (tuple): Уровни перцентилей
+        bands (np.ndarray): Баланс на конец месяца (перцентили × месяцы), руб.
+        negative_share (np.ndarray): Доля путей с отрицательным балансом по месяцам
+        paths (int): Число смоделированных путей
+    """
+
+    def __init__(self, months, percentiles, bands, negative_share, paths):
+        self.months = months
+        self.percentiles = tuple(percentiles)
+        self.bands = bands
+        self.negative_share = negative_share
+        self.paths = paths
+
+    def band(self, percentile) -> np.ndarray:
+        return self.bands[self.percentiles.index(percentile)]
+
+
+
+def fit_model(transactions, today: date = None) -> SimulationModel:
+    """
+    Модель по истории журнала: параметры категорий, текущий баланс;
+    моделирование начинается со следующего месяца после сегодняшнего
+    или после последней операции, если она позже.
+    """
+    from analysis import category_monthly_stats
+    from store import TransactionStore
+
+    store = TransactionStore.from_transactions(transactions)
+    last = max(today or date.today(), store.rollup.last_day() or date.min)
+    start_month = np.datetime64(last, "M") + 1
+    return SimulationModel(category_monthly_stats(store), float(store.totals.balance), start_month)
+
+
+def _simulate_chunk(model: SimulationModel, months: int, paths: int, seed) -> np.ndarray:
+    """Баланс на конец каждого месяца для paths путей (пути × месяцы, float64)."""
+    rng = np.random.default_rng(seed)
+    shape = (paths, months, len(model.categories))
+    # Логнормальные суммы через float32 — вдвое быстрее rng.lognormal
+    amounts = rng.standard_normal(shape, dtype=np.float32)
+    amounts *= model.log_std.astype(np.float32)
+    amounts += model.log_mean.astype(np.float32)
+    np.exp(amounts, out=amounts)
+    amounts *= rng.random(shape, dtype=np.float32) < model.active_share.astype(np.float32)
+    # Потоки и баланс — в float64: у float32 при балансе в десятки миллионов
+    # шаг больше рубля, и копейки и знак около нуля теряются
+    flows = np.matmul(amounts, model.sign, dtype=np.float64)
+    return model.start_balance + np.cumsum(flows, axis=1)
+
+
+def _chunk_sizes(paths: int, months: int, categories: int) -> list:
+    size = max(1, CHUNK_ELEMENTS // max(months * categories, 1))
+    return [min(size, paths - start) for start in range(0, paths, size)]
+
+
+@timed()
+def simulate(model: SimulationModel, months: int = 12, paths: int = 10_000, seed: int = 0,
+             workers: int = 1, percentiles=DEFAULT_PERCENTILES) -> SimulationResult:
+    """
+    Моделирует paths путей баланса на months месяцев вперёд.
+
+    Параметры:
+        seed: зерно; одинаковые seed и paths дают одинаковый результат
+        workers: число процессов для больших прогонов (1 — в текущем процессе)
+    """
+    if months < 1 or paths < 1:
+        raise ValueError("Число месяцев и путей должно быть положительным")
+    sizes = _chunk_sizes(paths, months, len(model.categories))
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = ([model] * len(sizes), [months] * len(sizes), sizes, seeds)
+
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            chunks = list(pool.map(_simulate_chunk, *jobs))
+    else:
+        chunks = list(map(_simulate_chunk, *jobs))
+
+    balances = np.concatenate(chunks)
+    return SimulationResult(
+        model.start_month + np.arange(months),
+        percentiles,
+        np.percentile(balances, percentiles, axis=0),
+        (balances < 0).mean(axis=0),
+        paths,
+    )
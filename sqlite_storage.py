@@ -0,0 +1,253 @@
+"""
+Хранилище транзакций в SQLite.
+
+Таблица transactions повторяет схему CSV; индексы по дате, категории и
+типу позволяют считать агрегаты за период прямо в SQL, не загружая
+весь журнал в память. База работает в режиме WAL, вставки идут пачками
+внутри транзакций.
+
+Перенос существующего CSV:
+    python sqlite_storage.py [data/finances.csv] [data/finances.db]
+"""
+import json
+import os
+import sqlite3
+import sys
+from datetime import date
+from instrumentation import timed
+from budgets import Budget
+from storage import DATA_FILE, StorageBackend, load_transactions_bulk
+from store import TransactionStore
+
+# Путь к базе данных по умолчанию
+DB_FILE = "data/finances.db"
+
+# Число строк в одной пачке executemany
+BATCH_SIZE = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id       INTEGER PRIMARY KEY,
+    amount   REAL NOT NULL,
+    category TEXT NOT NULL,
+    type     TEXT NOT NULL,
+    date     TEXT NOT NULL,
+    comment  TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type, date);
+CREATE TABLE IF NOT EXISTS budgets (
+    id         INTEGER PRIMARY KEY,
+    category   TEXT NOT NULL,
+    amount     REAL NOT NULL,
+    period     TEXT NOT NULL,
+    thresholds TEXT NOT NULL
+);
+"""
+
+# Суммы в агрегатах считаются в целых копейках, как и в RunningTotals
+_KOPECKS = "CAST(ROUND(amount * 100) AS INTEGER)"
+
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Бэкенд SQLite.
+
+    Даты хранятся строками ГГГГ-ММ-ДД: такой формат сортируется как дата и
+    позволяет использовать индекс для условий по диапазону.
+    """
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or DB_FILE
+        self._conn = None
+
+    def connect(self) -> sqlite3.Connection:
+        """Открывает соединение (один раз) и создаёт схему при необходимости."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- Запись и чтение ---
+
+    @timed()
+    def load(self, batch_size: int = BATCH_SIZE) -> TransactionStore:
+        """
+        Загружает журнал в TransactionStore пачками по batch_size строк.
+
+        Строки в базе уже проверены при вставке, поэтому колонки пачки
+        добавляются разом через extend_columns(); даты, категории и
+        комментарии разбираются и интернируются один раз на значение.
+        """
+        transactions = TransactionStore()
+        ordinals, category_ids, comment_ids = {}, {}, {}
+        cursor = self.connect().execute(
+            "SELECT amount, category, type, date, comment FROM transactions ORDER BY id"
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            amounts, days, categories, comments = [], [], [], []
+            for amount, category, category_type, date_str, comment in rows:
+                amounts.append(amount)
+                day = ordinals.get(date_str)
+                if day is None:
+                    day = ordinals[date_str] = date.fromisoformat(date_str).toordinal()
+                days.append(day)
+                key = (category, category_type)
+                category_id = category_ids.get(key)
+                if category_id is None:
+                    category_id = category_ids[key] = transactions.intern_category(category, category_type)
+                categories.append(category_id)
+                comment_id = comment_ids.get(comment)
+                if comment_id is None:
+                    comment_id = comment_ids[comment] = transactions.intern_comment(comment.strip())
+                comments.append(comment_id)
+            transactions.extend_columns(amounts, days, categories, comments)
+        self.transactions = transactions
+        return transactions
+
+    def _insert(self, conn: sqlite3.Connection, transactions, batch_size: int) -> int:
+        """Вставляет транзакции пачками; вызывается внутри транзакции БД."""
+        count = 0
+        batch = []
+        for t in transactions:
+            batch.append((t.amount, t.category.name, t.category.category_type,
+                          t.date.isoformat(), t.comment or ""))
+            if len(batch) >= batch_size:
+                conn.executemany(
+                    "INSERT INTO transactions (amount, category, type, date, comment) "
+                    "VALUES (?, ?, ?, ?, ?)", batch)
+                count += len(batch)
+                batch.clear()
+        if batch:
+            conn.executemany(
+                "INSERT INTO transactions (amount, category, type, date, comment) "
+                "VALUES (?, ?, ?, ?, ?)", batch)
+            count += len(batch)
+        return count
+
+    @timed()
+    def append(self, transactions, batch_size: int = BATCH_SIZE) -> None:
+        transactions = list(transactions)
+        conn = self.connect()
+        with conn:
+            self._insert(conn, transactions, batch_size)
+        if self.transactions is not None:
+            self.transactions.extend(transactions)
+
+    @timed()
+    def save(self, transactions, batch_size: int = BATCH_SIZE) -> None:
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM transactions")
+            self._insert(conn, transactions, batch_size)
+        self.transactions = TransactionStore.from_transactions(transactions)
+
+    # --- Бюджеты (таблица budgets той же базы) ---
+
+    def load_budgets(self) -> list:
+        budgets = []
+        rows = self.connect().execute(
+            "SELECT category, amount, period, thresholds FROM budgets ORDER BY id")
+        for category, amount, period, thresholds in rows:
+            try:
+                budgets.append(Budget.from_dict({"category": category, "limit": amount, "period": period,
+                                                 "thresholds": json.loads(thresholds)}))
+            except (TypeError, ValueError) as e:
+                print(f"[WARNING] Пропущен бюджет {category!r}: {e}")
+        return budgets
+
+    def save_budgets(self, budgets) -> None:
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM budgets")
+            conn.executemany(
+                "INSERT INTO budgets (category, amount, period, thresholds) VALUES (?, ?, ?, ?)",
+                [(b.category.name, b.limit, b.period, json.dumps(list(b.thresholds))) for b in budgets])
+
+    # --- Агрегаты в SQL ---
+
+    @staticmethod
+    def _where(start, end, extra: str = "") -> tuple:
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(end.isoformat())
+        if extra:
+            conditions.append(extra)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, params
+
+    def totals(self, start=None, end=None) -> tuple:
+        where, params = self._where(start, end)
+        income, expense = self.connect().execute(
+            "SELECT COALESCE(SUM(CASE WHEN amount > 0 THEN " + _KOPECKS + " END), 0),"
+            "       COALESCE(SUM(CASE WHEN amount < 0 THEN -" + _KOPECKS + " END), 0)"
+            " FROM transactions" + where, params
+        ).fetchone()
+        return income / 100, expense / 100
+
+    def category_totals(self, start=None, end=None) -> list:
+        where, params = self._where(start, end)
+        rows = self.connect().execute(
+            "SELECT category, SUM(" + _KOPECKS + ") FROM transactions" + where +
+            " GROUP BY category ORDER BY MIN(id)", params
+        )
+        return [(name, total / 100) for name, total in rows]
+
+    def expense_totals_by_category(self, start=None, end=None) -> list:
+        where, params = self._where(start, end, "amount < 0")
+        rows = self.connect().execute(
+            "SELECT category, -SUM(" + _KOPECKS + ") FROM transactions" + where +
+            " GROUP BY category ORDER BY MIN(id)", params
+        )
+        return [(name, total / 100) for name, total in rows]
+
+    def daily_totals(self, start=None, end=None) -> list:
+        where, params = self._where(start, end)
+        rows = self.connect().execute(
+            "SELECT date,"
+            "       COALESCE(SUM(CASE WHEN amount > 0 THEN " + _KOPECKS + " END), 0),"
+            "       COALESCE(SUM(CASE WHEN amount < 0 THEN -" + _KOPECKS + " END), 0)"
+            " FROM transactions" + where + " GROUP BY date ORDER BY date", params
+        )
+        return [(date.fromisoformat(d), income / 100, expense / 100) for d, income, expense in rows]
+
+
+
+def migrate_csv(csv_path: str = None, db_path: str = None, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Переносит транзакции из CSV в базу SQLite (существующие записи базы заменяются).
+
+    Returns:
+        Число перенесённых транзакций.
+    """
+    transactions = load_transactions_bulk(csv_path or DATA_FILE)
+    backend = SqliteBackend(db_path)
+    try:
+        backend.save(transactions, batch_size)
+    finally:
+        backend.close()
+    print(f"[INFO] Перенесено {len(transactions)} записей в {backend.path}")
+    return len(transactions)
+
+
+if __name__ == "__main__":
+    migrate_csv(*sys.argv[1:3])
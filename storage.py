@@ -1,89 +1,1158 @@
 
 import csv
+import io
+import json
+import mmap
 import os
-from models import Transaction, Category
-from datetime import datetime
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager, nullcontext
+from instrumentation import count as count_metric, timed
+from models import Category
+from aggregates import to_kopecks
+from rollup import RollupIndex
+from duplicates import NEAR_WINDOW_DAYS
+from budgets import Budget
+from store import TransactionStore
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки через msvcrt, только исключительные
+    fcntl = None
+    import msvcrt
 
 # Путь к файлу данных
 DATA_FILE = "data/finances.csv"
 
 
 
-def load_transactions() -> list:
+@timed()
+def load_transactions(path: str = None, report: "LoadReport" = None) -> TransactionStore:
     """
-    Загружает транзакции из CSV-файла.
+    Загружает транзакции из CSV-файла (по умолчанию DATA_FILE).
+
+    Если передан report (LoadReport), пропущенные строки собираются в нём,
+    а не выводятся по одной.
     
     Returns:
-        Список объектов Transaction.
+        TransactionStore — колоночное хранилище транзакций.
     """
-    transactions = []
+    path = path or DATA_FILE
+    transactions = TransactionStore()
     
-    if not os.path.exists(DATA_FILE):
-        print(f"[INFO] Файл {DATA_FILE} не найден. Будет создан при сохранении.")
+    if not os.path.exists(path):
+        print(f"[INFO] Файл {path} не найден. Будет создан при сохранении.")
         return transactions
 
     try:
-        with open(DATA_FILE, "r", encoding="utf-8", newline="") as f:
+        with open(path, "r", encoding="utf-8", newline="") as f:
             reader = csv.DictReader(f)
             
             # Проверяем, есть ли заголовки
             if reader.fieldnames is None:
-                print(f"[WARNING] Файл {DATA_FILE} пуст или не содержит заголовков.")
+                print(f"[WARNING] Файл {path} пуст или не содержит заголовков.")
                 return transactions
             
-            for row in reader:
-                try:
-                    # Преобразуем поля
-                    amount = float(row["amount"])
-                    category_name = row["category"]
-                    category_type = row["type"]  # в CSV поле называется "type"
-                    date = datetime.strptime(row["date"], "%Y-%m-%d").date()
-                    comment = row.get("comment", "")  # если нет — пустая строка
-
-                    # Создаём объекты
-                    category = Category(category_name, category_type)
-                    transaction = Transaction(amount, category, date, comment)
-                    transactions.append(transaction)
-
-                except (ValueError, KeyError) as e:
-                    print(f"[WARNING] Пропущена строка: {row} | Ошибка: {e}")
-                except Exception as e:
-                    print(f"[ERROR] Неожиданная ошибка при обработке строки: {row} | {e}")
+            _add_rows(transactions, reader, report)
 
     except FileNotFoundError:
-        print(f"[ERROR] Файл {DATA_FILE} не найден.")
+        print(f"[ERROR] Файл {path} не найден.")
     except PermissionError:
-        print(f"[ERROR] Нет прав на чтение файла {DATA_FILE}.")
+        print(f"[ERROR] Нет прав на чтение файла {path}.")
     except Exception as e:
         print(f"[ERROR] Неизвестная ошибка при чтении файла: {e}")
 
+    count_metric("storage.rows_loaded", len(transactions))
     return transactions
 
 
+def _add_rows(transactions: TransactionStore, reader, report: "LoadReport" = None) -> None:
+    """
+    Добавляет в хранилище строки csv.DictReader; некорректные строки
+    пропускаются (и попадают в report, если он передан).
+    """
+    for row_number, row in enumerate(reader, 1):
+        if report is not None:
+            report.rows_total += 1
+        try:
+            # Преобразуем поля
+            amount = float(row["amount"])
+            category_name = row["category"]
+            category_type = row["type"]  # в CSV поле называется "type"
+            date = datetime.strptime(row["date"], "%Y-%m-%d").date()
+            comment = row.get("comment") or ""  # если нет — пустая строка
+
+            # Категории интернируются, объекты Transaction не создаются
+            transactions.add(amount, category_name, category_type, date, comment)
+
+        except (ValueError, KeyError, OverflowError) as e:
+            if report is not None:
+                report.add_errors([row_number], str(e))
+            else:
+                print(f"[WARNING] Пропущена строка: {row} | Ошибка: {e}")
+        except Exception as e:
+            if report is not None:
+                report.add_errors([row_number], str(e))
+            else:
+                print(f"[ERROR] Неожиданная ошибка при обработке строки: {row} | {e}")
+
+
+
+class LoadReport:
+    """
+    Сводный отчёт о загрузке: вместо отдельного сообщения на каждую
+    некорректную строку ошибки собираются в один список.
+
+    Attributes:
+        rows_total (int): Сколько строк данных прочитано
+        rows_loaded (int): Сколько строк попало в хранилище
+        errors (list): Пары (номер строки данных, начиная с 1; причина)
+    """
+
+    def __init__(self):
+        self.rows_total = 0
+        self.rows_loaded = 0
+        self.errors = []
+
+    def add_errors(self, row_numbers, reason: str):
+        self.errors.extend((int(n), reason) for n in row_numbers)
+
+    def summary(self) -> str:
+        """Краткий текст отчёта с группировкой по причинам."""
+        text = f"Загружено {self.rows_loaded} из {self.rows_total} строк"
+        if not self.errors:
+            return text
+        by_reason = {}
+        for row_number, reason in self.errors:
+            by_reason.setdefault(reason, []).append(row_number)
+        lines = [text + f", пропущено {len(self.errors)}:"]
+        for reason, rows in by_reason.items():
+            preview = ", ".join(str(n) for n in rows[:10])
+            more = " …" if len(rows) > 10 else ""
+            lines.append(f"  {reason}: {len(rows)} (строки {preview}{more})")
+        return "\n".join(lines)
+
+
+
+_REQUIRED_COLUMNS = ("amount", "category", "type", "date")
+_BULK_DTYPES = {
+    "amount": str,
+    "category": "category",
+    "type": "category",
+    "date": "category",
+    "comment": "category",
+}
+
+
+@timed()
+def load_transactions_bulk(path: str = None, chunksize: int = 200_000,
+                           report: LoadReport = None) -> TransactionStore:
+    """
+    Быстрая загрузка CSV: файл читается блоками через pandas, а разбор дат,
+    сумм и проверка названий категорий выполняются над целыми колонками.
+
+    Результат совпадает с load_transactions(); ошибки собираются в
+    LoadReport и выводятся одним сообщением.
+
+    Параметры:
+        path: путь к CSV (по умолчанию DATA_FILE)
+        chunksize: число строк в одном блоке
+        report: объект LoadReport для заполнения (создаётся, если не передан)
+    """
+    import pandas as pd
+
+    path = path or DATA_FILE
+    report = report if report is not None else LoadReport()
+    transactions = TransactionStore()
+
+    if not os.path.exists(path):
+        print(f"[INFO] Файл {path} не найден. Будет создан при сохранении.")
+        return transactions
 
-def save_transactions(transactions: list):
     try:
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-        with open(DATA_FILE, "w", encoding="utf-8", newline="") as f:
-            fieldnames = ["amount", "category", "type", "date", "comment"]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-
-            for t in transactions:  # ← проходим по ВСЕМ транзакциям
-                writer.writerow({
-                    "amount": t.amount,
-                    "category": t.category.name,
-                    "type": t.category.category_type,
-                    "date": t.date.strftime("%Y-%m-%d"),
-                    "comment": t.comment or ""
-                })
-        print(f"[INFO] Сохранено {len(transactions)} записей в {DATA_FILE}")
+        chunks = pd.read_csv(
+            path, dtype=_BULK_DTYPES, keep_default_na=False,
+            encoding="utf-8", index_col=False, chunksize=chunksize
+        )
+        offset = 0
+        for chunk in chunks:
+            _load_chunk(chunk, offset, transactions, report)
+            offset += len(chunk)
+    except pd.errors.EmptyDataError:
+        print(f"[WARNING] Файл {path} пуст или не содержит заголовков.")
+        return transactions
+    except pd.errors.ParserError as e:
+        # Строки с лишними полями pandas не разбирает — читаем построчно;
+        # отчёт заполняется заново, уже прочитанные блоки отбрасываются
+        print(f"[INFO] Быстрый разбор невозможен ({e}), используется построчная загрузка.")
+        report.rows_total = 0
+        report.errors.clear()
+        transactions = load_transactions(path, report)
+        report.rows_loaded = len(transactions)
+        if report.errors:
+            print(f"[WARNING] {report.summary()}")
+        return transactions
+    except PermissionError:
+        print(f"[ERROR] Нет прав на чтение файла {path}.")
     except Exception as e:
-        print(f"[ERROR] Не удалось сохранить: {e}")
+        print(f"[ERROR] Неизвестная ошибка при чтении файла: {e}")
 
-    except PermissionError:
-        print(f"[ERROR] Нет прав на запись в файл {DATA_FILE}.")
+    report.rows_loaded = len(transactions)
+    count_metric("storage.rows_loaded", len(transactions))
+    if report.errors:
+        print(f"[WARNING] {report.summary()}")
+    return transactions
+
+
+def _column_codes(column):
+    """Коды и уникальные значения категориальной колонки ("" вместо пропусков)."""
+    import numpy as np
+    codes = column.cat.codes.to_numpy(dtype=np.int64, copy=True)
+    uniques = np.asarray(list(column.cat.categories) + [""], dtype=object)
+    codes[codes < 0] = len(uniques) - 1
+    return codes, uniques
+
+
+def _load_chunk(chunk, offset: int, transactions: TransactionStore, report: LoadReport):
+    """
+    Проверяет и добавляет в хранилище один блок строк.
+
+    Текстовые колонки приходят из парсера категориальными, поэтому разбор
+    дат, проверка названий и strip() комментариев выполняются один раз на
+    уникальное значение, а результат раздаётся строкам через коды.
+    """
+    import numpy as np
+    import pandas as pd
+
+    n = len(chunk)
+    report.rows_total += n
+    row_numbers = np.arange(offset + 1, offset + n + 1)
+
+    missing = [c for c in _REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        report.add_errors(row_numbers, f"Нет столбца {missing[0]!r}")
+        return
+
+    valid = np.ones(n, dtype=bool)
+
+    def reject(mask, reason):
+        mask = mask & valid
+        if mask.any():
+            report.add_errors(row_numbers[mask], reason)
+            valid[mask] = False
+
+    # Суммы: векторный разбор, спорные значения перепроверяются через float()
+    amount_text = chunk["amount"]
+    amounts = pd.to_numeric(amount_text, errors="coerce").to_numpy(dtype=float, copy=True)
+    ok_amounts = ~np.isnan(amounts)
+    for i in np.flatnonzero(~ok_amounts):
+        try:
+            amounts[i] = float(amount_text.iat[i])
+            ok_amounts[i] = True
+        except ValueError:
+            pass
+    reject(~ok_amounts, "Некорректная сумма")
+    reject(amounts == 0, "Сумма не может быть нулевой")
+
+    # Даты: тот же формат, что и в datetime.strptime(..., "%Y-%m-%d")
+    date_codes, date_uniques = _column_codes(chunk["date"])
+    parsed = pd.to_datetime(pd.Series(date_uniques), format="%Y-%m-%d", errors="coerce")
+    ok_dates = parsed.notna().to_numpy(copy=True)
+    ordinals = np.zeros(len(date_uniques), dtype=np.int64)
+    ordinals[ok_dates] = (
+        parsed[ok_dates].to_numpy().astype("datetime64[D]").astype(np.int64)
+        + date(1970, 1, 1).toordinal()
+    )
+    for i in np.flatnonzero(~ok_dates):
+        try:
+            ordinals[i] = datetime.strptime(date_uniques[i], "%Y-%m-%d").toordinal()
+            ok_dates[i] = True
+        except ValueError:
+            pass
+    reject(~ok_dates[date_codes], "Некорректная дата")
+
+    # Названия категорий: та же (кэшированная) проверка, что и в Category
+    name_codes, name_uniques = _column_codes(chunk["category"])
+    ok_names = np.array([Category.is_valid_name(name) for name in name_uniques], dtype=bool)
+    reject(~ok_names[name_codes], "Некорректное название категории")
+
+    if not valid.any():
+        return
+
+    # Интернирование: по одному обращению на уникальную пару (имя, тип)
+    type_codes, type_uniques = _column_codes(chunk["type"])
+    pair_codes, pair_uniques = pd.factorize(
+        name_codes[valid] * len(type_uniques) + type_codes[valid])
+    pair_ids = np.array([
+        transactions.intern_category(name_uniques[c // len(type_uniques)],
+                                     type_uniques[c % len(type_uniques)])
+        for c in pair_uniques
+    ], dtype=np.int64)
+
+    if "comment" in chunk.columns:
+        comment_codes, comment_uniques = _column_codes(chunk["comment"])
+        comment_codes, used = pd.factorize(comment_codes[valid])
+        comment_ids = np.array(
+            [transactions.intern_comment(comment_uniques[c].strip()) for c in used],
+            dtype=np.int64)[comment_codes]
+    else:
+        comment_ids = np.zeros(int(valid.sum()), dtype=np.int64)
+
+    transactions.extend_columns(
+        amounts[valid],
+        ordinals[date_codes[valid]],
+        pair_ids[pair_codes],
+        comment_ids
+    )
+
+
+FIELDNAMES = ["amount", "category", "type", "date", "comment"]
+
+
+def _to_row(t) -> dict:
+    """Преобразует транзакцию в строку CSV."""
+    return {
+        "amount": t.amount,
+        "category": t.category.name,
+        "type": t.category.category_type,
+        "date": t.date.strftime("%Y-%m-%d"),
+        "comment": t.comment or ""
+    }
+
+
+def _temp_file_near(target: str):
+    """
+    Создаёт временный файл в каталоге target для атомарной замены.
+
+    mkstemp создаёт файл с правами 0600 — выставляем обычные права с
+    учётом umask, чтобы после os.replace() файл не стал «приватным».
+    """
+    directory = os.path.dirname(target) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".finances-", suffix=".tmp", dir=directory)
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp_path, 0o666 & ~umask)
+    return fd, tmp_path
+
+
+def _ends_with_newline(path: str) -> bool:
+    """Проверяет, заканчивается ли файл переводом строки."""
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b"\n", b"\r")
+
+
+# --- Совместный доступ к CSV ---
+#
+# Несколько процессов (окна приложения, импорт, сервер) могут работать с
+# одним журналом. Запись идёт под исключительной рекомендательной
+# блокировкой, чтение — под разделяемой. Блокируется отдельный файл .lock:
+# save_transactions подменяет CSV через os.replace(), и блокировка самого
+# CSV осталась бы на старом файле.
+#
+# Чужие изменения обнаруживаются по отпечатку прочитанной части файла
+# (FileState). Если строки только дописаны, они дочитываются в хранилище
+# с места, где закончилось прошлое чтение. Если файл переписан, он
+# загружается заново.
+
+# Сколько байт в начале и в конце прочитанной части входит в контрольную сумму
+CHECK_BYTES = 4096
+
+
+def lock_path(path: str = None) -> str:
+    """Путь к файлу блокировки: data/finances.csv -> data/finances.lock."""
+    return os.path.splitext(path or DATA_FILE)[0] + ".lock"
+
+
+@contextmanager
+def file_lock(path: str = None, shared: bool = False, blocking: bool = True):
+    """
+    Рекомендательная блокировка журнала между процессами.
+
+    Параметры:
+        shared: разделяемая блокировка для чтения (на Windows — исключительная)
+        blocking: ждать освобождения; иначе занятая блокировка даёт BlockingIOError
+
+    Блокировка не повторно входимая: в одном процессе нельзя брать её
+    второй раз, пока держится первая.
+    """
+    target = lock_path(path)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    with open(target, "a+b") as f:
+        if fcntl is not None:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(f.fileno(), mode if blocking else mode | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            except OSError as e:
+                raise BlockingIOError(f"Журнал {path} занят другим процессом") from e
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _checksum(path: str, offset: int) -> int:
+    """CRC32 первых и последних CHECK_BYTES байт из первых offset байт файла."""
+    with open(path, "rb") as f:
+        head = f.read(min(offset, CHECK_BYTES))
+        f.seek(max(offset - CHECK_BYTES, 0))
+        tail = f.read(offset - f.tell())
+    return zlib.crc32(tail, zlib.crc32(head))
+
+
+
+class FileState:
+    """
+    Отпечаток уже прочитанной части CSV.
+
+    Attributes:
+        offset (int): Сколько байт файла отражено в хранилище
+        mtime_ns (int): Время изменения файла на момент чтения
+        checksum (int): CRC32 начала и конца прочитанной части
+    """
+
+    def __init__(self, offset: int = 0, mtime_ns: int = 0, checksum: int = 0):
+        self.offset = offset
+        self.mtime_ns = mtime_ns
+        self.checksum = checksum
+
+    @classmethod
+    def capture(cls, path: str, offset: int = None) -> "FileState":
+        """Отпечаток первых offset байт файла (по умолчанию — всего файла)."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return cls()
+        offset = stat.st_size if offset is None else offset
+        return cls(offset, stat.st_mtime_ns, _checksum(path, offset))
+
+    def change(self, path: str) -> str:
+        """
+        Что произошло с файлом после снятия отпечатка:
+        "none" — ничего, "appended" — дописаны строки, "rewritten" — файл переписан.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return "rewritten" if self.offset else "none"
+        if stat.st_size == self.offset and stat.st_mtime_ns == self.mtime_ns:
+            return "none"
+        if stat.st_size >= self.offset and _checksum(path, self.offset) == self.checksum:
+            return "appended"
+        return "rewritten"
+
+
+@timed()
+def read_appended(transactions: TransactionStore, path: str, offset: int) -> int:
+    """
+    Дочитывает в хранилище строки, дописанные в CSV после байта offset.
+
+    Незаконченная последняя строка (запись ещё идёт) не читается.
+
+    Returns:
+        Новое смещение — конец последней прочитанной строки.
+    """
+    with open(path, "rb") as f:
+        header = f.readline() if offset else b""
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if not end:
+        return offset
+
+    before = len(transactions)
+    text = (header + data[:end]).decode("utf-8")
+    _add_rows(transactions, csv.DictReader(io.StringIO(text, newline="")))
+    count_metric("storage.rows_merged", len(transactions) - before)
+    return offset + end
+
+
+@timed()
+def append_transactions(transactions, path: str = None, lock: bool = True) -> None:
+    """
+    Дописывает транзакции в конец файла (журнальный режим).
+
+    Стоимость записи не зависит от размера журнала: существующие строки
+    не перечитываются и не переписываются. lock=False — блокировку уже
+    держит вызывающий (см. file_lock).
+    """
+    path = path or DATA_FILE
+    with file_lock(path) if lock else nullcontext():
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            needs_newline = not is_new and not _ends_with_newline(path)
+
+            with open(path, "a", encoding="utf-8", newline="") as f:
+                if needs_newline:
+                    f.write("\r\n")
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+                if is_new:
+                    writer.writeheader()
+                written = 0
+                for t in transactions:
+                    writer.writerow(_to_row(t))
+                    written += 1
+                f.flush()
+                os.fsync(f.fileno())
+            count_metric("storage.rows_written", written)
+        except PermissionError:
+            print(f"[ERROR] Нет прав на запись в файл {path}.")
+            raise
+        except OSError as e:
+            print(f"[ERROR] Ошибка файловой системы: {e}")
+            raise
+
+
+def append_transaction(transaction, path: str = None) -> None:
+    """Дописывает одну транзакцию в конец файла."""
+    append_transactions([transaction], path)
+
+
+def compact_transactions(transactions=None, path: str = None) -> None:
+    """
+    Уплотняет журнал: атомарно переписывает файл целиком.
+
+    Если список не передан, журнал перечитывается с диска — при этом
+    отбрасываются повреждённые строки. Чтение и запись идут под одной
+    блокировкой: строки, которые другие процессы дописывают в это время,
+    не теряются.
+    """
+    with file_lock(path):
+        if transactions is None:
+            transactions = load_transactions(path)
+        save_transactions(transactions, path, lock=False)
+
+
+@timed()
+def save_transactions(transactions: list, path: str = None, lock: bool = True):
+    """
+    Сохраняет все транзакции в файл.
+
+    Запись идёт во временный файл рядом с CSV, который затем
+    атомарно подменяет исходный — сбой посередине не портит данные.
+    lock=False — блокировку уже держит вызывающий (см. file_lock).
+    """
+    path = path or DATA_FILE
+    with file_lock(path) if lock else nullcontext():
+        tmp_path = None
+        try:
+            fd, tmp_path = _temp_file_near(path)
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+                writer.writeheader()
+
+                for t in transactions:  # ← проходим по ВСЕМ транзакциям
+                    writer.writerow(_to_row(t))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            tmp_path = None
+            count_metric("storage.rows_written", len(transactions))
+            print(f"[INFO] Сохранено {len(transactions)} записей в {path}")
+        except PermissionError:
+            print(f"[ERROR] Нет прав на запись в файл {path}.")
+        except OSError as e:
+            print(f"[ERROR] Ошибка файловой системы: {e}")
+        except Exception as e:
+            print(f"[ERROR] Неизвестная ошибка при сохранении: {e}")
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+
+# --- Бинарный снимок ---
+#
+# Формат (порядок байтов — как у платформы, отмечен флагом в заголовке):
+#   заголовок 64 байта: magic, версия, флаги, число строк, категорий,
+#                       комментариев, mtime_ns и размер исходного CSV;
+#   колонки: amount float64[n], date int32[n], category_id int32[n], comment_id int32[n];
+#   таблица строк категорий (имя, тип по очереди) и пул комментариев:
+#   смещения uint64[k + 1] и блок UTF-8.
+# Все секции выровнены по 8 байт.
+
+SNAPSHOT_MAGIC = b"FINSNAP\0"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<8sIIQQQqQ")
+_SNAPSHOT_HEADER_SIZE = 64
+_FLAG_LITTLE_ENDIAN = 1
+
+
+def snapshot_path(path: str = None) -> str:
+    """Путь к снимку рядом с CSV: data/finances.csv -> data/finances.snap."""
+    return os.path.splitext(path or DATA_FILE)[0] + ".snap"
+
+
+def _pad8(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _string_table(strings) -> bytes:
+    """Смещения uint64[k + 1] + блок UTF-8, дополненный до 8 байт."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("Q", [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    blob = b"".join(encoded)
+    return offsets.tobytes() + blob + b"\0" * (_pad8(len(blob)) - len(blob))
+
+
+class _SnapshotStrings(Sequence):
+    """Пул строк снимка: строки декодируются только при обращении."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Индекс строки вне диапазона")
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+
+@timed()
+def save_snapshot(transactions: TransactionStore, path: str = None) -> None:
+    """
+    Записывает бинарный снимок хранилища рядом с CSV.
+
+    В заголовок попадают mtime и размер CSV на момент записи — по ним
+    load_snapshot() определяет, что снимок устарел.
+    """
+    csv_path = path or DATA_FILE
+    target = snapshot_path(csv_path)
+    tmp_path = None
+    try:
+        stat = os.stat(csv_path)
+        n = len(transactions)
+        category_strings = []
+        for category in transactions.categories:
+            category_strings.extend((category.name, category.category_type))
+        comments = list(transactions.comments)
+
+        flags = _FLAG_LITTLE_ENDIAN if sys.byteorder == "little" else 0
+        header = _SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, n,
+            len(transactions.categories), len(comments),
+            stat.st_mtime_ns, stat.st_size
+        )
+        int_columns = b"".join(
+            bytes(column) for column in
+            (transactions.date_ordinals, transactions.category_ids, transactions.comment_ids)
+        )
+
+        fd, tmp_path = _temp_file_near(target)
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(_SNAPSHOT_HEADER_SIZE, b"\0"))
+            f.write(bytes(transactions.amounts))
+            f.write(int_columns + b"\0" * (_pad8(len(int_columns)) - len(int_columns)))
+            f.write(_string_table(category_strings))
+            f.write(_string_table(comments))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, target)
+        tmp_path = None
     except OSError as e:
-        print(f"[ERROR] Ошибка файловой системы: {e}")
-    except Exception as e:
-        print(f"[ERROR] Неизвестная ошибка при сохранении: {e}")
\ No newline at end of file
+        print(f"[ERROR] Не удалось записать снимок {target}: {e}")
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@timed()
+def load_snapshot(path: str = None):
+    """
+    Открывает снимок через mmap и строит хранилище поверх него без копирования.
+
+    Returns:
+        TransactionStore или None, если снимка нет, он другой версии,
+        записан на платформе с иным порядком байтов или устарел.
+    """
+    csv_path = path or DATA_FILE
+    target = snapshot_path(csv_path)
+    if not os.path.exists(target):
+        return None
+
+    try:
+        stat = os.stat(csv_path)
+        with open(target, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, flags, n, n_categories, n_comments, mtime_ns, size = \
+            _SNAPSHOT_HEADER.unpack_from(mm, 0)
+        native_flags = _FLAG_LITTLE_ENDIAN if sys.byteorder == "little" else 0
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or flags != native_flags:
+            return None
+        if mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+            return None
+
+        view = memoryview(mm)
+        pos = _SNAPSHOT_HEADER_SIZE
+
+        def take(count: int, fmt: str, itemsize: int):
+            nonlocal pos
+            column = view[pos:pos + count * itemsize].cast(fmt)
+            pos += count * itemsize
+            return column
+
+        def take_strings(count: int):
+            nonlocal pos
+            offsets = take(count + 1, "Q", 8)
+            blob = view[pos:pos + offsets[count]]
+            pos = _pad8(pos + offsets[count])
+            return _SnapshotStrings(offsets, blob)
+
+        amounts = take(n, "d", 8)
+        dates = take(n, "i", 4)
+        category_ids = take(n, "i", 4)
+        comment_ids = take(n, "i", 4)
+        pos = _pad8(pos)
+        category_strings = take_strings(2 * n_categories)
+        comments = take_strings(n_comments)
+    except (struct.error, ValueError, TypeError):
+        return None
+
+    categories = [(category_strings[2 * i], category_strings[2 * i + 1]) for i in range(n_categories)]
+    return TransactionStore.from_columns(
+        amounts, dates, category_ids, comment_ids, categories, comments, buffer=mm
+    )
+
+
+@timed()
+def load_transactions_cached(path: str = None) -> TransactionStore:
+    """
+    Загрузка для запуска приложения: сначала снимок, затем CSV.
+
+    CSV остаётся источником истины: если он изменился после записи
+    снимка (или снимка нет), данные читаются из CSV и снимок пересобирается.
+    """
+    csv_path = path or DATA_FILE
+    transactions = load_snapshot(csv_path)
+    if transactions is not None:
+        return transactions
+
+    transactions = load_transactions_bulk(csv_path)
+    if os.path.exists(csv_path):
+        save_snapshot(transactions, csv_path)
+    return transactions
+
+
+
+# --- Индекс сводок ---
+#
+# JSON рядом с CSV: дневные записи RollupIndex (месяцы и годы
+# восстанавливаются из них) с категориями по имени и типу, плюс mtime
+# и размер CSV, по которым индекс признаётся устаревшим, как и снимок.
+
+ROLLUP_VERSION = 1
+
+
+def rollup_path(path: str = None) -> str:
+    """Путь к индексу сводок для CSV-файла (data/finances.csv -> data/finances.rollup)."""
+    return os.path.splitext(path or DATA_FILE)[0] + ".rollup"
+
+
+@timed()
+def save_rollup(transactions: TransactionStore, path: str = None) -> None:
+    """Сохраняет индекс сводок хранилища рядом с CSV (атомарно)."""
+    csv_path = path or DATA_FILE
+    target = rollup_path(csv_path)
+    tmp_path = None
+    try:
+        stat = os.stat(csv_path)
+        data = {
+            "version": ROLLUP_VERSION,
+            "csv_mtime_ns": stat.st_mtime_ns,
+            "csv_size": stat.st_size,
+            "rows": len(transactions),
+            "categories": [[c.name, c.category_type] for c in transactions.categories],
+            "days": list(transactions.rollup.entries()),
+        }
+        fd, tmp_path = _temp_file_near(target)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, target)
+        tmp_path = None
+    except OSError as e:
+        print(f"[ERROR] Не удалось записать индекс сводок {target}: {e}")
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@timed()
+def load_rollup(transactions: TransactionStore, path: str = None):
+    """
+    Читает сохранённый индекс сводок для уже загруженного хранилища.
+
+    Returns:
+        RollupIndex с id категорий этого хранилища или None, если индекса
+        нет, он устарел или не соответствует данным.
+    """
+    csv_path = path or DATA_FILE
+    target = rollup_path(csv_path)
+    try:
+        stat = os.stat(csv_path)
+        with open(target, encoding="utf-8") as f:
+            data = json.load(f)
+        if (data["version"] != ROLLUP_VERSION or data["rows"] != len(transactions)
+                or data["csv_mtime_ns"] != stat.st_mtime_ns or data["csv_size"] != stat.st_size):
+            return None
+        ids = {(c.name, c.category_type): i for i, c in enumerate(transactions.categories)}
+        mapping = [ids[(name, category_type)] for name, category_type in data["categories"]]
+        return RollupIndex.from_entries(
+            (ordinal, mapping[category], income, expense, count)
+            for ordinal, category, income, expense, count in data["days"]
+        )
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+
+# --- Бюджеты ---
+#
+# JSON рядом с журналом: список Budget.to_dict(). Потраченное в файле не
+# хранится — оно берётся из индекса сводок загруженного хранилища.
+
+
+def budgets_path(path: str = None) -> str:
+    """Путь к бюджетам журнала (data/finances.csv -> data/finances.budgets)."""
+    return os.path.splitext(path or DATA_FILE)[0] + ".budgets"
+
+
+def save_budgets(budgets, path: str = None) -> None:
+    """Сохраняет бюджеты журнала path (атомарно)."""
+    target = budgets_path(path)
+    tmp_path = None
+    try:
+        fd, tmp_path = _temp_file_near(target)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump([budget.to_dict() for budget in budgets], f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, target)
+        tmp_path = None
+    except OSError as e:
+        print(f"[ERROR] Не удалось записать бюджеты {target}: {e}")
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_budgets(path: str = None) -> list:
+    """Бюджеты журнала path; пустой список, если файла нет. Некорректные записи пропускаются."""
+    target = budgets_path(path)
+    if not os.path.exists(target):
+        return []
+    try:
+        with open(target, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Не удалось прочитать бюджеты {target}: {e}")
+        return []
+    budgets = []
+    for item in data if isinstance(data, list) else []:
+        try:
+            budgets.append(Budget.from_dict(item))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[WARNING] Пропущен бюджет {item!r}: {e}")
+    return budgets
+
+
+
+# --- Бэкенды хранения ---
+
+# StorageBackend.refresh(): хранилище загружено заново
+RELOADED = -1
+
+
+
+class LedgerChangedError(RuntimeError):
+    """Журнал переписан другим процессом после загрузки; сохранение отменено."""
+
+
+
+class StorageBackend:
+    """
+    Интерфейс хранилища транзакций.
+
+    Бэкенд отвечает за запись на диск и держит загруженный TransactionStore
+    согласованным с ним: append() дописывает и файл, и уже загруженные данные.
+    Агрегаты по умолчанию считаются по загруженному хранилищу; бэкенды со
+    своим движком запросов (SqliteBackend) переопределяют их.
+
+    Даты start/end в агрегатах — объекты date, границы включаются.
+    """
+
+    def __init__(self):
+        self.transactions = None
+        self._budgets = []
+
+    def load(self) -> TransactionStore:
+        raise NotImplementedError
+
+    def append(self, transactions) -> None:
+        raise NotImplementedError
+
+    def save(self, transactions) -> None:
+        raise NotImplementedError
+
+    def _loaded(self) -> TransactionStore:
+        if self.transactions is None:
+            self.load()
+        return self.transactions
+
+    def close(self) -> None:
+        """Завершает работу с хранилищем (сохраняет служебные индексы, закрывает соединения)."""
+
+    def refresh(self) -> int:
+        """
+        Подхватывает изменения, сделанные другими процессами.
+
+        Returns:
+            Число строк, добавленных в загруженное хранилище, или RELOADED,
+            если хранилище загружено заново (self.transactions — новый объект).
+        """
+        return 0
+
+    def budgets_file(self):
+        """Файл бюджетов журнала; None — бюджеты хранятся только в памяти."""
+        return None
+
+    def load_budgets(self) -> list:
+        """Бюджеты (budgets.Budget) этого журнала."""
+        path = self.budgets_file()
+        return list(self._budgets) if path is None else load_budgets(path)
+
+    def save_budgets(self, budgets) -> None:
+        path = self.budgets_file()
+        if path is None:
+            self._budgets = list(budgets)
+        else:
+            save_budgets(budgets, path)
+
+    # --- Агрегаты по индексу сводок (RollupIndex хранилища) ---
+
+    def totals(self, start=None, end=None) -> tuple:
+        """(доходы, расходы по модулю) — по знаку суммы."""
+        if start is None and end is None:
+            totals = self._loaded().totals
+            return float(totals.income), float(totals.expense)
+        income, expense = self._loaded().rollup.totals(start, end)
+        return income / 100, expense / 100
+
+    def category_totals(self, start=None, end=None) -> list:
+        """[(категория, сумма)] в порядке первого появления категории."""
+        return self._category_totals(start, end, lambda income, expense: income - expense)
+
+    def expense_totals_by_category(self, start=None, end=None) -> list:
+        """[(категория, сумма расходов по модулю)] в порядке первого появления."""
+        return self._category_totals(
+            start, end, lambda income, expense: expense if expense else None)
+
+    def _category_totals(self, start, end, pick) -> list:
+        """
+        Итоги по именам категорий: без периода — из RunningTotals, с периодом —
+        из RollupIndex; строки журнала не перебираются.
+        """
+        store = self._loaded()
+        if start is None and end is None:
+            entries = {category_id: (to_kopecks(income), to_kopecks(expense))
+                       for category_id, (income, expense) in store.totals.categories().items()}
+        else:
+            entries = {category_id: (income, expense) for category_id, (income, expense, _)
+                       in sorted(store.rollup.category_totals(start, end).items())}
+        result = {}
+        for category_id, (income, expense) in entries.items():
+            value = pick(income, expense)
+            if value is None:
+                continue
+            name = store.categories[category_id].name
+            result[name] = result.get(name, 0) + value
+        return [(name, total / 100) for name, total in result.items()]
+
+    def daily_totals(self, start=None, end=None) -> list:
+        """[(дата, доходы, расходы по модулю)] по возрастанию даты."""
+        return [(date.fromordinal(ordinal), income / 100, expense / 100)
+                for ordinal, income, expense in self._loaded().rollup.series("day", start, end)]
+
+    # --- Повторы (DuplicateIndex хранилища) ---
+
+    def duplicate_index(self):
+        """DuplicateIndex загруженного хранилища (загружает его при необходимости)."""
+        return self._loaded().duplicates
+
+    def is_duplicate(self, transaction) -> bool:
+        """Есть ли уже операция с теми же датой, суммой, категорией и комментарием."""
+        return self.duplicate_index().is_duplicate(
+            transaction.amount, transaction.category.name, transaction.date, transaction.comment or "")
+
+    def near_duplicates(self, transaction, window: int = NEAR_WINDOW_DAYS) -> list:
+        """Даты операций с той же суммой и категорией в окне ±window дней."""
+        return self.duplicate_index().near_duplicates(
+            transaction.amount, transaction.category.name, transaction.date, window)
+
+
+
+class MemoryBackend(StorageBackend):
+    """Бэкенд без записи на диск — обёртка над готовым набором транзакций."""
+
+    def __init__(self, transactions=None):
+        super().__init__()
+        self.transactions = TransactionStore.from_transactions(transactions or [])
+
+    def load(self) -> TransactionStore:
+        return self.transactions
+
+    def append(self, transactions) -> None:
+        self.transactions.extend(transactions)
+
+    def save(self, transactions) -> None:
+        self.transactions = TransactionStore.from_transactions(transactions)
+
+
+
+class CsvBackend(StorageBackend):
+    """
+    CSV-файл в журнальном режиме + бинарный снимок для быстрого запуска.
+
+    Файл может одновременно использоваться другими процессами: запись идёт
+    под file_lock(), а строки, дописанные другими, дочитываются в хранилище
+    перед каждой записью и при вызове refresh().
+    """
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or DATA_FILE
+        self._saved_generation = None   # поколение данных, отражённое в снимке
+        self._rollup_saved = False
+        self._file_state = None         # FileState прочитанной части CSV
+
+    def budgets_file(self):
+        return self.path
+
+    def load(self) -> TransactionStore:
+        with file_lock(self.path, shared=True):
+            return self._load()
+
+    def _load(self) -> TransactionStore:
+        self.transactions = load_transactions_cached(self.path)
+        rollup = load_rollup(self.transactions, self.path)
+        if rollup is not None:
+            self.transactions.set_rollup(rollup)
+        self._saved_generation = self.transactions.generation
+        self._rollup_saved = rollup is not None
+        self._file_state = FileState.capture(self.path)
+        return self.transactions
+
+    def _sync(self) -> int:
+        """Под блокировкой: дочитывает чужие строки или перезагружает переписанный файл."""
+        change = self._file_state.change(self.path) if self._file_state is not None else "none"
+        if change == "none":
+            return 0
+        if change == "appended":
+            before = len(self.transactions)
+            offset = read_appended(self.transactions, self.path, self._file_state.offset)
+            self._file_state = FileState.capture(self.path, offset)
+            return len(self.transactions) - before
+        print(f"[INFO] Файл {self.path} переписан другим процессом, данные загружены заново.")
+        self._load()
+        return RELOADED
+
+    def changed(self) -> bool:
+        """Изменён ли файл после последнего чтения (без изменений — один os.stat())."""
+        return self._file_state is not None and self._file_state.change(self.path) != "none"
+
+    def refresh(self) -> int:
+        """
+        Дочитывает строки, дописанные другими процессами; без изменений
+        стоит одного os.stat(). Если файл сейчас занят записью, ничего
+        не делает (изменения подхватит следующий вызов).
+        """
+        if not self.changed():
+            return 0
+        try:
+            with file_lock(self.path, shared=True, blocking=False):
+                return self._sync()
+        except BlockingIOError:
+            return 0
+
+    def close(self) -> None:
+        """
+        Обновляет снимок (если данные менялись) и индекс сводок (если он
+        устарел или его не было) — следующий запуск не будет перечитывать
+        CSV и пересчитывать сводки.
+        """
+        if self.transactions is None or not os.path.exists(self.path):
+            return
+        with file_lock(self.path, shared=True):
+            # Снимок должен соответствовать файлу, в том числе чужим строкам
+            self._sync()
+            changed = self.transactions.generation != self._saved_generation
+            if changed:
+                save_snapshot(self.transactions, self.path)
+            if changed or not self._rollup_saved:
+                save_rollup(self.transactions, self.path)
+        self._saved_generation = self.transactions.generation
+        self._rollup_saved = True
+
+    def append(self, transactions) -> None:
+        """
+        Дописывает операции. Строки, дописанные другими процессами с
+        прошлого чтения, сначала дочитываются — порядок строк в хранилище
+        совпадает с файлом.
+        """
+        transactions = list(transactions)
+        with file_lock(self.path):
+            if self.transactions is not None:
+                self._sync()
+            append_transactions(transactions, self.path, lock=False)
+            if self.transactions is not None:
+                self.transactions.extend(transactions)
+                self._file_state = FileState.capture(self.path)
+
+    def save(self, transactions) -> None:
+        """
+        Переписывает файл целиком. Строки, которые другие процессы дописали
+        после загрузки, сохраняются (добавляются в конец); если файл был
+        переписан целиком, сохранение отменяется с LedgerChangedError.
+        """
+        transactions = list(transactions)
+        with file_lock(self.path):
+            if self._file_state is not None:
+                change = self._file_state.change(self.path)
+                if change == "rewritten":
+                    raise LedgerChangedError(
+                        f"Файл {self.path} изменён другим процессом; загрузите данные заново")
+                if change == "appended":
+                    appended = TransactionStore()
+                    read_appended(appended, self.path, self._file_state.offset)
+                    if len(appended):
+                        print(f"[WARNING] Сохранены также {len(appended)} операций, "
+                              f"дописанных в {self.path} другим процессом.")
+                        transactions.extend(appended)
+            save_transactions(transactions, self.path, lock=False)
+            self._file_state = FileState.capture(self.path)
+        self.transactions = TransactionStore.from_transactions(transactions)
+        self._saved_generation = None
@@ -0,0 +1,404 @@
+"""
+Колоночное хранилище транзакций.
+
+Вместо списка объектов Transaction данные лежат в компактных массивах:
+суммы, даты (порядковые номера дней), идентификаторы категорий в общей
+таблице категорий и идентификаторы комментариев в пуле строк.
+"""
+from array import array
+from collections.abc import Sequence
+from datetime import date
+from aggregates import RunningTotals
+from duplicates import DuplicateIndex
+from models import CATEGORIES, Category, CategoryRegistry, validate_amount
+from rollup import RollupIndex
+
+
+class TransactionView:
+    """
+    Лёгкое представление одной строки хранилища.
+
+    Ведёт себя как Transaction (amount, category, date, comment, to_dict),
+    но не хранит данных — читает их из колонок TransactionStore.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def amount(self) -> float:
+        return self._store._amounts[self._index]
+
+    @property
+    def category(self) -> Category:
+        return self._store._categories[self._store._category_ids[self._index]]
+
+    @property
+    def date(self) -> date:
+        return date.fromordinal(self._store._dates[self._index])
+
+    @property
+    def comment(self) -> str:
+        return self._store._comments[self._store._comment_ids[self._index]]
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для сохранения."""
+        category = self.category
+        return {
+            "amount": self.amount,
+            "category": category.name,
+            "category_type": category.category_type,
+            "date": self.date.isoformat(),
+            "comment": self.comment
+        }
+
+    def __repr__(self):
+        return f"TransactionView({self.amount!r}, {self.category.name!r}, {self.date.isoformat()})"
+
+
+
+class TransactionStore(Sequence):
+    """
+    Контейнер транзакций с колоночным хранением.
+
+    Поддерживает протокол последовательности: len(), индексацию и итерацию,
+    возвращая TransactionView. Добавление — через append()/add().
+    """
+
+    def __init__(self):
+        self._amounts = array("d")
+        self._dates = array("i")
+        self._category_ids = array("i")
+        self._comment_ids = array("i")
+
+        self._registry = CategoryRegistry(CATEGORIES)
+        self._categories = self._registry.categories   # id -> Category
+        self._comments = [""]         # id -> строка комментария
+        self._comment_index = {"": 0}
+        self._buffer = None           # источник колонок (например, mmap снимка)
+        self._totals = None           # RunningTotals, строится при первом обращении
+        self._rollup = None           # RollupIndex, строится при первом обращении
+        self._duplicates = None       # DuplicateIndex, строится при первом обращении
+        self._search = None           # search.SearchIndex, строится при первом обращении
+        self._generation = 0          # растёт при каждом изменении (для кэшей)
+
+    @classmethod
+    def from_transactions(cls, transactions) -> "TransactionStore":
+        """Создаёт хранилище из любой последовательности транзакций."""
+        if isinstance(transactions, cls):
+            return transactions
+        store = cls()
+        store.extend(transactions)
+        return store
+
+    @classmethod
+    def from_columns(cls, amounts, date_ordinals, category_ids, comment_ids,
+                     categories, comments, buffer=None) -> "TransactionStore":
+        """
+        Создаёт хранилище поверх готовых колонок без копирования.
+
+        Колонки могут быть memoryview (например, над mmap снимка) — они
+        используются только для чтения и копируются в array при первом
+        изменении хранилища.
+
+        Параметры:
+            categories: пары (имя, тип) в порядке id
+            comments: последовательность строк пула комментариев
+            buffer: объект, владеющий памятью колонок (держится до конца жизни хранилища)
+        """
+        store = cls()
+        for name, category_type in categories:
+            store.intern_category(name, category_type)
+        store._amounts = amounts
+        store._dates = date_ordinals
+        store._category_ids = category_ids
+        store._comment_ids = comment_ids
+        store._comments = comments
+        store._comment_index = None
+        store._buffer = buffer
+        return store
+
+    def _make_writable(self):
+        """Переносит колонки из внешнего буфера в собственные массивы."""
+        if isinstance(self._amounts, array):
+            return
+        for name in ("_amounts", "_dates", "_category_ids", "_comment_ids"):
+            column = getattr(self, name)
+            owned = array(column.format)
+            owned.frombytes(column.tobytes())
+            setattr(self, name, owned)
+        self._comments = list(self._comments)
+        self._buffer = None
+
+    # --- Таблицы категорий и комментариев ---
+
+    def intern_category(self, name: str, category_type: str) -> int:
+        """Возвращает id категории, создавая её при первом обращении."""
+        return self._registry.intern(name, category_type)
+
+    def intern_comment(self, comment: str) -> int:
+        """Возвращает id комментария в пуле строк."""
+        return self._intern_comment(comment)
+
+    def _intern_comment(self, comment: str) -> int:
+        if self._comment_index is None:
+            self._make_writable()
+            self._comment_index = {c: i for i, c in enumerate(self._comments)}
+        comment_id = self._comment_index.get(comment)
+        if comment_id is None:
+            comment_id = len(self._comments)
+            self._comments.append(comment)
+            self._comment_index[comment] = comment_id
+        return comment_id
+
+    @property
+    def categories(self) -> list:
+        """Таблица категорий (индекс списка — id категории)."""
+        return self._categories
+
+    @property
+    def category_registry(self) -> CategoryRegistry:
+        return self._registry
+
+    # --- Колонки (только для чтения) ---
+
+    @property
+    def amounts(self):
+        return self._amounts
+
+    @property
+    def date_ordinals(self):
+        return self._dates
+
+    @property
+    def category_ids(self):
+        return self._category_ids
+
+    @property
+    def comment_ids(self):
+        return self._comment_ids
+
+    @property
+    def comments(self):
+        """Пул комментариев (индекс — id комментария)."""
+        return self._comments
+
+    @property
+    def generation(self) -> int:
+        """Номер поколения данных: меняется при каждом добавлении или удалении."""
+        return self._generation
+
+    @property
+    def totals(self) -> RunningTotals:
+        """
+        Итоги (баланс, по категориям, по месяцам) в копейках.
+
+        Строятся одним векторным проходом при первом обращении, дальше
+        обновляются при каждом add()/remove() за O(1).
+        """
+        if self._totals is None:
+            self._totals = RunningTotals.from_columns(self._amounts, self._dates, self._category_ids)
+        return self._totals
+
+    @property
+    def rollup(self) -> RollupIndex:
+        """
+        Сводки по дням, месяцам и годам для каждой категории (копейки).
+
+        Строятся при первом обращении (или берутся из сохранённого индекса,
+        см. set_rollup()), дальше обновляются при каждом add()/remove().
+        """
+        if self._rollup is None:
+            self._rollup = RollupIndex.from_columns(self._amounts, self._dates, self._category_ids)
+        return self._rollup
+
+    def set_rollup(self, rollup: RollupIndex):
+        """Подключает готовый индекс сводок, построенный по этим же данным."""
+        self._rollup = rollup
+
+    @property
+    def duplicates(self) -> DuplicateIndex:
+        """
+        Индекс повторов (дата, сумма, категория, комментарий).
+
+        Строится одним векторным проходом при первом обращении, дальше
+        обновляется при каждом add()/remove().
+        """
+        if self._duplicates is None:
+            self._duplicates = DuplicateIndex.from_columns(
+                self._amounts, self._dates, self._category_ids, self._comment_ids,
+                self._categories, self._comments)
+        return self._duplicates
+
+    @property
+    def search_index(self):
+        """
+        Инвертированный индекс комментариев и категорий (search.SearchIndex).
+
+        Новые комментарии и категории индексируются при следующем поиске.
+        """
+        if self._search is None:
+            from search import SearchIndex
+            self._search = SearchIndex(self)
+        return self._search
+
+    # --- Добавление ---
+
+    def add(self, amount: float, category_name: str, category_type: str,
+            transaction_date: date, comment: str = "") -> int:
+        """
+        Добавляет операцию по значениям полей, без создания Transaction.
+
+        Валидация совпадает с конструкторами Category и Transaction.
+
+        Returns:
+            Индекс добавленной строки.
+        """
+        validate_amount(amount)
+        self._make_writable()
+        category_id = self.intern_category(category_name, category_type)
+        comment_id = self._intern_comment(comment.strip())
+
+        self._amounts.append(float(amount))
+        self._dates.append(transaction_date.toordinal())
+        self._category_ids.append(category_id)
+        self._comment_ids.append(comment_id)
+        if self._totals is not None:
+            self._totals.add(float(amount), category_id, self._dates[-1])
+        if self._rollup is not None:
+            self._rollup.add(float(amount), category_id, self._dates[-1])
+        if self._duplicates is not None:
+            self._duplicates.add(float(amount), self._categories[category_id].name,
+                                 self._dates[-1], self._comments[comment_id])
+        self._generation += 1
+        return len(self._amounts) - 1
+
+    def append(self, transaction) -> int:
+        """Добавляет объект Transaction (или TransactionView)."""
+        category = transaction.category
+        return self.add(
+            transaction.amount,
+            category.name,
+            category.category_type,
+            transaction.date,
+            transaction.comment or ""
+        )
+
+    def extend(self, transactions):
+        for t in transactions:
+            self.append(t)
+
+    def extend_columns(self, amounts, date_ordinals, category_ids, comment_ids):
+        """
+        Пакетное добавление уже проверенных колонок.
+
+        Идентификаторы категорий и комментариев должны быть получены через
+        intern_category() / intern_comment() этого же хранилища.
+        Принимает numpy-массивы или любые итерируемые последовательности.
+        """
+        self._make_writable()
+        start = len(self._amounts)
+        for column, values in (
+            (self._amounts, amounts),
+            (self._dates, date_ordinals),
+            (self._category_ids, category_ids),
+            (self._comment_ids, comment_ids),
+        ):
+            if hasattr(values, "astype"):
+                column.frombytes(values.astype(column.typecode, copy=False).tobytes())
+            else:
+                column.extend(values)
+        if self._totals is not None:
+            self._totals.merge(RunningTotals.from_columns(
+                self._amounts[start:], self._dates[start:], self._category_ids[start:]))
+        if self._rollup is not None:
+            self._rollup.merge(RollupIndex.from_columns(
+                self._amounts[start:], self._dates[start:], self._category_ids[start:]))
+        if self._duplicates is not None:
+            self._duplicates.merge(DuplicateIndex.from_columns(
+                self._amounts[start:], self._dates[start:], self._category_ids[start:],
+                self._comment_ids[start:], self._categories, self._comments))
+        self._generation += 1
+
+    def remove(self, index: int):
+        """Удаляет операцию по индексу (сдвигает последующие строки)."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Индекс транзакции вне диапазона")
+        self._make_writable()
+        if self._totals is not None:
+            self._totals.remove(self._amounts[index], self._category_ids[index], self._dates[index])
+        if self._rollup is not None:
+            self._rollup.remove(self._amounts[index], self._category_ids[index], self._dates[index])
+        if self._duplicates is not None:
+            self._duplicates.remove(self._amounts[index],
+                                    self._categories[self._category_ids[index]].name,
+                                    self._dates[index], self._comments[self._comment_ids[index]])
+        for column in (self._amounts, self._dates, self._category_ids, self._comment_ids):
+            del column[index]
+        self._generation += 1
+
+    # --- Протокол последовательности ---
+
+    def __len__(self):
+        return len(self._amounts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TransactionView(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Индекс транзакции вне диапазона")
+        return TransactionView(self, index)
+
+    def __iter__(self):
+        for i in range(len(self._amounts)):
+            yield TransactionView(self, i)
+
+    # --- Экспорт ---
+
+    def to_dataframe(self):
+        """
+        Строит pandas.DataFrame прямо из колонок (без промежуточных словарей).
+
+        Колонки совпадают с Transaction.to_dict() плюс category_id (id в
+        таблице категорий — для группировки без сравнения строк); date имеет
+        тип datetime64.
+        """
+        import numpy as np
+        import pandas as pd
+
+        ids = _as_numpy(self._category_ids)
+        names = np.array([c.name for c in self._categories] or [""], dtype=object)
+        types = np.array([c.category_type for c in self._categories] or [""], dtype=object)
+        comments = np.array(self._comments, dtype=object)
+        epoch = date(1970, 1, 1).toordinal()
+
+        return pd.DataFrame({
+            "amount": _as_numpy(self._amounts),
+            "category": names[ids],
+            "category_type": types[ids],
+            "date": (_as_numpy(self._dates) - epoch).astype("datetime64[D]").astype("datetime64[ns]"),
+            "comment": comments[_as_numpy(self._comment_ids)],
+            "category_id": ids,
+        })
+
+
+
+def _as_numpy(column):
+    """
+    Копия колонки (array или memoryview) в виде numpy-массива.
+
+    Копия нужна, чтобы не удерживать буфер array: пока на него есть
+    ссылка из numpy, array.append() завершается ошибкой BufferError.
+    """
+    import numpy as np
+    dtype = np.dtype(column.typecode if isinstance(column, array) else column.format)
+    if not len(column):
+        return np.empty(0, dtype=dtype)
+    return np.frombuffer(column, dtype=dtype).copy()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+import bench
+import storage
+
+
+
+class TestBench(unittest.TestCase):
+
+    def test_generated_ledger_is_reproducible_and_valid(self):
+        """Журнал с тем же зерном совпадает побайтно и загружается без ошибок."""
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = os.path.join(tmp, "a.csv"), os.path.join(tmp, "b.csv")
+            bench.generate_ledger(first, 1000, seed=7, chunksize=300)
+            bench.generate_ledger(second, 1000, seed=7, chunksize=300)
+            with open(first, "rb") as a, open(second, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+            report = storage.LoadReport()
+            transactions = storage.load_transactions_bulk(first, report=report)
+            self.assertEqual(len(transactions), 1000)
+            self.assertFalse(report.errors)
+            self.assertEqual(len(storage.load_transactions(first)), 1000)
+
+    def test_compare_flags_slowdowns(self):
+        """Сравнение отмечает только операции, замедлившиеся сверх порога."""
+        baseline = [{"rows": 10, "operation": "load", "seconds": 1.0},
+                    {"rows": 10, "operation": "save", "seconds": 1.0}]
+        current = [{"rows": 10, "operation": "load", "seconds": 1.1},
+                   {"rows": 10, "operation": "save", "seconds": 2.0},
+                   {"rows": 10, "operation": "refresh", "skipped": "нет Tk"}]
+        self.assertEqual([r[1] for r in bench.compare(current, baseline, 1.2)], ["save"])
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
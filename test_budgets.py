@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from budgets import Budget, BudgetMonitor, period_bounds, periods_between
+from models import Transaction, intern_category
+from storage import CsvBackend, MemoryBackend
+from store import TransactionStore
+
+
+def expense(amount, category, day):
+    return Transaction(-amount, intern_category(category, "expense"), day)
+
+
+
+class TestBudgets(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TransactionStore.from_transactions([
+            expense(3000, "Продукты", date(2025, 3, 3)),
+            expense(500, "Кафе", date(2025, 3, 4)),
+            Transaction(90000, intern_category("Зарплата", "income"), date(2025, 3, 5)),
+        ])
+        self.food = Budget(intern_category("Продукты", "expense"), 5000)
+        self.cafe = Budget(intern_category("Кафе", "expense"), 1000, "weekly")
+        self.monitor = BudgetMonitor([self.food, self.cafe])
+
+    def add(self, *transactions):
+        first = len(self.store)
+        self.store.extend(transactions)
+        return self.monitor.check_rows(self.store, first)
+
+    def test_period_bounds(self):
+        """Неделя — с понедельника по воскресенье, месяц — с первого по последнее число."""
+        self.assertEqual(period_bounds("weekly", date(2025, 3, 6)), (date(2025, 3, 3), date(2025, 3, 9)))
+        self.assertEqual(period_bounds("monthly", date(2024, 2, 10)), (date(2024, 2, 1), date(2024, 2, 29)))
+        self.assertEqual(period_bounds("monthly", date(2024, 12, 31)), (date(2024, 12, 1), date(2024, 12, 31)))
+        self.assertEqual(len(periods_between("weekly", date(2025, 3, 1), date(2025, 3, 31))), 6)
+        with self.assertRaises(ValueError):
+            Budget(intern_category("Зарплата", "income"), 100)
+
+    def test_limit_must_be_finite_and_at_least_a_kopeck(self):
+        """inf, nan, слишком большой и меньше копейки лимит отклоняются: иначе доля лимита делится на ноль."""
+        category = intern_category("Продукты", "expense")
+        for limit in (float("inf"), float("nan"), 1e308, 0.001, 0.004):
+            with self.assertRaises(ValueError, msg=limit):
+                Budget(category, limit)
+        self.assertEqual(Budget(category, 0.01).kopecks, 1)
+
+    def test_alert_when_threshold_crossed(self):
+        """Предупреждение — один раз, при пересечении порога, а не на каждой следующей операции."""
+        self.assertEqual(self.add(expense(500, "Продукты", date(2025, 3, 10))), [])
+        alerts = self.add(expense(600, "Продукты", date(2025, 3, 12)))
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual((alerts[0].threshold, alerts[0].spent), (0.8, 410000))
+        self.assertEqual(self.add(expense(100, "Продукты", date(2025, 3, 13))), [])
+        self.assertEqual(self.add(expense(50, "Продукты", date(2025, 4, 1))), [])
+
+        alerts = self.add(expense(900, "Продукты", date(2025, 3, 14)))
+        self.assertEqual(alerts[0].threshold, 1.0)
+        self.assertIn("Превышен бюджет", alerts[0].message())
+
+    def test_batch_groups_rows_by_period(self):
+        """Пакет импорта: по предупреждению на каждый пересёкший порог период."""
+        alerts = self.add(
+            expense(400, "Кафе", date(2025, 3, 5)),     # неделя 03.03: 900 из 1000
+            expense(300, "Кафе", date(2025, 3, 11)),    # неделя 10.03: 300
+            expense(800, "Кафе", date(2025, 3, 12)),    # неделя 10.03: 1100
+            expense(2000, "Продукты", date(2025, 3, 20)),
+        )
+        found = sorted((a.budget.category.name, a.start, a.threshold) for a in alerts)
+        self.assertEqual(found, [
+            ("Кафе", date(2025, 3, 3), 0.8),
+            ("Кафе", date(2025, 3, 10), 1.0),
+            ("Продукты", date(2025, 3, 1), 1.0),
+        ])
+
+    def test_report_uses_period_totals(self):
+        """Отчёт «бюджет против факта» за произвольный период."""
+        self.store.extend([expense(250, "Кафе", date(2025, 3, 16)), expense(1200, "Продукты", date(2025, 4, 2))])
+        report = self.monitor.report(self.store, date(2025, 3, 1), date(2025, 4, 30))
+        food = [(s.start, s.spent, s.remaining) for s in report if s.budget is self.food]
+        self.assertEqual(food, [(date(2025, 3, 1), 300000, 2000.0), (date(2025, 4, 1), 120000, 3800.0)])
+        cafe = {s.start: s.spent for s in report if s.budget is self.cafe}
+        self.assertEqual((cafe[date(2025, 3, 3)], cafe[date(2025, 3, 10)]), (50000, 25000))
+        self.assertEqual(sum(cafe.values()), 75000)
+
+    def test_backends_keep_budgets(self):
+        """Бюджеты сохраняются рядом с журналом; без файла — в памяти бэкенда."""
+        memory = MemoryBackend()
+        memory.save_budgets([self.food])
+        self.assertEqual(memory.load_budgets(), [self.food])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "finances.csv")
+            CsvBackend(path).save_budgets([self.food, self.cafe])
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "finances.budgets")))
+            loaded = CsvBackend(path).load_budgets()
+            self.assertEqual([(b.category, b.limit, b.period) for b in loaded],
+                             [(self.food.category, 5000.0, "monthly"), (self.cafe.category, 1000.0, "weekly")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+
+from downsample import downsample_daily, lttb, resample
+
+
+
+class TestDownsample(unittest.TestCase):
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        """LTTB оставляет заданное число точек, края ряда и одиночные пики."""
+        x = np.arange(10_000)
+        y = np.sin(x / 500.0)
+        y[[1234, 7777]] = [40.0, -40.0]
+        kept = lttb(x, y, 200)
+        self.assertEqual(len(kept), 200)
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertEqual((kept[0], kept[-1]), (0, 9999))
+        self.assertIn(1234, kept)
+        self.assertIn(7777, kept)
+
+    def test_resample_by_week_and_month_keeps_totals(self):
+        """Суммы по неделям (с понедельника) и месяцам совпадают с дневными."""
+        days = np.array([date(2025, 1, d).toordinal() for d in (5, 6, 12, 31)] + [date(2025, 2, 1).toordinal()])
+        values = np.array([[1.0, 0.5], [2.0, 0.0], [4.0, 0.25], [8.0, 1.0], [16.0, 2.0]])
+        weeks, weekly = resample(days, values, "week")
+        self.assertEqual([date.fromordinal(int(d)) for d in weeks],
+                         [date(2024, 12, 30), date(2025, 1, 6), date(2025, 1, 27)])
+        self.assertEqual(weekly[:, 0].tolist(), [1.0, 6.0, 24.0])
+        months, monthly = resample(days, values, "month")
+        self.assertEqual([date.fromordinal(int(d)) for d in months], [date(2025, 1, 1), date(2025, 2, 1)])
+        self.assertEqual(monthly.tolist(), [[15.0, 1.75], [16.0, 2.0]])
+
+    def test_auto_resolution_limits_points(self):
+        """Короткий ряд рисуется по дням как есть, многолетний — по неделям и не длиннее предела."""
+        start = date(2005, 1, 1)
+        short = [(start + timedelta(days=i), 100.0, 10.0) for i in range(30)]
+        self.assertEqual(downsample_daily(short), ("day", short))
+
+        long = [(start + timedelta(days=i), 100.0 + (i % 365 == 0) * 1e6, float(i % 7)) for i in range(365 * 20)]
+        resolution, rows = downsample_daily(long, max_points=300)
+        self.assertEqual(resolution, "week")
+        self.assertLessEqual(len(rows), 600)
+        self.assertAlmostEqual(max(income for _, income, _ in rows), 1e6 + 700.0)
+
+        resolution, rows = downsample_daily(long, "day", max_points=300)
+        self.assertEqual(resolution, "day")
+        self.assertEqual(sum(1 for _, income, _ in rows if income > 1e6), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import importer
+from duplicates import DuplicateIndex
+from importer import ImportMapping
+from storage import MemoryBackend
+from store import TransactionStore
+
+
+
+class TestDuplicateIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TransactionStore()
+        self.store.add(1500.0, "Зарплата", "income", date(2025, 1, 10), "Аванс")
+        self.store.add(-850.0, "Продукты", "expense", date(2025, 1, 11), "Магазин у дома")
+        self.store.add(-120.0, "Продукты", "expense", date(2025, 1, 12))
+
+    def test_exact_duplicates_are_normalized(self):
+        """Категория и комментарий сравниваются без учёта регистра, пробелов и «ё»."""
+        index = self.store.duplicates
+        self.assertTrue(index.is_duplicate(-850.0, " продукты", date(2025, 1, 11), "МАГАЗИН  у   дома"))
+        self.assertFalse(index.is_duplicate(-850.0, "Продукты", date(2025, 1, 11), "Рынок"))
+        self.assertFalse(index.is_duplicate(-850.01, "Продукты", date(2025, 1, 11), "Магазин у дома"))
+        self.store.add(-50.0, "Всё для дома", "expense", date(2025, 1, 13))
+        self.assertTrue(index.is_duplicate(-50.0, "все для дома", date(2025, 1, 13)))
+
+    def test_index_follows_store_changes(self):
+        """Векторное построение совпадает с поштучным, удаление снимает ключ."""
+        self.store.duplicates
+        self.store.add(-120.0, "Продукты", "expense", date(2025, 1, 12))
+        rebuilt = DuplicateIndex.from_columns(
+            self.store.amounts, self.store.date_ordinals, self.store.category_ids,
+            self.store.comment_ids, self.store.categories, self.store.comments)
+        self.assertEqual(rebuilt._exact, self.store.duplicates._exact)
+        self.assertEqual(rebuilt._near, self.store.duplicates._near)
+
+        key = DuplicateIndex.key(-120.0, "Продукты", date(2025, 1, 12).toordinal())
+        self.assertEqual(self.store.duplicates.count(key), 2)
+        self.store.remove(3)
+        self.store.remove(2)
+        self.assertEqual(self.store.duplicates.count(key), 0)
+
+    def test_near_duplicates_within_window(self):
+        """Похожие операции ищутся по дням окна, комментарий не учитывается."""
+        index = self.store.duplicates
+        self.assertEqual(index.near_duplicates(-850.0, "Продукты", date(2025, 1, 13), window=3),
+                         [date(2025, 1, 11)])
+        self.assertEqual(index.near_duplicates(-850.0, "Продукты", date(2025, 1, 15), window=3), [])
+        self.assertEqual(index.near_duplicates(-850.0, "Кафе", date(2025, 1, 11)), [])
+
+    def test_import_skips_rows_already_in_ledger(self):
+        """Повторный импорт выписки не дублирует операции; одинаковые строки выписки сохраняются."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bank.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("date,amount,category\n"
+                        "2025-02-01,-300,Кафе\n"
+                        "2025-02-01,-300,Кафе\n"
+                        "2025-02-02,-90,Транспорт\n")
+            backend = MemoryBackend()
+            first = importer.import_statement(path, ImportMapping(), backend, batch_size=1,
+                                              duplicates="skip")
+            self.assertEqual((first.rows_imported, first.rows_duplicate), (3, 0))
+
+            backend.transactions.remove(1)
+            again = importer.import_statement(path, ImportMapping(), backend, batch_size=1,
+                                              duplicates="skip")
+            self.assertEqual((again.rows_imported, again.rows_duplicate), (1, 2))
+            self.assertEqual(len(backend.transactions), 3)
+
+            flagged = importer.import_statement(path, ImportMapping(), backend, duplicates="flag")
+            self.assertEqual((flagged.rows_imported, flagged.rows_duplicate), (3, 3))
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+
+import matplotlib
+matplotlib.use("Agg")
+
+import visualization
+from forecast import Scenario, occurrence_days, project, project_ledger
+from models import RecurringTransaction, intern_category
+from store import TransactionStore
+
+
+def _dates(ordinals):
+    return [date.fromordinal(int(d)) for d in ordinals]
+
+
+
+class TestForecast(unittest.TestCase):
+
+    def setUp(self):
+        self.salary = RecurringTransaction(100_000, intern_category("Зарплата", "income"),
+                                           date(2025, 1, 5), "monthly")
+        self.rent = RecurringTransaction(-40_000, intern_category("Аренда"), date(2025, 1, 31), "monthly")
+        self.coffee = RecurringTransaction(-150.5, intern_category("Кафе"), date(2025, 1, 1), "daily")
+
+    def test_occurrences_follow_calendar(self):
+        """Конец месяца и 29 февраля сдвигаются на последний день короткого месяца."""
+        self.assertEqual(_dates(occurrence_days(self.rent, date(2025, 1, 1), date(2025, 4, 30))),
+                         [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)])
+        leap = RecurringTransaction(-1, intern_category("Подарки"), date(2024, 2, 29), "yearly",
+                                    end=date(2028, 12, 31))
+        self.assertEqual(_dates(occurrence_days(leap, date(2020, 1, 1), date(2030, 1, 1))),
+                         [date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28),
+                          date(2027, 2, 28), date(2028, 2, 29)])
+        biweekly = RecurringTransaction(-1, intern_category("Связь"), date(2025, 1, 3), "weekly", interval=2)
+        self.assertEqual(_dates(occurrence_days(biweekly, date(2025, 1, 10), date(2025, 2, 20))),
+                         [date(2025, 1, 17), date(2025, 1, 31), date(2025, 2, 14)])
+        with self.assertRaises(ValueError):
+            RecurringTransaction(-1, intern_category("Связь"), date(2025, 1, 3), "hourly")
+
+    def test_scenarios_scale_and_extend_rules(self):
+        """Баланс сценариев: множители по категории и типу, собственные правила."""
+        bonus = RecurringTransaction(5_000, intern_category("Премия", "income"), date(2025, 3, 1),
+                                     "monthly", interval=3)
+        forecast = project(
+            [self.salary, self.rent, self.coffee], date(2025, 1, 1), date(2025, 3, 31), 1_000.0,
+            [Scenario("Базовый"),
+             Scenario("Без кафе, аренда +10%", {"Кафе": 0, "expense": 1.1}),
+             Scenario("С премией", extra_rules=[bonus])])
+        base = 1_000 + 3 * 100_000 - 3 * 40_000 - 90 * 150.5
+        self.assertEqual(forecast.final(), {
+            "Базовый": base,
+            "Без кафе, аренда +10%": 1_000 + 3 * 100_000 - 3 * 44_000,
+            "С премией": base + 5_000,
+        })
+        self.assertEqual(forecast.lowest()["Базовый"], (1_000 - 4 * 150.5, date(2025, 1, 4)))
+
+    def test_thirty_years_of_daily_rules_is_fast(self):
+        """30 лет ежедневных правил и 50 сценариев — за доли секунды."""
+        rules = [RecurringTransaction(-(i + 1.25), intern_category(f"Правило {i}"), date(2025, 1, 1), "daily")
+                 for i in range(20)] + [self.salary]
+        scenarios = [Scenario(f"Расходы x{1 + i / 100:.2f}", {"expense": 1 + i / 100}) for i in range(50)]
+        project(rules, date(2026, 1, 1), date(2026, 1, 31), 0.0, scenarios)
+        started = time.perf_counter()
+        forecast = project(rules, date(2026, 1, 1), date(2055, 12, 31), 0.0, scenarios)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(forecast.balances.shape, (50, 10957))
+        self.assertLess(elapsed, 0.25)
+
+    def test_ledger_forecast_is_plotted(self):
+        """Прогноз от баланса журнала рисуется в файл."""
+        store = TransactionStore()
+        store.add(2_000.0, "Зарплата", "income", date(2025, 1, 10))
+        forecast = project_ledger(store, [self.rent], days=31, today=date(2025, 1, 1))
+        self.assertEqual(forecast.dates[0], date(2025, 1, 11))
+        self.assertEqual(forecast.final(), {"Базовый": 2_000.0 - 40_000})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "forecast.png")
+            visualization.plot_forecast(store, [self.rent], days=31, save_path=path)
+            self.assertTrue(os.path.exists(path))
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
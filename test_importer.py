@@ -0,0 +1,141 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+from datetime import date
+
+import importer
+from importer import ImportMapping
+from storage import CsvBackend, MemoryBackend
+
+
+
+class TestImporter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_mapping_sign_and_validation(self):
+        """Колонки, формат даты и знак берутся из описания; плохие строки отклоняются."""
+        path = self.write("bank.csv", (
+            "Дата;Списание;Зачисление;Категория\n"
+            "01.03.2025;1 250,50;;Продукты\n"
+            "02.03.2025;;50 000,00;Зарплата\n"
+            "31.02.2025;100,00;;Кафе\n"
+            "03.03.2025;;;Кафе\n"
+        ))
+        mapping = ImportMapping(date="Дата", category="Категория", date_format="%d.%m.%Y",
+                                sign="debit_credit", debit="Списание", credit="Зачисление",
+                                delimiter=";", decimal=",")
+        backend = MemoryBackend()
+        report = importer.import_statement(path, mapping, backend, batch_size=1)
+
+        self.assertEqual((report.rows_read, report.rows_imported, report.rows_rejected), (4, 2, 2))
+        self.assertEqual([(t.amount, t.category.category_type, t.date) for t in backend.transactions],
+                         [(-1250.5, "expense", date(2025, 3, 1)), (50000.0, "income", date(2025, 3, 2))])
+        self.assertEqual([line for line, _ in report.errors], [4, 5])
+
+    def test_missing_columns_are_reported(self):
+        """Отсутствующие колонки останавливают импорт до записи."""
+        path = self.write("bank.csv", "date,sum\n2025-01-01,10\n")
+        with self.assertRaises(ValueError):
+            importer.import_statement(path, ImportMapping(), MemoryBackend())
+
+    def test_non_finite_amounts_are_rejected(self):
+        """inf, nan и суммы вне диапазона отклоняются как строки, импорт продолжается."""
+        path = self.write("bank.csv", (
+            "date,amount,category\n"
+            "2025-01-01,inf,Продукты\n"
+            "2025-01-02,-250.5,Продукты\n"
+            "2025-01-03,nan,Продукты\n"
+            "2025-01-04,1e308,Продукты\n"
+        ))
+        backend = MemoryBackend()
+        report = importer.import_statement(path, ImportMapping(), backend)
+
+        self.assertEqual((report.rows_read, report.rows_imported, report.rows_rejected), (4, 1, 3))
+        self.assertEqual([t.amount for t in backend.transactions], [-250.5])
+        self.assertEqual([line for line, _ in report.errors], [2, 4, 5])
+
+    def test_memory_does_not_grow_with_file_size(self):
+        """Пиковая память импорта в файл не зависит от числа строк."""
+        def peak(rows):
+            lines = "".join(f"2025-01-{1 + i % 28:02d},-{i + 1}.5,Продукты\n" for i in range(rows))
+            path = self.write(f"bank_{rows}.csv", "date,amount,category\n" + lines)
+            backend = CsvBackend(os.path.join(self.tmpdir.name, f"ledger_{rows}.csv"))
+            tracemalloc.start()
+            try:
+                report = importer.import_statement(path, ImportMapping(), backend, batch_size=250)
+                return tracemalloc.get_traced_memory()[1], report
+            finally:
+                tracemalloc.stop()
+
+        small, _ = peak(1_000)
+        large, report = peak(20_000)
+        self.assertEqual(report.rows_imported, 20_000)
+        self.assertLess(large, small * 2)
+
+    def test_skip_duplicates_memory_is_linear_in_file_size(self):
+        """
+        С проверкой повторов журнал в памяти растёт вместе с выпиской. Пик
+        памяти над состоянием до импорта (вместе с тем, что осталось в
+        журнале) в расчёте на строку не растёт с размером файла.
+        """
+        def peak_per_row(rows):
+            lines = "".join(f"2025-01-{1 + i % 28:02d},-{i + 1}.5,Продукты,покупка {i}\n" for i in range(rows))
+            path = self.write(f"bank_{rows}.csv", "date,amount,category,comment\n" + lines)
+            backend = CsvBackend(os.path.join(self.tmpdir.name, f"ledger_{rows}.csv"))
+            backend.load()
+            tracemalloc.start()
+            try:
+                baseline = tracemalloc.get_traced_memory()[0]
+                report = importer.import_statement(path, ImportMapping(comment="comment"), backend,
+                                                   batch_size=250, duplicates="skip")
+                return (tracemalloc.get_traced_memory()[1] - baseline) / rows, report
+            finally:
+                tracemalloc.stop()
+
+        small, _ = peak_per_row(1_000)
+        large, report = peak_per_row(20_000)
+        self.assertEqual((report.rows_imported, report.rows_duplicate), (20_000, 0))
+        self.assertLess(large, small)
+
+    def test_skip_duplicates_memory_does_not_grow_with_ledger_size(self):
+        """Проверка повторов не копирует индекс: пик импорта не зависит от размера журнала."""
+        statement = self.write("bank.csv", "date,amount,category\n" + "".join(
+            f"2025-02-{1 + i % 28:02d},-{i + 1}.5,Кафе\n" for i in range(100)))
+
+        def peak(ledger_rows):
+            path = os.path.join(self.tmpdir.name, f"ledger_{ledger_rows}.csv")
+            importer.import_statement(self.write(f"old_{ledger_rows}.csv", "date,amount,category\n" + "".join(
+                f"2024-01-{1 + i % 28:02d},-{i + 1}.5,Продукты\n" for i in range(ledger_rows))),
+                ImportMapping(), CsvBackend(path))
+            backend = CsvBackend(path)
+            backend.duplicate_index()
+            tracemalloc.start()
+            try:
+                baseline = tracemalloc.get_traced_memory()[0]
+                report = importer.import_statement(statement, ImportMapping(), backend, duplicates="skip")
+                return tracemalloc.get_traced_memory()[1] - baseline, report
+            finally:
+                tracemalloc.stop()
+
+        small, _ = peak(1_000)
+        large, report = peak(20_000)
+        self.assertEqual((report.rows_imported, report.rows_duplicate), (100, 0))
+        self.assertLess(large, small * 2)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
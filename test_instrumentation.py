@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import instrumentation
+from instrumentation import count, span, timed
+
+
+@timed("test.outer")
+def outer():
+    with span("test.inner"):
+        count("test.items", 3)
+    return 42
+
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.was_enabled = instrumentation.is_enabled()
+        instrumentation.reset()
+
+    def tearDown(self):
+        if not self.was_enabled:
+            instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled_records_nothing(self):
+        """В выключенном состоянии замеры не копятся, результат функции не меняется."""
+        instrumentation.disable()
+        self.assertEqual(outer(), 42)
+        self.assertEqual(instrumentation.stats(), {})
+        self.assertEqual(instrumentation.counters(), {})
+
+    def test_nested_spans_and_session_files(self):
+        """Вложенные участки дают пути flame graph, сводка пишется в каталог."""
+        instrumentation.enable()
+        for _ in range(2):
+            self.assertEqual(outer(), 42)
+
+        stats = instrumentation.stats()
+        self.assertEqual(stats["test.outer"][0], 2)
+        self.assertEqual(stats["test.inner"][0], 2)
+        self.assertEqual(instrumentation.counters(), {"test.items": 6})
+        self.assertEqual(set(instrumentation.folded()), {"test.outer", "test.outer;test.inner"})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            instrumentation.write_session(tmp)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "summary.json")))
+            with open(os.path.join(tmp, "spans.folded"), encoding="utf-8") as f:
+                self.assertEqual(len(f.read().splitlines()), 2)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
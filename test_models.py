@@ -0,0 +1,61 @@
+import tracemalloc
+import unittest
+from datetime import date
+
+from models import Category, Transaction
+
+
+
+class _DictTransaction:
+    """Прежняя раскладка Transaction: __dict__ на экземпляр, сумма во float."""
+
+    def __init__(self, amount, category, date, comment=""):
+        self.amount = float(amount)
+        self.category = category
+        self.date = date
+        self.comment = comment.strip()
+
+
+
+def _bytes_per_instance(factory, count=20_000) -> float:
+    category = Category("Продукты")
+    day = date(2025, 1, 1)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        items = [factory(-(i % 5000 + 1) - 0.25, category, day) for i in range(count)]
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del items
+    return used / count
+
+
+class TestModels(unittest.TestCase):
+
+    def test_amount_is_fixed_point(self):
+        """Сумма хранится в копейках; словарь для CSV не меняется."""
+        t = Transaction(0.1 + 0.2, Category("Кафе"), date(2025, 1, 1), " Обед ")
+        self.assertEqual(t.kopecks, 30)
+        self.assertEqual(t.amount, 0.3)
+        self.assertEqual(t.to_dict(), {"amount": 0.3, "category": "Кафе", "category_type": "expense",
+                                       "date": "2025-01-01", "comment": "Обед"})
+        self.assertEqual(sum(Transaction(0.1, Category("Кафе"), date(2025, 1, 1)).kopecks
+                             for _ in range(10)), 100)
+        with self.assertRaises(ValueError):
+            Transaction(0.001, Category("Кафе"), date(2025, 1, 1))
+
+    def test_slots_reduce_memory_per_transaction(self):
+        """Экземпляры без __dict__ заметно компактнее прежних."""
+        with self.assertRaises(AttributeError):
+            Transaction(1, Category("Кафе"), date(2025, 1, 1)).extra = 1
+        compact = _bytes_per_instance(Transaction)
+        legacy = _bytes_per_instance(_DictTransaction)
+        self.assertLess(compact, legacy * 0.85,
+                        f"Память на транзакцию: {compact:.0f} Б (__slots__) против {legacy:.0f} Б (__dict__)")
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import CancelledError
+from datetime import date
+
+from render_scheduler import ChartScheduler, RenderCache, render_chart
+
+
+
+class FakeRoot:
+    """Вместо окна Tk: after() запоминает обработчик, run() вызывает их до опустошения очереди."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, _ms, callback):
+        self.callbacks.append(callback)
+
+    def run(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while self.callbacks and time.monotonic() < deadline:
+            time.sleep(0.05)
+            self.callbacks.pop(0)()
+
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(self.tmpdir.name, max_entries=2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def render(self, key):
+        path = self.cache.path_for(key)
+        with open(path, "wb") as f:
+            f.write(b"png")
+        self.cache.put(key, path)
+        return path
+
+    def test_key_depends_on_generation_and_options(self):
+        """Новое поколение данных или другие опции — другой график; давние вытесняются с файлами."""
+        first = RenderCache.key("top_expenses", 7, {"top_n": 5, "dpi": 100})
+        self.assertEqual(first, RenderCache.key("top_expenses", 7, {"dpi": 100, "top_n": 5}))
+        self.assertIsNone(self.cache.get(first))
+
+        path = self.render(first)
+        self.assertEqual(self.cache.get(first), path)
+        changed = RenderCache.key("top_expenses", 8, {"top_n": 5, "dpi": 100})
+        self.assertIsNone(self.cache.get(changed))
+        self.assertNotEqual(self.cache.path_for(changed), path)
+
+        self.render(changed)
+        self.render(RenderCache.key("top_expenses", 8, {"top_n": 3, "dpi": 100}))
+        self.assertIsNone(self.cache.get(first))
+        self.assertFalse(os.path.exists(path))
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(changed))
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+
+
+class TestChartScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_render_chart_replaces_file_atomically(self):
+        """PNG появляется под своим именем только целиком; без данных файла нет."""
+        path = os.path.join(self.tmpdir.name, "income_expense.png")
+        daily = [(date(2025, 1, d), 100.0, 50.0) for d in range(1, 11)]
+        self.assertEqual(render_chart("income_expense", daily, path, {"dpi": 50}), path)
+        self.assertIsNone(render_chart("category_pie", [], os.path.join(self.tmpdir.name, "pie.png"), {}))
+        self.assertEqual(os.listdir(self.tmpdir.name), ["income_expense.png"])
+
+    def test_superseded_job_counts_as_failure(self):
+        """Задача, отменённая новой в тот же файл, получает CancelledError, и пакет не считается успешным."""
+        root = FakeRoot()
+        scheduler = ChartScheduler(root, max_workers=1)
+        results = []
+        try:
+            path = os.path.join(self.tmpdir.name, "pie.png")
+            scheduler.submit_batch([("category_pie", [], path, {})], on_done=results.append)
+            # Другой файл (например, тот же график с другим dpi) предыдущую задачу не отменяет
+            scheduler.submit("category_pie", [], os.path.join(self.tmpdir.name, "small.png"),
+                             lambda result, error: results.append(("small", error)), dpi=50)
+            scheduler.submit("category_pie", [], path,
+                             lambda result, error: results.append(("pie", error)))
+            root.run()
+        finally:
+            scheduler.shutdown()
+        batch_errors = results[0]
+        self.assertEqual(len(batch_errors), 1)
+        self.assertIsInstance(batch_errors[0], CancelledError)
+        self.assertEqual(sorted(results[1:]), [("pie", None), ("small", None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import report
+import storage
+from models import Transaction, Category
+
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ledgers = os.path.join(self.tmpdir.name, "ledgers")
+        os.makedirs(self.ledgers)
+        storage.save_transactions([
+            Transaction(1500.0, Category("Зарплата", "income"), date(2025, 1, 10)),
+            Transaction(-320.5, Category("Транспорт", "expense"), date(2025, 2, 1)),
+        ], os.path.join(self.ledgers, "family.csv"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_build_report_writes_summaries(self):
+        """Отчёт по журналу содержит итоги, помесячные суммы и суммы по категориям."""
+        target = os.path.join(self.tmpdir.name, "out", "family")
+        row = report.build_report(os.path.join(self.ledgers, "family.csv"), target, charts=False)
+        self.assertEqual((row["transactions"], row["balance"]), (2, 1179.5))
+
+        with open(os.path.join(target, "summary.json"), encoding="utf-8") as f:
+            summary = json.load(f)
+        self.assertEqual([(m["year"], m["month"]) for m in summary["months"]], [(2025, 1), (2025, 2)])
+        with open(os.path.join(target, "categories.csv"), encoding="utf-8") as f:
+            categories = list(csv.DictReader(f))
+        self.assertEqual([c["category"] for c in categories], ["Зарплата", "Транспорт"])
+
+    def test_collect_ledgers_expands_directories(self):
+        """Каталог раскрывается в список CSV-файлов."""
+        open(os.path.join(self.ledgers, "notes.txt"), "w").close()
+        self.assertEqual(report.collect_ledgers([self.ledgers]),
+                         [os.path.join(self.ledgers, "family.csv")])
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from datetime import date
+
+from search import SearchQuery, tokenize
+from store import TransactionStore
+
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TransactionStore()
+        self.store.add(-512.4, "Продукты", "expense", date(2024, 12, 30), "Пятёрочка на Ленина")
+        self.store.add(-89.9, "Продукты", "expense", date(2025, 1, 3), "ПЯТЕРОЧКА")
+        self.store.add(-1200.0, "Кафе", "expense", date(2025, 2, 14), "ужин, пятёрочка рядом")
+        self.store.add(45000.0, "Зарплата", "income", date(2025, 2, 5), "аванс")
+        self.store.add(-300.0, "Продукты", "expense", date(2025, 3, 1), "Магнит")
+
+    def rows(self, **conditions):
+        return self.store.search_index.search(SearchQuery(**conditions)).rows.tolist()
+
+    def test_tokenize_folds_case_and_yo(self):
+        """Кириллица приводится к нижнему регистру, «ё» — к «е», знаки препинания отбрасываются."""
+        self.assertEqual(tokenize("Пятёрочка, ул. Ленина-5"), ["пятерочка", "ул", "ленина", "5"])
+
+    def test_text_and_facets(self):
+        """Слова ищутся по началу токена в комментарии и категории; фасеты сужают выборку."""
+        self.assertEqual(self.rows(text="пятерочка"), [0, 1, 2])
+        self.assertEqual(self.rows(text="Пятёр", start=date(2025, 1, 1), end=date(2025, 12, 31)), [1, 2])
+        self.assertEqual(self.rows(text="продукты пят"), [0, 1])
+        self.assertEqual(self.rows(category_type="income"), [3])
+        self.assertEqual(self.rows(categories=["продукты"], min_amount=100, max_amount=512.4), [0, 4])
+        self.assertEqual(self.rows(text="нет такого"), [])
+        result = self.store.search_index.search(SearchQuery(text="пятерочка"))
+        self.assertEqual(result.facets(), {"category": {"Продукты": 2, "Кафе": 1}, "type": {"expense": 3}})
+
+    def test_index_follows_added_rows(self):
+        """Новые комментарии и категории находятся без перестроения индекса."""
+        self.assertEqual(self.rows(text="аптека"), [])
+        self.store.add(-640.0, "Здоровье", "expense", date(2025, 3, 2), "Аптека")
+        query = SearchQuery(text="апт", category_type="expense")
+        self.assertEqual(self.store.search_index.search(query).rows.tolist(), [5])
+        self.assertTrue(self.store.search_index.matches(query, 5))
+        self.assertFalse(self.store.search_index.matches(query, 4))
+        self.store.add(-10.0, "Прочее", "expense", date(2025, 3, 3), "ещё пятёрочка")
+        self.assertEqual(self.rows(text="пятерочка"), [0, 1, 2, 6])
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
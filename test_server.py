@@ -0,0 +1,128 @@
+import asyncio
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import quote
+
+import storage
+from models import Transaction, intern_category
+from server import LedgerServer
+
+
+
+class TestServer(unittest.TestCase):
+    """Сервер запускается в фоновом потоке со своим циклом событий; клиент — http.client."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = LedgerServer(self.tmpdir.name, cache_size=1)
+        self.port = self.call(self.server.start("127.0.0.1", 0))
+
+    def tearDown(self):
+        self.call(self.server.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.tmpdir.cleanup()
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout=30)
+
+    def request(self, method, path, payload=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        try:
+            body = json.dumps(payload) if payload is not None else None
+            connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read().decode("utf-8"))
+        finally:
+            connection.close()
+
+    def test_add_list_and_aggregate(self):
+        """Операции добавляются, ищутся и суммируются; ошибки ввода дают 400/404."""
+        status, result = self.request("POST", "/ledgers/family/transactions", [
+            {"amount": 50000, "category": "Зарплата", "date": "2025-01-10"},
+            {"amount": -1200.5, "category": "Продукты", "date": "2025-01-12", "comment": "Пятёрочка"},
+            {"amount": -300, "category": "Транспорт", "date": "2025-02-01"},
+        ])
+        self.assertEqual((status, result["added"], result["total"]), (201, 3, 3))
+
+        status, totals = self.request("GET", "/ledgers/family/totals")
+        self.assertEqual(totals, {"income": 50000.0, "expense": 1500.5, "balance": 48499.5})
+        _, totals = self.request("GET", "/ledgers/family/totals?start=2025-02-01")
+        self.assertEqual(totals["expense"], 300.0)
+
+        _, page = self.request("GET", "/ledgers/family/transactions?q=" + quote("пятерочка"))
+        self.assertEqual([t["comment"] for t in page["transactions"]], ["Пятёрочка"])
+        _, page = self.request("GET", "/ledgers/family/transactions?offset=1&limit=1")
+        self.assertEqual((page["total"], page["transactions"][0]["category"]), (3, "Продукты"))
+
+        _, categories = self.request("GET", "/ledgers/family/categories")
+        self.assertEqual(categories["categories"][1], {"category": "Продукты", "amount": -1200.5})
+
+        status, result = self.request("POST", "/ledgers/family/transactions?duplicates=skip",
+                                      {"amount": -300, "category": "транспорт", "date": "2025-02-01"})
+        self.assertEqual((status, result["added"], result["skipped"]), (201, 0, 1))
+
+        self.assertEqual(self.request("POST", "/ledgers/family/transactions",
+                                      {"amount": 0, "category": "X", "date": "2025-01-01"})[0], 400)
+        for amount in ("inf", "nan", float("inf"), 1e308):
+            status, _ = self.request("POST", "/ledgers/family/transactions",
+                                     {"amount": amount, "category": "X", "date": "2025-01-01"})
+            self.assertEqual(status, 400, amount)
+        self.assertEqual(self.request("GET", "/ledgers/unknown/totals")[0], 404)
+        self.assertEqual(self.request("GET", "/ledgers/..%2Fetc/totals")[0], 404)
+        self.assertEqual(self.request("GET", "/ledgers/family.bak/totals")[0], 400)
+
+    def test_concurrent_writes_and_eviction(self):
+        """Параллельные записи не теряются; вытесненный из кэша журнал читается с диска."""
+        def post(i):
+            ledger = "alice" if i % 2 else "bob"
+            return self.request("POST", f"/ledgers/{ledger}/transactions",
+                                {"amount": -(i + 1), "category": "Еда", "date": "2025-03-01"})[0]
+
+        with ThreadPoolExecutor(max_workers=8) as clients:
+            self.assertEqual(set(clients.map(post, range(40))), {201})
+
+        # Кэш на один журнал: в памяти остался только последний
+        _, ledgers = self.request("GET", "/ledgers")
+        self.assertEqual(ledgers["ledgers"], ["alice", "bob"])
+        self.assertEqual(len(ledgers["loaded"]), 1)
+
+        for ledger, expense in (("alice", sum(range(2, 41, 2))), ("bob", sum(range(1, 40, 2)))):
+            _, totals = self.request("GET", f"/ledgers/{ledger}/totals")
+            self.assertEqual(totals["expense"], float(expense))
+            rows = storage.load_transactions(os.path.join(self.tmpdir.name, f"{ledger}.csv"))
+            self.assertEqual(len(rows), 20)
+
+    def test_bad_content_length_and_foreign_appends(self):
+        """Неверный Content-Length даёт 400; строки, дописанные другим процессом, видны при чтении."""
+        for length in ("abc", "-5"):
+            with socket.create_connection(("127.0.0.1", self.port), timeout=30) as client:
+                client.sendall(f"POST /ledgers/family/transactions HTTP/1.1\r\n"
+                               f"Content-Length: {length}\r\n\r\n".encode("latin-1"))
+                response = b""
+                while chunk := client.recv(4096):
+                    response += chunk
+            self.assertTrue(response.startswith(b"HTTP/1.1 400"), response)
+
+        self.request("POST", "/ledgers/family/transactions",
+                     {"amount": -100, "category": "Еда", "date": "2025-03-01"})
+        storage.append_transactions(
+            [Transaction(-50, intern_category("Еда", "expense"), date(2025, 3, 2))],
+            os.path.join(self.tmpdir.name, "family.csv"))
+        _, totals = self.request("GET", "/ledgers/family/totals")
+        self.assertEqual(totals["expense"], 150.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
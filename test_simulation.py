@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+
+import simulation
+import visualization
+from analysis import category_monthly_stats
+from store import TransactionStore
+
+
+
+class TestSimulation(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TransactionStore()
+        for month in range(1, 13):
+            self.store.add(50_000.0, "Зарплата", "income", date(2024, month, 5))
+            self.store.add(-20_000.0 - month * 100, "Аренда", "expense", date(2024, month, 10))
+            if month % 2:
+                self.store.add(-3_000.0, "Кафе", "expense", date(2024, month, 20))
+
+    def test_category_stats_from_monthly_totals(self):
+        """Параметры категорий считаются по месячным итогам журнала."""
+        stats = category_monthly_stats(self.store).set_index("category")
+        self.assertEqual(list(stats["sign"]), [1, -1, -1])
+        self.assertEqual(stats.loc["Кафе", "active_share"], 0.5)
+        self.assertAlmostEqual(stats.loc["Зарплата", "log_mean"], np.log(50_000))
+        self.assertAlmostEqual(stats.loc["Зарплата", "log_std"], 0)
+        self.assertAlmostEqual(stats.loc["Аренда", "mean"], 20_650)
+
+    def test_bands_are_reproducible_across_workers(self):
+        """Один seed — одинаковые полосы при любом числе процессов."""
+        model = simulation.fit_model(self.store, today=date(2025, 1, 1))
+        self.assertEqual(model.start_month, np.datetime64("2025-02"))
+        chunk = simulation.CHUNK_ELEMENTS
+        simulation.CHUNK_ELEMENTS = 1_000
+        try:
+            serial = simulation.simulate(model, months=6, paths=400, seed=7)
+            parallel = simulation.simulate(model, months=6, paths=400, seed=7, workers=2)
+        finally:
+            simulation.CHUNK_ELEMENTS = chunk
+        np.testing.assert_array_equal(serial.bands, parallel.bands)
+        self.assertTrue((np.diff(serial.bands, axis=0) >= 0).all())
+        # Зарплата постоянна, аренда около 20 650 в месяц, кафе через месяц по 3 000
+        median_growth = serial.band(50)[-1] - serial.band(50)[0]
+        self.assertAlmostEqual(median_growth / 5, 50_000 - 20_650 - 1_500, delta=800)
+        self.assertEqual(serial.negative_share.max(), 0)
+
+    def test_large_balance_keeps_kopecks(self):
+        """Баланс считается в float64: при сотне миллионов ошибка — копейки, а не рубли."""
+        stats = pd.DataFrame({"category": ["Зарплата"], "sign": [1.0], "active_share": [1.0],
+                              "log_mean": [np.log(50_000.0)], "log_std": [0.0]})
+        model = simulation.SimulationModel(stats, 100_000_000.37, "2025-01")
+        result = simulation.simulate(model, months=3, paths=10)
+        np.testing.assert_allclose(result.band(50), 100_000_000.37 + 50_000.0 * np.arange(1, 4),
+                                   rtol=0, atol=0.05)
+
+    def test_chart_is_rendered(self):
+        """Полосы рисуются в файл."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "simulation.png")
+            visualization.plot_simulation(self.store, months=6, paths=500, save_path=path)
+            self.assertTrue(os.path.exists(path))
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+import storage
+from models import Transaction, Category
+
+# Бюджет запуска: импорт интерфейса и загрузка журнала из снимка, секунды
+STARTUP_BUDGET = 0.5
+
+# Модули, которые не должны загружаться до первого графика или анализа
+HEAVY_MODULES = ("pandas", "matplotlib", "seaborn")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import gui
+from storage import CsvBackend
+transactions = CsvBackend(sys.argv[1]).load()
+balance = transactions.totals.balance
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "rows": len(transactions),
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "finances.csv")
+        category = Category("Продукты", "expense")
+        storage.save_transactions(
+            [Transaction(-100.0 - i, category, date(2025, 1, 1 + i % 28)) for i in range(5000)],
+            self.path
+        )
+        storage.load_transactions_cached(self.path)   # снимок, как после первого запуска
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def probe(self) -> dict:
+        root = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, PYTHONPATH=root)
+        env.pop("FINANCES_PROFILE", None)
+        env.pop("FINANCES_PROFILE_DIR", None)
+        result = subprocess.run([sys.executable, "-c", _PROBE, self.path], cwd=root, env=env,
+                                capture_output=True, text=True, check=True)
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def test_startup_skips_heavy_modules(self):
+        """Запуск не загружает pandas, matplotlib и seaborn."""
+        result = self.probe()
+        self.assertEqual(result["rows"], 5000)
+        self.assertEqual(result["loaded"], [])
+
+    def test_startup_within_budget(self):
+        """Импорт интерфейса и загрузка журнала укладываются в бюджет."""
+        seconds = min(self.probe()["seconds"] for _ in range(3))
+        self.assertLess(seconds, STARTUP_BUDGET)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,257 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
+
+import storage
+from models import Transaction, Category
+from budgets import Budget
+from sqlite_storage import BATCH_SIZE, SqliteBackend
+from storage import MemoryBackend
+
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.old_data_file = storage.DATA_FILE
+        storage.DATA_FILE = os.path.join(self.tmpdir.name, "finances.csv")
+
+    def tearDown(self):
+        storage.DATA_FILE = self.old_data_file
+        self.tmpdir.cleanup()
+
+    def make_transaction(self, amount=-100.0, name="Продукты", day=1, comment=""):
+        category_type = "income" if amount > 0 else "expense"
+        return Transaction(amount, Category(name, category_type), date(2025, 1, day), comment)
+
+    def test_append_creates_file_with_header(self):
+        """Первая дозапись создаёт файл с заголовком."""
+        storage.append_transaction(self.make_transaction(comment="Магазин"))
+        with open(storage.DATA_FILE, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "amount,category,type,date,comment")
+        self.assertEqual(len(lines), 2)
+
+    def test_append_keeps_existing_rows(self):
+        """Дозапись не трогает ранее сохранённые строки."""
+        storage.save_transactions([self.make_transaction(1500.0, "Зарплата")])
+        storage.append_transaction(self.make_transaction(-320.5, "Транспорт", 2))
+        loaded = storage.load_transactions()
+        self.assertEqual([t.amount for t in loaded], [1500.0, -320.5])
+
+    def test_append_after_missing_trailing_newline(self):
+        """Строка без завершающего перевода строки не склеивается с новой."""
+        with open(storage.DATA_FILE, "w", encoding="utf-8", newline="") as f:
+            f.write("amount,category,type,date,comment\n1500.0,Зарплата,income,2025-01-10,")
+        storage.append_transaction(self.make_transaction(-850.0, "Продукты", 11))
+        loaded = storage.load_transactions()
+        self.assertEqual([t.amount for t in loaded], [1500.0, -850.0])
+
+    def test_compact_rewrites_without_temp_files(self):
+        """Уплотнение переписывает журнал и не оставляет временных файлов."""
+        for day in range(1, 4):
+            storage.append_transaction(self.make_transaction(-10.0 * day, day=day))
+        storage.compact_transactions()
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ["finances.csv", "finances.lock"])
+        self.assertEqual(len(storage.load_transactions()), 3)
+
+    def test_compact_keeps_rows_appended_while_waiting(self):
+        """Уплотнение ждёт блокировку до чтения журнала: строка, дописанная под блокировкой, сохраняется."""
+        storage.append_transaction(self.make_transaction(-10.0))
+        with storage.file_lock():
+            compact = threading.Thread(target=storage.compact_transactions)
+            compact.start()
+            time.sleep(0.2)
+            storage.append_transactions([self.make_transaction(-20.0, day=2)], lock=False)
+        compact.join(timeout=30)
+        self.assertEqual([t.amount for t in storage.load_transactions()], [-10.0, -20.0])
+
+    def test_bulk_loader_matches_row_loader(self):
+        """Пакетная загрузка даёт тот же результат, что и построчная."""
+        with open(storage.DATA_FILE, "w", encoding="utf-8", newline="") as f:
+            f.write(
+                "amount,category,type,date,comment\n"
+                "1500.0,Зарплата,income,2025-01-10,Аванс\n"
+                "0,Продукты,expense,2025-01-11,нулевая\n"
+                "abc,Продукты,expense,2025-01-11,сумма\n"
+                "1_000, Продукты ,expense,2025-1-5,  пробелы  \n"
+                "-5,Прод!укты,expense,2025-01-12,категория\n"
+                "-5,Продукты,expense,2025-02-30,дата\n"
+                "-7,Связь,expense,2025-03-01\n"
+            )
+        expected = [t.to_dict() for t in storage.load_transactions()]
+        report = storage.LoadReport()
+        loaded = storage.load_transactions_bulk(chunksize=3, report=report)
+        self.assertEqual([t.to_dict() for t in loaded], expected)
+        self.assertEqual(report.rows_total, 7)
+        self.assertEqual(sorted(n for n, _ in report.errors), [2, 3, 5, 6])
+
+    def test_bulk_fallback_fills_report(self):
+        """Если pandas не разбирает файл, построчная загрузка тоже заполняет отчёт."""
+        with open(storage.DATA_FILE, "w", encoding="utf-8", newline="") as f:
+            f.write(
+                "amount,category,type,date,comment\n"
+                "1500.0,Зарплата,income,2025-01-10,Аванс\n"
+                "abc,Продукты,expense,2025-01-11,сумма\n"
+                "-5,Продукты,expense,2025-02-30,дата\n"
+                '-7,Связь,expense,2025-03-01,"незакрытая кавычка\n'
+            )
+        report = storage.LoadReport()
+        loaded = storage.load_transactions_bulk(chunksize=2, report=report)
+        self.assertEqual([t.amount for t in loaded], [1500.0, -7.0])
+        self.assertEqual((report.rows_total, report.rows_loaded), (4, 2))
+        self.assertEqual([n for n, _ in report.errors], [2, 3])
+
+    def test_snapshot_roundtrip_and_staleness(self):
+        """Снимок читается без CSV-разбора и пересобирается после изменения CSV."""
+        storage.save_transactions([self.make_transaction(1500.0, "Зарплата", comment="Аванс"),
+                                   self.make_transaction(-320.5, "Транспорт", 2)])
+        first = storage.load_transactions_cached()
+        self.assertTrue(os.path.exists(storage.snapshot_path()))
+
+        cached = storage.load_snapshot()
+        self.assertIsNotNone(cached)
+        self.assertEqual([t.to_dict() for t in cached], [t.to_dict() for t in first])
+
+        storage.append_transaction(self.make_transaction(-50.0, "Связь", 3))
+        self.assertIsNone(storage.load_snapshot())
+        self.assertEqual(len(storage.load_transactions_cached()), 3)
+        self.assertEqual(len(storage.load_snapshot()), 3)
+
+
+
+
+    def test_rollup_index_is_persisted(self):
+        """Индекс сводок сохраняется при закрытии и устаревает вместе с CSV."""
+        storage.save_transactions([self.make_transaction(1500.0, "Зарплата"),
+                                   self.make_transaction(-320.5, "Транспорт", 2)])
+        backend = storage.CsvBackend()
+        backend.load()
+        backend.close()
+        self.assertTrue(os.path.exists(storage.rollup_path()))
+
+        reloaded = storage.CsvBackend()
+        transactions = reloaded.load()
+        rollup = storage.load_rollup(transactions)
+        self.assertIsNotNone(rollup)
+        self.assertEqual(rollup.totals(date(2025, 1, 2), date(2025, 1, 2)), (0, 32050))
+
+        reloaded.append([self.make_transaction(-10.0, "Транспорт", 3)])
+        self.assertIsNone(storage.load_rollup(transactions))
+        self.assertEqual(reloaded.totals(date(2025, 1, 2), date(2025, 1, 31)), (0.0, 330.5))
+
+    def test_refresh_merges_rows_appended_by_another_process(self):
+        """Чужие строки дочитываются без перезагрузки; незаконченная строка ждёт конца записи."""
+        storage.save_transactions([self.make_transaction(1500.0, "Зарплата")])
+        window, importer = storage.CsvBackend(), storage.CsvBackend()
+        store = window.load()
+        self.assertEqual(window.refresh(), 0)
+
+        importer.append([self.make_transaction(-10.0, day=2), self.make_transaction(-20.0, day=3)])
+        self.assertEqual(window.refresh(), 2)
+        self.assertIs(window.transactions, store)
+        self.assertEqual(window.totals(), (1500.0, 30.0))
+
+        with open(storage.DATA_FILE, "a", encoding="utf-8", newline="") as f:
+            f.write("-5.0,Продукты,expense,2025-01-0")
+        self.assertEqual(window.refresh(), 0)
+        with open(storage.DATA_FILE, "a", encoding="utf-8", newline="") as f:
+            f.write("4,\r\n")
+        self.assertEqual(window.refresh(), 1)
+
+        # Своя запись сначала дочитывает чужие строки: порядок как в файле
+        importer.append([self.make_transaction(-1.0, day=5)])
+        window.append([self.make_transaction(-2.0, day=6)])
+        self.assertEqual([t.amount for t in window.transactions],
+                         [t.amount for t in storage.load_transactions()])
+
+    def test_save_keeps_foreign_rows_and_detects_rewrite(self):
+        """Сохранение не теряет чужие строки; после чужой перезаписи оно отменяется."""
+        storage.save_transactions([self.make_transaction(1500.0, "Зарплата")])
+        window, other = storage.CsvBackend(), storage.CsvBackend()
+        window.load()
+        other.append([self.make_transaction(-10.0, day=2)])
+        window.save(list(window.transactions))
+        self.assertEqual(len(storage.load_transactions()), 2)
+
+        other.load()
+        other.save([self.make_transaction(-99.0, day=9)])
+        with self.assertRaises(storage.LedgerChangedError):
+            window.save(list(window.transactions))
+        self.assertEqual(window.refresh(), storage.RELOADED)
+        self.assertEqual([t.amount for t in window.transactions], [-99.0])
+
+    @unittest.skipIf(storage.fcntl is None, "разделяемые блокировки есть только в POSIX")
+    def test_file_lock_blocks_readers_during_write(self):
+        """Пока журнал пишется, refresh() не читает его и не ждёт."""
+        storage.save_transactions([self.make_transaction(1500.0, "Зарплата")])
+        window = storage.CsvBackend()
+        window.load()
+        with storage.file_lock():
+            storage.append_transactions([self.make_transaction(-10.0, day=2)], lock=False)
+            with self.assertRaises(BlockingIOError):
+                with storage.file_lock(shared=True, blocking=False):
+                    pass
+            self.assertEqual(window.refresh(), 0)
+        self.assertEqual(window.refresh(), 1)
+
+
+
+class TestSqliteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.backend = SqliteBackend(os.path.join(self.tmpdir.name, "finances.db"))
+        self.transactions = [
+            Transaction(1500.0, Category("Зарплата", "income"), date(2025, 1, 10), "Аванс"),
+            Transaction(-850.0, Category("Продукты"), date(2025, 1, 11)),
+            Transaction(-320.5, Category("Транспорт"), date(2025, 1, 11)),
+            Transaction(-150.0, Category("Продукты"), date(2025, 2, 1)),
+        ]
+        self.backend.append(self.transactions, batch_size=3)
+        self.memory = MemoryBackend(self.transactions)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmpdir.cleanup()
+
+    def test_wal_mode_and_indexes(self):
+        """База работает в режиме WAL и имеет индексы по дате, категории и типу."""
+        conn = self.backend.connect()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(transactions)")}
+        self.assertTrue({"idx_transactions_date", "idx_transactions_category",
+                         "idx_transactions_type"} <= indexes)
+
+    def test_aggregates_match_in_memory(self):
+        """Агрегаты в SQL совпадают с подсчётом по загруженным данным."""
+        period = (date(2025, 1, 11), date(2025, 1, 31))
+        for method in ("totals", "category_totals", "expense_totals_by_category", "daily_totals"):
+            self.assertEqual(getattr(self.backend, method)(), getattr(self.memory, method)(), method)
+            self.assertEqual(getattr(self.backend, method)(*period),
+                             getattr(self.memory, method)(*period), method)
+
+    def test_load_roundtrip(self):
+        """Загруженные из базы транзакции совпадают с записанными (в том числе при загрузке пачками)."""
+        for batch_size in (3, BATCH_SIZE):
+            loaded = self.backend.load(batch_size)
+            self.assertEqual([t.to_dict() for t in loaded], [t.to_dict() for t in self.transactions])
+            self.assertEqual(loaded.totals.balance, self.memory.load().totals.balance)
+
+    def test_budgets_stored_in_database(self):
+        """Бюджеты базы хранятся в её таблице, а не в файле рядом с CSV-журналом."""
+        budget = Budget(Category("Продукты"), 5000, "weekly")
+        self.backend.save_budgets([budget])
+        self.assertEqual(os.listdir(self.tmpdir.name).count("finances.budgets"), 0)
+        loaded = self.backend.load_budgets()
+        self.assertEqual([(b.category.name, b.limit, b.period) for b in loaded], [("Продукты", 5000.0, "weekly")])
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import gc
+import unittest
+import weakref
+from datetime import date
+from decimal import Decimal
+
+from aggregates import RunningTotals
+import frame_cache
+from frame_cache import frames
+from models import CATEGORIES, Category, CategoryRegistry, Transaction, intern_category
+from store import TransactionStore
+
+
+
+class TestTransactionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = TransactionStore()
+        self.store.add(1500.0, "Зарплата", "income", date(2025, 1, 10), "Аванс")
+        self.store.add(-850.0, "Продукты", "expense", date(2025, 1, 11), " Магазин ")
+        self.store.add(-120.0, "Продукты", "expense", date(2025, 1, 12))
+
+    def test_sequence_protocol(self):
+        """Хранилище ведёт себя как последовательность транзакций."""
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual([t.amount for t in self.store], [1500.0, -850.0, -120.0])
+        self.assertEqual(self.store[-1].date, date(2025, 1, 12))
+        self.assertEqual(len(self.store[1:]), 2)
+        with self.assertRaises(IndexError):
+            self.store[3]
+
+    def test_categories_are_interned(self):
+        """Одинаковые категории хранятся в одном экземпляре."""
+        self.assertEqual(len(self.store.categories), 2)
+        self.assertIs(self.store[1].category, self.store[2].category)
+
+    def test_category_registry_shares_instances(self):
+        """Одна пара (имя, тип) — один объект Category во всех таблицах; id у таблиц свои."""
+        registry = CategoryRegistry(CATEGORIES)
+        self.assertEqual(registry.intern("Кафе", "expense"), 0)
+        self.assertEqual(registry.intern(" Кафе ", "expense"), 0)
+        self.assertEqual(registry.intern("Кафе", "income"), 1)
+        self.assertIs(registry.get("Кафе"), intern_category("Кафе"))
+        self.assertIs(self.store[1].category, intern_category("Продукты", "expense"))
+        self.assertEqual(self.store.category_registry.ids_of_type("expense"), [1])
+        self.assertEqual(registry.ids_of_type("income"), [1])
+        with self.assertRaises(ValueError):
+            registry.intern("Кафе!", "expense")
+        self.assertEqual(len(registry), 2)
+
+    def test_view_matches_transaction_to_dict(self):
+        """Представление строки даёт тот же словарь, что и Transaction."""
+        transaction = Transaction(-850.0, Category("Продукты"), date(2025, 1, 11), "Магазин")
+        self.assertEqual(self.store[1].to_dict(), transaction.to_dict())
+
+    def test_append_validates_like_transaction(self):
+        """Нулевая сумма и некорректное имя категории отклоняются."""
+        with self.assertRaises(ValueError):
+            self.store.add(0, "Продукты", "expense", date(2025, 1, 1))
+        with self.assertRaises(ValueError):
+            self.store.add(-1.0, "Продукты!", "expense", date(2025, 1, 1))
+        self.assertEqual(len(self.store), 3)
+
+    def test_running_totals_follow_add_and_remove(self):
+        """Итоги обновляются инкрементально и совпадают с пересчётом."""
+        totals = self.store.totals
+        self.assertEqual(totals.balance, Decimal("530.00"))
+        self.store.add(-30.5, "Связь", "expense", date(2025, 2, 1))
+        self.store.remove(0)
+        self.assertEqual(totals.income, Decimal("0.00"))
+        self.assertEqual(totals.expense, Decimal("1000.50"))
+        rebuilt = RunningTotals.from_columns(self.store.amounts, self.store.date_ordinals,
+                                             self.store.category_ids)
+        self.assertEqual(rebuilt.categories(), totals.categories())
+        self.assertEqual(rebuilt.months(), totals.months())
+        self.assertEqual(totals.months(), [(2025, 1, Decimal("0.00"), Decimal("970.00")),
+                                           (2025, 2, Decimal("0.00"), Decimal("30.50"))])
+
+    def test_running_totals_are_exact(self):
+        """Копеечная арифметика не накапливает погрешность float."""
+        store = TransactionStore()
+        for _ in range(1000):
+            store.add(0.1, "Кэшбэк", "income", date(2025, 1, 1))
+        self.assertEqual(store.totals.income, Decimal("100.00"))
+        self.assertNotEqual(sum(t.amount for t in store), 100.0)
+
+
+    def test_frame_cache_follows_generation(self):
+        """Кэш DataFrame переиспользуется до изменения хранилища."""
+        cached = frames(self.store)
+        self.assertIs(frames(self.store), cached)
+        self.assertEqual(list(cached.expense_by_category.items()), [("Продукты", 97000)])
+        self.store.add(-30.5, "Связь", "expense", date(2025, 2, 1))
+        self.assertIsNot(frames(self.store), cached)
+        self.assertEqual(len(frames(self.store).daily), 4)
+
+    def test_frame_cache_does_not_keep_stores_alive(self):
+        """Кэш не удерживает хранилища: после del и сборки мусора хранилище удалено."""
+        store = TransactionStore()
+        store.add(-10.0, "Кафе", "expense", date(2025, 1, 1))
+        self.assertEqual(len(frames(store).frame), 1)
+        ref = weakref.ref(store)
+        del store
+        gc.collect()
+        self.assertIsNone(ref())
+
+        before = len(frame_cache._cache)
+        for _ in range(5):
+            self.assertEqual(len(frames([]).frame), 0)
+        self.assertEqual(len(frame_cache._cache), before)
+
+    def test_rollup_matches_row_scan(self):
+        """Итоги за период из бакетов совпадают с обходом строк."""
+        store = TransactionStore()
+        for i in range(400):
+            store.add((-1) ** i * (i + 0.25), f"Категория {i % 3}", "expense",
+                      date.fromordinal(date(2023, 11, 20).toordinal() + i * 2))
+        rollup = store.rollup
+        store.remove(5)
+        store.add(-99.99, "Категория 0", "expense", date(2024, 2, 29))
+        for start, end in [(date(2023, 12, 1), date(2024, 12, 31)), (date(2024, 2, 29), date(2024, 2, 29)),
+                           (date(2023, 11, 25), date(2025, 3, 3)), (date(2024, 1, 1), date(2024, 1, 31))]:
+            rows = [t for t in store if start <= t.date <= end]
+            income = sum(round(t.amount * 100) for t in rows if t.amount > 0)
+            expense = sum(round(-t.amount * 100) for t in rows if t.amount < 0)
+            self.assertEqual(rollup.totals(start, end), (income, expense), (start, end))
+        months = rollup.series("month", date(2024, 1, 15), date(2024, 3, 1))
+        self.assertEqual([key % 12 + 1 for key, _, _ in months], [1, 2, 3])
+
+    def test_rollup_cover_is_minimal(self):
+        """Период покрывается днями на краях, месяцами и годами в середине."""
+        from rollup import RollupIndex
+        parts = RollupIndex.cover(date(2021, 11, 15), date(2024, 2, 10))
+        self.assertEqual([(level, first, last) for level, first, last in parts], [
+            ("day", date(2021, 11, 15).toordinal(), date(2021, 11, 30).toordinal()),
+            ("day", date(2024, 2, 1).toordinal(), date(2024, 2, 10).toordinal()),
+            ("month", 2021 * 12 + 11, 2021 * 12 + 11),
+            ("month", 2024 * 12, 2024 * 12),
+            ("year", 2022, 2023),
+        ])
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
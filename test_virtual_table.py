@@ -0,0 +1,91 @@
+import unittest
+from datetime import date
+
+from models import Transaction, intern_category
+from store import TransactionStore
+from virtual_table import ROW_BUFFER, RowWindow
+
+
+def make_store(amounts):
+    return TransactionStore.from_transactions(
+        Transaction(amount, intern_category("Кафе" if amount < 0 else "Зарплата",
+                                            "expense" if amount < 0 else "income"),
+                    date(2025, 1, 1 + i % 28), f"строка {i}")
+        for i, amount in enumerate(amounts)
+    )
+
+
+
+class TestRowWindow(unittest.TestCase):
+
+    def test_visible_rows_and_scrolling(self):
+        """Отрисовываются страница и запас; смещение прижимается к границам журнала."""
+        window = RowWindow(make_store([-(i + 1) for i in range(100)]), page=10)
+        self.assertEqual(window.visible(), range(0, 10 + ROW_BUFFER))
+        self.assertEqual(window.fractions(), (0.0, 0.1))
+
+        self.assertTrue(window.scroll_to(95))
+        self.assertEqual(window.offset, 90)
+        self.assertEqual(window.visible(), range(90, 100))
+        self.assertEqual(window.fractions(), (0.9, 1.0))
+        self.assertFalse(window.scroll_to(1000))
+
+        self.assertTrue(window.scroll_to_fraction(0.5))
+        self.assertEqual(window.offset, 50)
+        self.assertTrue(window.scroll_to(-5))
+        self.assertEqual(window.offset, 0)
+
+        # Строк меньше страницы: прокручивать некуда
+        small = RowWindow(make_store([-1, -2, -3]), page=10)
+        self.assertEqual(small.visible(), range(0, 3))
+        self.assertFalse(small.scroll_to(2))
+        self.assertEqual(RowWindow(make_store([]), page=10).fractions(), (0.0, 1.0))
+
+    def test_filter_shrinks_window(self):
+        """После фильтра смещение сбрасывается, позиции указывают на отобранные строки."""
+        window = RowWindow(make_store([-(i + 1) for i in range(50)]), page=10)
+        window.scroll_to(40)
+        window.set_rows(range(0, 50, 5))
+        self.assertEqual(window.offset, 0)
+        self.assertEqual(len(window), 10)
+        self.assertEqual([window.row_index(p) for p in window.visible()], list(range(0, 50, 5)))
+        window.set_rows(None)
+        self.assertEqual(len(window), 50)
+
+    def test_sort_mapping_and_insert(self):
+        """Сортировка переставляет индексы, повторный щелчок меняет направление; новая строка встаёт на место."""
+        store = make_store([-300, 100, -50, 700, -50])
+        window = RowWindow(store, page=10)
+        window.sort_by("Сумма")
+        self.assertEqual([window.row_index(p) for p in window.visible()], [0, 2, 4, 1, 3])
+        window.sort_by("Сумма")
+        self.assertTrue(window.sort_reverse)
+        self.assertEqual([window.row_index(p) for p in window.visible()], [3, 1, 2, 4, 0])
+
+        store.append(Transaction(200, intern_category("Зарплата", "income"), date(2025, 2, 1)))
+        window.row_added(len(store) - 1)
+        self.assertEqual([store.amounts[window.row_index(p)] for p in window.visible()],
+                         [700, 200, 100, -50, -50, -300])
+
+        # Сортировка сохраняется при фильтре и сбрасывается при смене журнала
+        window.set_rows([0, 1, 2])
+        self.assertEqual([window.row_index(p) for p in window.visible()], [1, 2, 0])
+        window.set_transactions(store)
+        self.assertIsNone(window.sort_column)
+        self.assertEqual([window.row_index(p) for p in window.visible()], list(range(6)))
+
+    def test_row_added_without_sort(self):
+        """Без сортировки новая строка добавляется в конец, в том числе к отфильтрованным."""
+        store = make_store([-1, -2])
+        window = RowWindow(store, page=10)
+        store.append(Transaction(-3, intern_category("Кафе", "expense"), date(2025, 1, 3)))
+        window.row_added(2)
+        self.assertEqual(len(window), 3)
+        window.set_rows([0])
+        store.append(Transaction(-4, intern_category("Кафе", "expense"), date(2025, 1, 4)))
+        window.row_added(3)
+        self.assertEqual([window.row_index(p) for p in window.visible()], [0, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
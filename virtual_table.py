@@ -0,0 +1,280 @@
+"""
+Виртуальная таблица транзакций на основе ttk.Treeview.
+
+Treeview содержит только строки, попадающие в окно просмотра, плюс
+небольшой запас; при прокрутке меняются значения этих строк, а не набор
+элементов. Стоимость прокрутки, добавления операции и обновления не
+зависит от размера журнала (кроме сортировки).
+
+Какие строки журнала и в каком порядке видны, считает RowWindow — без Tk,
+поэтому окно просмотра, прокрутку и сортировку можно проверять без экрана.
+VirtualTable только переносит результат в Treeview.
+"""
+from tkinter import ttk
+
+from instrumentation import count as count_metric, timed
+
+# Сколько строк держать сверх видимых (сглаживает изменение размера окна)
+ROW_BUFFER = 5
+
+
+
+class RowWindow:
+    """
+    Окно просмотра таблицы: фильтр, сортировка и прокрутка без виджетов.
+
+    Attributes:
+        transactions: Последовательность транзакций (обычно TransactionStore)
+        offset (int): Позиция первой видимой строки
+        page (int): Число видимых строк
+        sort_column (str): Колонка сортировки или None
+        sort_reverse (bool): Сортировка по убыванию
+    """
+
+    def __init__(self, transactions, page: int = 15):
+        self.transactions = transactions
+        self.offset = 0
+        self.page = page
+        self.sort_column = None
+        self.sort_reverse = False
+        self._rows = None          # индексы строк для показа (None — все по порядку)
+
+    # --- Данные ---
+
+    def __len__(self):
+        return len(self.transactions) if self._rows is None else len(self._rows)
+
+    def row_index(self, position: int) -> int:
+        """Индекс строки журнала, показанной на позиции position."""
+        return position if self._rows is None else self._rows[position]
+
+    def set_transactions(self, transactions):
+        """Подменяет источник данных и сбрасывает фильтр и сортировку."""
+        self.transactions = transactions
+        self._rows = None
+        self.sort_column = None
+        self.sort_reverse = False
+
+    def set_rows(self, indices):
+        """Оставляет только строки с указанными индексами (None — все); сортировка сохраняется."""
+        self._rows = None if indices is None else list(indices)
+        if self.sort_column is not None:
+            self._apply_sort()
+        self.offset = 0
+
+    def row_added(self, index: int):
+        """
+        Учитывает одну добавленную операцию. При активной сортировке строка
+        вставляется на своё место бинарным поиском, иначе — в конец.
+        """
+        if self._rows is not None or self.sort_column is not None:
+            if self._rows is None:
+                self._rows = list(range(index))
+            if self.sort_column is not None:
+                self._rows.insert(self._insert_position(index), index)
+            else:
+                self._rows.append(index)
+
+    # --- Сортировка ---
+
+    def _sort_key(self, column: str):
+        store = self.transactions
+        if column == "Сумма":
+            amounts = store.amounts if hasattr(store, "amounts") else [t.amount for t in store]
+            return lambda i: amounts[i]
+        if column == "Дата":
+            if hasattr(store, "date_ordinals"):
+                ordinals = store.date_ordinals
+                return lambda i: ordinals[i]
+            return lambda i: store[i].date
+        if column == "Категория":
+            return lambda i: store[i].category.name
+        if column == "Тип":
+            return lambda i: store[i].category.category_type
+        return lambda i: store[i].comment
+
+    def _insert_position(self, index: int) -> int:
+        """Бинарный поиск места новой строки (после равных, как при устойчивой сортировке)."""
+        key = self._sort_key(self.sort_column)
+        value = key(index)
+        lo, hi = 0, len(self._rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = key(self._rows[mid])
+            if (current < value) if self.sort_reverse else (current > value):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _apply_sort(self):
+        rows = range(len(self.transactions)) if self._rows is None else self._rows
+        self._rows = sorted(rows, key=self._sort_key(self.sort_column), reverse=self.sort_reverse)
+
+    def sort_by(self, column: str):
+        """Сортирует по колонке; повторный вызов с той же колонкой меняет направление."""
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        self._apply_sort()
+        self.offset = 0
+
+    # --- Прокрутка ---
+
+    def visible(self) -> range:
+        """
+        Позиции строк для отрисовки: страница и ROW_BUFFER строк запаса.
+        Смещение прижимается к границам (например, после удаления строк).
+        """
+        total = len(self)
+        self.offset = max(0, min(self.offset, total - self.page))
+        return range(self.offset, self.offset + min(self.page + ROW_BUFFER, total - self.offset))
+
+    def scroll_to(self, offset: int) -> bool:
+        """Переходит к позиции offset (с прижатием к границам); True — окно сдвинулось."""
+        offset = max(0, min(offset, len(self) - self.page))
+        if offset == self.offset:
+            return False
+        self.offset = offset
+        return True
+
+    def scroll_to_fraction(self, fraction: float) -> bool:
+        """Переход по положению ползунка полосы прокрутки (0.0 — начало, 1.0 — конец)."""
+        return self.scroll_to(int(fraction * len(self)))
+
+    def fractions(self) -> tuple:
+        """Положение ползунка (начало, конец) для Scrollbar.set()."""
+        total = len(self)
+        if not total:
+            return 0.0, 1.0
+        return self.offset / total, min(1.0, (self.offset + self.page) / total)
+
+
+
+class VirtualTable:
+    """
+    Таблица с виртуальной прокруткой.
+
+    Attributes:
+        tree (ttk.Treeview): Виджет таблицы (размещается вызывающим кодом)
+        scrollbar (ttk.Scrollbar): Вертикальная полоса прокрутки
+        window (RowWindow): Какие строки и в каком порядке видны
+    """
+
+    COLUMNS = ("Сумма", "Категория", "Тип", "Дата", "Комментарий")
+
+    def __init__(self, parent, transactions, height: int = 15):
+        self.window = RowWindow(transactions, height)
+        self.tree = ttk.Treeview(parent, columns=self.COLUMNS, show="headings", height=height)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=120, anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self._on_scrollbar)
+        self._slots = []           # id элементов Treeview, переиспользуемые при прокрутке
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.window.page))
+        self.tree.bind("<Next>", lambda e: self.scroll(self.window.page))
+
+    # --- Данные ---
+
+    @property
+    def transactions(self):
+        return self.window.transactions
+
+    def __len__(self):
+        return len(self.window)
+
+    def set_transactions(self, transactions):
+        """Подменяет источник данных и сбрасывает фильтр и сортировку."""
+        self.window.set_transactions(transactions)
+        self._update_headings()
+        self.refresh()
+
+    def set_rows(self, indices):
+        """
+        Показывает только строки с указанными индексами (например, результаты
+        поиска или фильтра по датам). None — показать все.
+        """
+        self.window.set_rows(indices)
+        self.refresh()
+
+    def row_added(self, index: int):
+        """Учитывает одну добавленную операцию без перестроения таблицы."""
+        self.window.row_added(index)
+        self.refresh()
+
+    def sort_by(self, column: str):
+        """Сортирует по колонке; повторный щелчок меняет направление."""
+        self.window.sort_by(column)
+        self._update_headings()
+        self.refresh()
+
+    def _update_headings(self):
+        for col in self.COLUMNS:
+            arrow = ""
+            if col == self.window.sort_column:
+                arrow = " ▼" if self.window.sort_reverse else " ▲"
+            self.tree.heading(col, text=col + arrow)
+
+    # --- Отрисовка ---
+
+    @staticmethod
+    def _values(transaction) -> tuple:
+        return (
+            f"{transaction.amount:,.2f}",
+            transaction.category.name,
+            transaction.category.category_type,
+            transaction.date.strftime("%Y-%m-%d"),
+            transaction.comment or ""
+        )
+
+    @timed("table.refresh")
+    def refresh(self):
+        """Перерисовывает окно просмотра (O(число видимых строк))."""
+        window = self.window
+        positions = window.visible()
+
+        while len(self._slots) < len(positions):
+            self._slots.append(self.tree.insert("", "end", values=()))
+        while len(self._slots) > len(positions):
+            self.tree.delete(self._slots.pop())
+
+        for slot, position in zip(self._slots, positions):
+            self.tree.item(slot, values=self._values(window.transactions[window.row_index(position)]))
+        count_metric("table.rows_drawn", len(self._slots))
+        self.scrollbar.set(*window.fractions())
+
+    # --- Прокрутка ---
+
+    def scroll(self, rows: int):
+        self.scroll_to(self.window.offset + rows)
+
+    def scroll_to(self, offset: int):
+        if self.window.scroll_to(offset):
+            self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            if self.window.scroll_to_fraction(float(value)):
+                self.refresh()
+        elif action == "scroll":
+            step = self.window.page if unit == "pages" else 1
+            self.scroll(int(value) * step)
+
+    def _on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_resize(self, event):
+        style = ttk.Style(self.tree)
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        page = max(1, (event.height - row_height) // row_height)
+        if page != self.window.page:
+            self.window.page = page
+            self.refresh()
@@ -1,77 +1,149 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
+"""
+Графики доходов и расходов.
+
+matplotlib, seaborn и pandas загружаются при первой отрисовке (_pyplot()),
+а не при импорте модуля: подготовка данных и запуск окна их не требуют.
+"""
 from datetime import date
-from models import Transaction
+from instrumentation import timed
+from storage import StorageBackend, MemoryBackend
+
+_styled = False
+
+# Разрешение сохраняемых файлов и картинок для окна, точек на дюйм
+SAVE_DPI = 300
+DISPLAY_DPI = 100
+# Маркеры рисуются, только если точек на линии не больше этого числа
+MARKER_LIMIT = 60
+
+_RESOLUTION_TITLES = {"day": "", "week": " (по неделям)", "month": " (по месяцам)"}
+
+
+def _pyplot():
+    """Импортирует pyplot и один раз настраивает стиль графиков."""
+    global _styled
+    import matplotlib.pyplot as plt
+    if not _styled:
+        import seaborn as sns
+        sns.set_style("whitegrid")
+        plt.rcParams['font.family'] = 'DejaVu Sans'  # Для кириллицы
+        _styled = True
+    return plt
+
+
+
+def _as_source(transactions) -> StorageBackend:
+    """
+    Источник агрегатов: бэкенд хранилища (агрегаты считает он сам,
+    например в SQL) или обёртка над списком/хранилищем транзакций.
+    """
+    if isinstance(transactions, StorageBackend):
+        return transactions
+    return MemoryBackend(transactions)
 
-# Настройка стиля
-sns.set_style("whitegrid")
-plt.rcParams['font.family'] = 'DejaVu Sans'  # Для кириллицы
+
+# --- Данные для графиков ---
+#
+# Данные графиков — небольшие списки кортежей: их дёшево передать в другой
+# процесс (render_scheduler, report) и отрисовать функциями render_*.
+
+@timed()
+def income_expense_data(transactions) -> list:
+    """[(дата, доходы, расходы по модулю)] по дням."""
+    return _as_source(transactions).daily_totals()
+
+
+@timed()
+def expense_category_data(transactions) -> list:
+    """[(категория, расходы по модулю)] в порядке первого появления категории."""
+    return _as_source(transactions).expense_totals_by_category()
+
+
+def _finish(save_path, dpi=SAVE_DPI):
+    """Сохраняет или показывает текущую фигуру и закрывает её."""
+    plt = _pyplot()
+    if save_path:
+        plt.savefig(save_path, dpi=dpi, bbox_inches='tight')
+        print(f"График сохранён: {save_path}")
+    else:
+        plt.show()
+    plt.close()
 
 
 
+@timed()
 def plot_income_expense(transactions, save_path=None):
     """
     График доходов и расходов по времени (линейный график).
     
     Параметры:
-        transactions: список объектов Transaction
+        transactions: список транзакций, TransactionStore или бэкенд хранилища
         save_path: путь для сохранения файла (если None — показывает график)
     """
-    if not transactions:
+    return render_income_expense(income_expense_data(transactions), save_path)
+
+
+@timed()
+def render_income_expense(daily, save_path=None, resolution="auto", max_points=None, dpi=SAVE_DPI):
+    """
+    Рисует график доходов и расходов по готовым дневным итогам.
+
+    Длинный ряд суммируется по неделям или месяцам и прореживается LTTB
+    (downsample.downsample_daily): пики остаются, число точек ограничено.
+
+    Параметры:
+        resolution: "auto", "day", "week" или "month"
+        max_points: сколько точек рисовать (по умолчанию downsample.MAX_POINTS)
+    """
+    if not daily:
         print("Нет транзакций для отображения.")
         return
-
-    # Подготовка данных
-    data = []
-    for t in transactions:
-        data.append({
-            'date': t.date,
-            'income': t.amount if t.amount > 0 else 0,
-            'expense': abs(t.amount) if t.amount < 0 else 0
-        })
-    df = pd.DataFrame(data)
-    df = df.groupby('date').sum().reset_index()
+    import pandas as pd
+    from downsample import MAX_POINTS, downsample_daily
+    plt = _pyplot()
+    resolution, rows = downsample_daily(daily, resolution, max_points or MAX_POINTS)
+    df = pd.DataFrame(rows, columns=['date', 'income', 'expense'])
+    markers = len(df) <= MARKER_LIMIT
 
     # Построение
     plt.figure(figsize=(12, 6))
-    plt.plot(df['date'], df['income'], label='Доходы', marker='o', color='green')
-    plt.plot(df['date'], df['expense'], label='Расходы', marker='s', color='red')
+    plt.plot(df['date'], df['income'], label='Доходы', marker='o' if markers else None,
+             color='green', linewidth=1.5)
+    plt.plot(df['date'], df['expense'], label='Расходы', marker='s' if markers else None,
+             color='red', linewidth=1.5)
 
 
-    plt.title("Доходы и расходы по времени", fontsize=16, fontweight='bold')
+    plt.title("Доходы и расходы по времени" + _RESOLUTION_TITLES[resolution],
+              fontsize=16, fontweight='bold')
     plt.xlabel("Дата", fontsize=12)
     plt.ylabel("Сумма (руб.)", fontsize=12)
     plt.legend(fontsize=11)
     plt.xticks(rotation=45)
     plt.tight_layout()
 
-    if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        print(f"График сохранён: {save_path}")
-    else:
-        plt.show()
-    plt.close()
+    _finish(save_path, dpi)
+    return save_path
 
 
 
+@timed()
 def plot_category_pie(transactions, save_path=None):
     """
     Круговая диаграмма расходов по категориям.
     """
-    expenses = [t for t in transactions if t.amount < 0]
+    return render_category_pie(expense_category_data(transactions), save_path)
+
+
+@timed()
+def render_category_pie(expenses, save_path=None, dpi=SAVE_DPI):
+    """Рисует круговую диаграмму по готовым итогам расходов по категориям."""
     if not expenses:
         print("Нет расходов для отображения.")
         return
 
-    # Группировка по категориям
-    data = {}
-    for t in expenses:
-        cat_name = t.category.name
-        data[cat_name] = data.get(cat_name, 0) + abs(t.amount)
-
-    labels = list(data.keys())
-    sizes = list(data.values())
+    plt = _pyplot()
+    labels = [name for name, _ in expenses]
+    sizes = [total for _, total in expenses]
 
     plt.figure(figsize=(8, 8))
     wedges, texts, autotexts = plt.pie(
@@ -81,35 +153,34 @@ def plot_category_pie(transactions, save_path=None):
     plt.setp(autotexts, size=10, weight="bold")
     plt.title("Распределение расходов по категориям", fontsize=16, fontweight='bold')
 
-
-    if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        print(f"График сохранён: {save_path}")
-    else:
-        plt.show()
-    plt.close()
+    _finish(save_path, dpi)
+    return save_path
 
 
 
+@timed()
 def plot_top_expenses(transactions, top_n=5, save_path=None):
     """
     Столбчатая диаграмма топ-N самых больших расходов.
     Параметры:
         top_n: количество категорий для отображения
     """
-    expenses = [t for t in transactions if t.amount < 0]
+    return render_top_expenses(expense_category_data(transactions), top_n, save_path)
+
+
+@timed()
+def render_top_expenses(expenses, top_n=5, save_path=None, dpi=SAVE_DPI):
+    """Рисует топ-N расходов по готовым итогам расходов по категориям."""
     if not expenses:
         print("Нет расходов для отображения.")
         return
 
-    # Топ-N по сумме
-    data = {}
-    for t in expenses:
-        cat_name = t.category.name
-        data[cat_name] = data.get(cat_name, 0) + abs(t.amount)
-
+    import pandas as pd
+    import seaborn as sns
+    plt = _pyplot()
 
-    df = pd.DataFrame(list(data.items()), columns=['Категория', 'Сумма'])
+    # Топ-N по сумме
+    df = pd.DataFrame(expenses, columns=['Категория', 'Сумма'])
     df = df.sort_values('Сумма', ascending=False).head(top_n)
 
 
@@ -120,9 +191,106 @@ def plot_top_expenses(transactions, top_n=5, save_path=None):
     plt.ylabel("Категория", fontsize=12)
     plt.tight_layout()
 
-    if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        print(f"График сохранён: {save_path}")
-    else:
-        plt.show()
-    plt.close()
\ No newline at end of file
+    _finish(save_path, dpi)
+    return save_path
+
+
+
+@timed()
+def plot_forecast(transactions, rules, days=365, scenarios=None, save_path=None):
+    """
+    Прогноз баланса по повторяющимся операциям (forecast.project_ledger).
+
+    Параметры:
+        rules: список models.RecurringTransaction
+        days: горизонт прогноза в днях
+        scenarios: список forecast.Scenario (по умолчанию один базовый)
+    """
+    from forecast import project_ledger
+    if isinstance(transactions, StorageBackend):
+        transactions = transactions.transactions if transactions.transactions is not None \
+            else transactions.load()
+    return render_forecast(project_ledger(transactions, rules, days, scenarios), save_path)
+
+
+@timed()
+def render_forecast(forecast, save_path=None, dpi=SAVE_DPI):
+    """Рисует прогноз баланса (forecast.Forecast): по линии на сценарий."""
+    plt = _pyplot()
+    plt.figure(figsize=(12, 6))
+    for name, balances in zip(forecast.names, forecast.balances):
+        plt.plot(forecast.dates, balances, label=name, linewidth=1.5)
+    plt.axhline(0, color='grey', linewidth=0.8, linestyle='--')
+
+    plt.title("Прогноз баланса", fontsize=16, fontweight='bold')
+    plt.xlabel("Дата", fontsize=12)
+    plt.ylabel("Баланс (руб.)", fontsize=12)
+    if len(forecast.names) > 1:
+        plt.legend(fontsize=11)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+
+    _finish(save_path, dpi)
+    return save_path
+
+
+
+@timed()
+def simulation_data(transactions, months=12, paths=10_000, seed=0):
+    """Перцентильные полосы баланса (simulation.SimulationResult) по модели журнала."""
+    from simulation import fit_model, simulate
+    if isinstance(transactions, StorageBackend):
+        transactions = transactions.transactions if transactions.transactions is not None \
+            else transactions.load()
+    return simulate(fit_model(transactions), months, paths, seed)
+
+
+@timed()
+def plot_simulation(transactions, months=12, paths=10_000, save_path=None):
+    """
+    Моделирование баланса методом Монте-Карло: перцентильные полосы.
+
+    Параметры:
+        months: горизонт в месяцах
+        paths: число моделируемых путей
+    """
+    return render_simulation(simulation_data(transactions, months, paths), save_path)
+
+
+@timed()
+def render_simulation(result, save_path=None, dpi=SAVE_DPI):
+    """Рисует перцентильные полосы баланса (simulation.SimulationResult)."""
+    plt = _pyplot()
+    months = result.months.astype("datetime64[D]")
+    percentiles = result.percentiles
+    plt.figure(figsize=(12, 6))
+    # Полосы от крайних перцентилей к центральным, медиана — линией
+    for i in range(len(percentiles) // 2):
+        plt.fill_between(months, result.bands[i], result.bands[-1 - i], color='steelblue',
+                         alpha=0.2 + 0.2 * i, linewidth=0,
+                         label=f"{percentiles[i]}–{percentiles[-1 - i]} перцентили")
+    if len(percentiles) % 2:
+        middle = len(percentiles) // 2
+        plt.plot(months, result.bands[middle], color='navy', marker='o',
+                 label=f"{percentiles[middle]}-й перцентиль")
+    plt.axhline(0, color='grey', linewidth=0.8, linestyle='--')
+
+    plt.title(f"Баланс: моделирование {result.paths} путей", fontsize=16, fontweight='bold')
+    plt.xlabel("Месяц", fontsize=12)
+    plt.ylabel("Баланс (руб.)", fontsize=12)
+    plt.legend(fontsize=11)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+
+    _finish(save_path, dpi)
+    return save_path
+
+
+
+# Графики по имени: функция подготовки данных и функция отрисовки
+CHARTS = {
+    "income_expense": (income_expense_data, render_income_expense),
+    "category_pie": (expense_category_data, render_category_pie),
+    "top_expenses": (expense_category_data, render_top_expenses),
+    "simulation": (simulation_data, render_simulation),
+}